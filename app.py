@@ -8,12 +8,18 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.middleware.proxy_fix import ProxyFix
 
 from controller.admin_action import AdminAction
+from controller.database import Database
 from controller.design import Design
+from controller.display_channel import DisplayChannel
 from controller.rotation_system import RotationSystem
 from controller.setting import authorize_mail, authorize_callback
 from controller.upload_history import UploadHistory
 from controller.user import User
+from model.connection_pool import pool
+from model.display_channel import DEFAULT_CHANNEL_ID
+from model.unit_of_work import begin_unit_of_work, commit_unit_of_work, end_unit_of_work
 from services.scheduler_service import scheduler_service
+from utilities.migrations import migrate
 
 
 def create_app():
@@ -35,6 +41,19 @@ def create_app():
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
+    # Bring the database schema up to date before anything touches it
+    migrate()
+
+    # One connection and one transaction per request, committed once at the end
+    app.before_request(begin_unit_of_work)
+    app.after_request(commit_unit_of_work)
+    app.teardown_request(end_unit_of_work)
+
+    # Hand the request thread's pooled connection back once the request is done
+    @app.teardown_appcontext
+    def release_db_connection(exception=None):
+        pool.release_thread()
+
     # Initialize the scheduler service
     try:
         print("Initializing scheduler service")
@@ -155,6 +174,16 @@ def handleUserById(user_id):
             return jsonify("Couldn't delete the requested record"), 400
 
 
+def include_pixels_arg():
+    """Design and rotation reads return pixel_data unless called with ?include_pixels=false."""
+    return request.args.get('include_pixels', 'true').lower() not in ('false', '0', 'no')
+
+
+def channel_arg():
+    """Rotation routes work on the display channel given as ?channel=, the default one otherwise."""
+    return request.args.get('channel', DEFAULT_CHANNEL_ID, type=int)
+
+
 # Design-----------------------------------------------------------------------------------------------------------
 @app.route("/design", methods=['POST'])
 @jwt_required()
@@ -176,6 +205,16 @@ def update_design_image(design_id):
     )
 
 
+@app.route("/design/<int:design_id>/pixels", methods=['PATCH'])
+@jwt_required()
+def patch_design_pixels(design_id):
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify(error="Expected a JSON object"), 400
+    handler = Design(email=get_jwt_identity())
+    return handler.patch_design_pixels(design_id=design_id, changes=data.get('pixels'), version=data.get('version'))
+
+
 # @app.route("/design/<int:design_id>", methods=['GET'])
 # @jwt_required()
 # def get_design():
@@ -196,7 +235,17 @@ def get_designs():
     page_size = int(request.args.get('page_size', 10))  # default 10
 
     handler = Design(email=get_jwt_identity())
-    return handler.get_user_designs(page=page, page_size=page_size)
+    return handler.get_user_designs(page=page, page_size=page_size, include_pixels=include_pixels_arg(),
+                                    cursor=request.args.get('cursor'))
+
+
+# <img> can't set headers, so the token may also come as ?jwt=
+@app.route("/design/<int:design_id>/thumbnail", methods=['GET'])
+@jwt_required(locations=["headers", "query_string"])
+def get_design_thumbnail(design_id):
+    handler = Design(email=get_jwt_identity())
+    return handler.get_thumbnail(design_id, version=request.args.get('v'),
+                                 scale=request.args.get('scale', 1, type=int), if_none_match=request.if_none_match)
 
 
 @app.route("/design/<int:design_id>/title", methods=['PUT'])
@@ -320,25 +369,80 @@ def handleAdminActionById(action_id):
             return jsonify("Cannot delete record because it is referenced by other records"), 400
 
 
+# Display Channels-----------------------------------------------------------------------------------------------------------
+@app.route("/channels", methods=['GET'])
+@jwt_required()
+def get_display_channels():
+    handler = DisplayChannel(email=get_jwt_identity())
+    return handler.get_channels()
+
+
+@app.route("/channels", methods=['POST'])
+@jwt_required()
+def add_display_channel():
+    handler = DisplayChannel(email=get_jwt_identity(), json_data=request.get_json(silent=True))
+    return handler.add_channel()
+
+
+@app.route("/channels/<int:channel_id>", methods=['DELETE'])
+@jwt_required()
+def remove_display_channel(channel_id):
+    handler = DisplayChannel(email=get_jwt_identity())
+    return handler.remove_channel(channel_id)
+
+
 # Rotation System-----------------------------------------------------------------------------------------------------------
+# Routes that list, add to or drive a queue take ?channel=<id>; items and
+# schedules addressed by ID belong to whichever channel they were added to.
 @app.route("/rotation/current", methods=['GET'])
 @jwt_required()
 def get_current_image():
-    handler = RotationSystem(email=get_jwt_identity())
-    return handler.get_current_image()
+    handler = RotationSystem(email=get_jwt_identity(), channel_id=channel_arg())
+    return handler.get_current_image(if_none_match=request.if_none_match, include_pixels=include_pixels_arg())
+
+
+@app.route("/rotation/current/frame", methods=['GET'])
+@jwt_required()
+def get_current_frame():
+    handler = RotationSystem(email=get_jwt_identity(), channel_id=channel_arg())
+    return handler.get_current_frame(if_none_match=request.if_none_match)
+
+
+@app.route("/rotation/timeline", methods=['GET'])
+@jwt_required()
+def get_rotation_timeline():
+    handler = RotationSystem(email=get_jwt_identity(), channel_id=channel_arg())
+    return handler.get_timeline(count=request.args.get('count', 10, type=int), if_none_match=request.if_none_match)
+
+
+# Keyframes and deltas for LED controllers, see services/frame_transport.py
+@app.route("/rotation/frames", methods=['GET'])
+@jwt_required()
+def get_frame_packets():
+    handler = RotationSystem(email=get_jwt_identity(), channel_id=channel_arg())
+    return handler.get_frame_packets(since=request.args.get('since', type=int), checksum=request.args.get('checksum'))
+
+
+# EventSource can't set headers, so the token may also come as ?jwt=
+@app.route("/rotation/stream", methods=['GET'])
+@jwt_required(locations=["headers", "query_string"])
+def stream_rotation():
+    handler = RotationSystem(email=get_jwt_identity(), channel_id=channel_arg())
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    return handler.stream(last_event_id=last_event_id)
 
 
 @app.route("/rotation/add", methods=['POST'])
 @jwt_required()
 def add_unscheduled_image():
-    handler = RotationSystem(email=get_jwt_identity(), json_data=request.json)
+    handler = RotationSystem(email=get_jwt_identity(), json_data=request.json, channel_id=channel_arg())
     return handler.add_unscheduled_image()
 
 
 @app.route("/rotation/schedule", methods=['POST'])
 @jwt_required()
 def schedule_image():
-    handler = RotationSystem(email=get_jwt_identity(), json_data=request.json)
+    handler = RotationSystem(email=get_jwt_identity(), json_data=request.json, channel_id=channel_arg())
     return handler.schedule_image()
 
 @app.route("/rotation/scheduled/<int:schedule_id>", methods=['PUT'])
@@ -359,15 +463,15 @@ def reorder_images(item_id):
 @app.route("/rotation/rotate", methods=['POST'])
 @jwt_required()
 def rotate_to_next():
-    handler = RotationSystem(email=get_jwt_identity())
-    return handler.rotate_to_next()
+    handler = RotationSystem(email=get_jwt_identity(), channel_id=channel_arg())
+    return handler.rotate_to_next(include_pixels=include_pixels_arg())
 
 
 @app.route("/rotation/items", methods=['GET'])
 @jwt_required()
 def get_all_rotation_items():
-    handler = RotationSystem(email=get_jwt_identity())
-    return handler.get_all_items()
+    handler = RotationSystem(email=get_jwt_identity(), channel_id=channel_arg())
+    return handler.get_all_items(if_none_match=request.if_none_match, include_pixels=include_pixels_arg())
 
 
 @app.route("/rotation/items/pagination", methods=['GET'])
@@ -377,8 +481,9 @@ def get_rotation_items_paginated():
 
         page = int(request.args.get('page', 1))
         page_size = int(request.args.get('size', 6))
-        handler = RotationSystem(email=get_jwt_identity())
-        return handler.get_items_paginated(page, page_size)
+        handler = RotationSystem(email=get_jwt_identity(), channel_id=channel_arg())
+        return handler.get_items_paginated(page, page_size, if_none_match=request.if_none_match,
+                                           include_pixels=include_pixels_arg())
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -394,7 +499,7 @@ def remove_rotation_item(item_id):
 @app.route("/rotation/scheduled", methods=['GET'])
 @jwt_required()
 def get_scheduled_items():
-    handler = RotationSystem(email=get_jwt_identity())
+    handler = RotationSystem(email=get_jwt_identity(), channel_id=channel_arg())
     return handler.get_scheduled_items()
 
 
@@ -404,8 +509,9 @@ def get_scheduled_items_paginated():
     try:
         page = int(request.args.get('page', 1))
         page_size = int(request.args.get('size', 6))
-        handler = RotationSystem(email=get_jwt_identity())
-        return handler.get_scheduled_items_paginated(page, page_size)
+        handler = RotationSystem(email=get_jwt_identity(), channel_id=channel_arg())
+        return handler.get_scheduled_items_paginated(page, page_size, if_none_match=request.if_none_match,
+                                                     include_pixels=include_pixels_arg())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -429,6 +535,14 @@ def get_scheduled_item(schedule_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Database-----------------------------------------------------------------------------------------------------------
+@app.route("/database/stats", methods=['GET'])
+@jwt_required()
+def get_database_stats():
+    handler = Database(email=get_jwt_identity())
+    return handler.get_stats()
+
+
 # UploadHistory-----------------------------------------------------------------------------------------------------------
 
 @app.route("/upload_history", methods=['GET'])
@@ -440,7 +554,7 @@ def get_upload_history_for_current_user():
 @app.route("/upload_history/pagination", methods=['GET'])
 @jwt_required()
 def get_upload_history_paginated():
-    return UploadHistory().getAllUploadHistoryPaginated()
+    return UploadHistory().getAllUploadHistoryPaginated(include_pixels=include_pixels_arg())
 
 
 @app.route("/upload_history/<int:history_id>", methods=['GET', 'PUT', 'DELETE'])
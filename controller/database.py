@@ -0,0 +1,47 @@
+from flask import jsonify
+
+from controller.identity import identity_cache
+from controller.user import User
+from model.connection_pool import pool
+from model.db_profile import checkpointer
+from model.rotation_system import expiry_sweep_stats
+from model.unit_of_work import unit_of_work_stats
+from services.frame_prefetcher import frame_prefetcher
+from services.frame_transport import frame_transports
+from services.rotation_broadcaster import rotation_broadcasters
+from services.rotation_engine import rotation_engine
+from services.schedule_activator import schedule_activator
+from services.thumbnail_renderer import thumbnail_renderer
+
+
+class Database:
+    """
+    Handler for database runtime diagnostics.
+    ADMIN ONLY
+    """
+
+    def __init__(self, email=None):
+        self.email = email
+        if email:
+            self.user = User(email=email)
+
+    def get_stats(self):
+        if self.email is None:
+            return jsonify(error="Unauthorized. No token."), 401
+
+        if not self.user.is_admin():
+            return jsonify(error="Unauthorized. Not admin."), 403
+
+        return jsonify(
+            pool=pool.stats(),
+            wal=checkpointer.stats(),
+            requests=unit_of_work_stats(),
+            identity=identity_cache.stats(),
+            rotation=rotation_engine.stats(),
+            schedule=schedule_activator.stats(),
+            expiry=expiry_sweep_stats(),
+            stream=rotation_broadcasters.stats(),
+            prefetch=frame_prefetcher.stats(),
+            thumbnails=thumbnail_renderer.stats(),
+            transport=frame_transports.stats()
+        ), 200
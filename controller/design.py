@@ -1,12 +1,24 @@
+import base64
 import json
+import sqlite3
 
-from flask import jsonify
+from flask import Response, jsonify
 
 from controller.user import User
 from model.design import DesignDAO
+from model.pixel_codec import payload_hash, stored_size
 from model.queue_item import QueueItemDAO
+from model.user_storage import UserStorageDAO
+from services.thumbnail_renderer import MAX_SCALE, MIN_SCALE, thumbnail_renderer
+from utilities.pixel_validator import (PixelDataError, PixelDataTooLarge, apply_pixel_changes, validate_pixel_changes,
+                                      validate_pixel_data)
 
 MAX_USER_BYTES_MB = 1  # TODO: Select a realistic limit for production
+# Thumbnail URLs carry the frame version, so a matching one never changes
+THUMBNAIL_MAX_AGE = 365 * 24 * 60 * 60
+# Tries at a patch that keeps losing the race to other edits of the design
+PATCH_ATTEMPTS = 3
+MAX_PAGE_SIZE = 100
 
 
 def serialize_design(t):
@@ -30,6 +42,28 @@ def make_json_one(t):
     return serialize_design(t)
 
 
+def thumbnail_url(design_id, frame_version=None):
+    """Link list views hand out instead of pixel_data."""
+    url = f"/design/{design_id}/thumbnail"
+    return f"{url}?v={frame_version}" if frame_version is not None else url
+
+
+def encode_cursor(updated_at, design_id):
+    """Opaque gallery cursor for the page after the design with this (updated_at, design_id)."""
+    return base64.urlsafe_b64encode(json.dumps([updated_at, design_id]).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(updated_at, design_id) from encode_cursor, None if it isn't one."""
+    try:
+        updated_at, design_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(updated_at, str) or isinstance(design_id, bool) or not isinstance(design_id, int):
+        return None
+    return updated_at, design_id
+
+
 def is_scheduled(design_id):
     queue_item_dao = QueueItemDAO()
     return queue_item_dao.is_design_scheduled(design_id)
@@ -47,10 +81,13 @@ class Design:
             return jsonify(error="No pixel data provided"), 400
 
         try:
-            # Parse the JSON to validate it, but store as string
-            json.loads(pixel_data)
-        except json.JSONDecodeError:
-            return jsonify(error="Invalid pixel data format"), 400
+            validated = validate_pixel_data(pixel_data)
+        except PixelDataTooLarge as e:
+            return jsonify(error=str(e)), 413
+        except PixelDataError as e:
+            return jsonify(error=f"Invalid pixel data format: {e}"), 400
+        # Only the canonical form is ever stored
+        pixel_data = validated.pixel_data
 
         if not title:
             title = "Untitled Design"
@@ -66,8 +103,8 @@ class Design:
         new_id = dao.add_new_design(user_id, title, pixel_data)
 
         if isinstance(new_id, int) and new_id > 0:
-            return jsonify(message="Design created", design_id=new_id), 201
-        elif new_id == 2:
+            return jsonify(message="Design created", design_id=new_id, stats=validated.stats), 201
+        elif new_id == -2:
             return jsonify(error="Design already exists"), 409
 
         return jsonify(error="Couldn't create design"), 500
@@ -97,7 +134,13 @@ class Design:
 
         return design, 200
 
-    def get_user_designs(self, user_id: int = None, page=1, page_size=10):
+    def get_user_designs(self, user_id: int = None, page=1, page_size=10, include_pixels=True, cursor=None):
+        """
+        A page of a user's designs, most recently updated first. Given a
+        cursor (a page's next_cursor, or empty for the first page) the page
+        picks up right after it and costs the same at any depth. Otherwise
+        it's numbered page `page`, with the page count.
+        """
         requesting_user_id = self.user.get_user_id()
 
         if requesting_user_id is None:
@@ -110,24 +153,88 @@ class Design:
         if requesting_user_id != user_id and not self.user.is_admin():
             return jsonify(error="Unauthorized."), 403
 
+        if not 1 <= page_size <= MAX_PAGE_SIZE:
+            return jsonify(error=f"page_size must be between 1 and {MAX_PAGE_SIZE}."), 400
+
         design_dao = DesignDAO()
 
-        total_count = design_dao.count_designs_by_id(user_id)  # <-- NEW
-        if total_count == 0:
-            return jsonify(error="No designs found."), 404
+        if cursor is not None:
+            after = decode_cursor(cursor) if cursor else None
+            if cursor and after is None:
+                return jsonify(error="Invalid cursor."), 400
+            result = design_dao.get_designs_by_id(user_id, page_size, after=after, include_pixels=include_pixels)
+        else:
+            if page < 1:
+                return jsonify(error="page must be 1 or more."), 400
+
+            total_count = design_dao.count_designs_by_id(user_id)
+            if total_count == 0:
+                return jsonify(error="No designs found."), 404
 
-        total_pages = (total_count + page_size - 1) // page_size
+            total_pages = (total_count + page_size - 1) // page_size
+            result = design_dao.get_designs_by_id(user_id, page_size, offset=(page - 1) * page_size,
+                                                  include_pixels=include_pixels)
 
-        designs = design_dao.get_designs_by_id(user_id, page, page_size)
-        if designs is None:
+        if result is None:
             return jsonify(error="Failed to fetch designs."), 500
 
+        designs, more = result
+        next_cursor = encode_cursor(designs[-1]['updated_at'], designs[-1]['design_id']) if more else None
+
+        if not include_pixels:
+            for design in designs:
+                design['thumbnail_url'] = thumbnail_url(design['design_id'], design.pop('frame_version'))
+
+        if cursor is not None:
+            return jsonify({
+                "designs": designs,
+                "next_cursor": next_cursor
+            }), 200
+
         return jsonify({
             "designs": designs,
             "page": page,
-            "pages": total_pages
+            "pages": total_pages,
+            "next_cursor": next_cursor
         }), 200
 
+    def get_thumbnail(self, design_id, version=None, scale=MIN_SCALE, if_none_match=None):
+        """
+        Serve a design's board frame as a PNG, 64x64 times scale.
+        Requests for the current ?v= may be cached for good.
+        """
+        if scale is None or not MIN_SCALE <= scale <= MAX_SCALE:
+            return jsonify(error=f"Scale must be between {MIN_SCALE} and {MAX_SCALE}."), 400
+
+        user_id = self.user.get_user_id()
+        if user_id is None:
+            return jsonify(error="Couldn't verify user"), 500
+
+        design_dao = DesignDAO()
+        design_user_id = design_dao.get_user_id(design_id)
+        if design_user_id is None:
+            return jsonify(error="No design found."), 404
+        if design_user_id != user_id and not self.user.is_admin():
+            return jsonify(error="Unauthorized."), 403
+
+        frame = design_dao.get_frame(design_id)
+        if frame is None:
+            return jsonify(error="No design found."), 404
+
+        frame_version, pixels = frame
+        etag = f"thumbnail-{design_id}-{frame_version}-{scale}x"
+        if if_none_match is not None and if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(thumbnail_renderer.render(pixels, scale), mimetype='image/png')
+
+        response.set_etag(etag)
+        if version == str(frame_version):
+            response.headers['Cache-Control'] = f"private, max-age={THUMBNAIL_MAX_AGE}, immutable"
+        else:
+            response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
     def update_design_title(self, design_id, title):
         if design_id is None:
             return jsonify(error="No id provided."), 400
@@ -158,32 +265,109 @@ class Design:
         if not pixel_data:
             return jsonify(error="No pixel data provided"), 400
 
-        # Validate pixel_data is valid JSON
         try:
-            # Parse the JSON to validate it, but store as string
-            json.loads(pixel_data)
-        except json.JSONDecodeError:
-            return jsonify(error="Invalid pixel data format"), 400
+            validated = validate_pixel_data(pixel_data)
+        except PixelDataTooLarge as e:
+            return jsonify(error=str(e)), 413
+        except PixelDataError as e:
+            return jsonify(error=f"Invalid pixel data format: {e}"), 400
+        pixel_data = validated.pixel_data
 
         user_id = self.user.get_user_id()
         if user_id is None:
             return jsonify(error="Couldn't verify user"), 500
 
-        if self.is_memory_limit_reached_on_edit(design_id, pixel_data):
-            return jsonify(error="Memory limit exceeded."), 507
-
         design_dao = DesignDAO()
         design_user_id = design_dao.get_user_id(design_id)
+        if design_user_id is None:
+            return jsonify(error="No design found."), 404
+        if design_user_id != user_id and not self.user.is_admin():
+            return jsonify(error="Unauthorized."), 403
 
-        if design_user_id == user_id or self.user.is_admin():
-            response = design_dao.update_design_image(design_id, pixel_data)
-            if response == 0:
-                return jsonify(message="Design updated."), 200
-            else:
-                return jsonify(error="Couldn't update design"), 500
+        # The design's owner pays for it, whoever edits it
+        if not self._reserve(design_user_id, payload_hash(pixel_data), stored_size(pixel_data), design_id):
+            return jsonify(error="Memory limit exceeded."), 507
+
+        response = design_dao.update_design_image(design_id, pixel_data)
+        if response == 0:
+            return jsonify(message="Design updated.", stats=validated.stats), 200
         else:
+            return jsonify(error="Couldn't update design"), 500
+
+    def patch_design_pixels(self, design_id, changes=None, version=None):
+        """
+        Apply only the pixels that changed to a design, instead of uploading
+        it whole. With version (the frame version the editor last saw), a
+        design changed since is a 409 rather than patched over.
+        """
+        if design_id is None:
+            return jsonify(error="No id provided."), 400
+
+        if changes is None:
+            return jsonify(error="No pixel changes provided"), 400
+
+        if version is not None and (isinstance(version, bool) or not isinstance(version, int)):
+            return jsonify(error="version must be an integer"), 400
+
+        if is_scheduled(design_id):
+            return jsonify(error="Design  image can't be updated when already in queue."), 400
+
+        try:
+            validated = validate_pixel_changes(changes)
+        except PixelDataTooLarge as e:
+            return jsonify(error=str(e)), 413
+        except PixelDataError as e:
+            return jsonify(error=f"Invalid pixel changes: {e}"), 400
+
+        user_id = self.user.get_user_id()
+        if user_id is None:
+            return jsonify(error="Couldn't verify user"), 500
+
+        # Without a version, a patch that lost a race to another edit is applied again on top of it
+        for _ in range(PATCH_ATTEMPTS):
+            response = self._apply_patch(user_id, design_id, validated, version)
+            if response is not None:
+                return response
+
+        return jsonify(error="Design was changed by another request, try again."), 409
+
+    def _apply_patch(self, user_id, design_id, validated, version=None):
+        """One attempt at patch_design_pixels. None if the design changed under it and it may be retried."""
+        design_dao = DesignDAO()
+        design = design_dao.get_design_payload(design_id)
+        if design is None:
+            return jsonify(error="No design found."), 404
+
+        design_user_id, old_hash, stored, frame_version, frame = design
+        if design_user_id != user_id and not self.user.is_admin():
             return jsonify(error="Unauthorized."), 403
 
+        if version is not None and version != frame_version:
+            return jsonify(error="Design has changed since this version.", version=frame_version), 409
+
+        try:
+            patched = apply_pixel_changes(stored, validated)
+        except ValueError:
+            return jsonify(error="Stored design can't be patched, upload it whole."), 409
+
+        if not patched.changed:
+            return jsonify(message="Design unchanged.", version=frame_version, stats=patched.stats), 200
+
+        # The design's owner pays for it, whoever edits it
+        digest = payload_hash(patched.pixel_data)
+        if not self._reserve(design_user_id, digest, len(patched.packed), design_id):
+            return jsonify(error="Memory limit exceeded."), 507
+
+        new_version = design_dao.patch_design_image(design_id, old_hash, digest, patched.packed, patched.changed, frame)
+        if new_version == -2:
+            if version is None:
+                return None
+            return jsonify(error="Design was changed by another request, try again."), 409
+        if new_version < 0:
+            return jsonify(error="Couldn't update design"), 500
+
+        return jsonify(message="Design updated.", version=new_version, stats=patched.stats), 200
+
     def update_design_approval(self, design_id, approval):
         """
         ADMIN ACTION
@@ -257,10 +441,9 @@ class Design:
         if user_id is None:
             return jsonify(error="Couldn't verify user"), 404
 
-        design_dao = DesignDAO()
-        user_bytes = design_dao.get_bytes_by_userid(user_id)
-
-        if user_bytes < 0:
+        try:
+            user_bytes = UserStorageDAO().get_bytes(user_id)
+        except sqlite3.Error:
             return jsonify(error="Couldn't retrieve used memory"), 500
 
         return jsonify(
@@ -270,49 +453,33 @@ class Design:
 
     # INTERNAL USE: Checks that the user does not exceed limit with an upload
     def is_memory_limit_reached(self, pixel_data):
+        return self._is_over_quota(pixel_data)
+
+    def _is_over_quota(self, pixel_data):
+        """
+        Reserve room for pixel_data in the user's ledger. A passing check
+        holds the write lock until the request commits the design, so
+        concurrent uploads can't both squeeze under the limit.
+        """
         user_id = self.user.get_user_id()
 
         # On failures, we never trust
-
         if user_id is None:
             return True
 
-        design_dao = DesignDAO()
-        user_bytes = design_dao.get_bytes_by_userid(user_id)
-
-        if user_bytes < 0:
-            return True
-
         try:
-            incoming_bytes = len(pixel_data.encode('utf-8'))
-        except (UnicodeError, AttributeError):
-            return True
-        ## print(f"[DEBUG] user_bytes: {user_bytes}, incoming_bytes: {incoming_bytes}")
-        return (user_bytes + incoming_bytes) > MAX_USER_BYTES_MB * 1024 * 1024
-
-    # INTERNAL USE: Checks that the user does not exceed limit with an edit
-    def is_memory_limit_reached_on_edit(self, design_id, pixel_data):
-        user_id = self.user.get_user_id()
-
-        if user_id is None:
-            return True
-
-        design_dao = DesignDAO()
-        user_bytes = design_dao.get_bytes_by_userid(user_id)
-
-        if user_bytes < 0:
+            digest = payload_hash(pixel_data)
+            incoming_bytes = stored_size(pixel_data)
+        except (UnicodeError, AttributeError, TypeError):
             return True
 
-        current_design_bytes = design_dao.get_design_bytes(design_id, user_id)
-
-        if current_design_bytes < 0:
-            return True
+        return not self._reserve(user_id, digest, incoming_bytes)
 
+    @staticmethod
+    def _reserve(user_id, digest, incoming_bytes, design_id=None):
+        """Reserve room in a user's ledger as _is_over_quota does. False if it doesn't fit or can't be checked."""
         try:
-            incoming_bytes = len(pixel_data.encode('utf-8'))
-        except (UnicodeError, AttributeError):
-            return True
-
-        difference_bytes = incoming_bytes - current_design_bytes
-
-        return (user_bytes + difference_bytes) > MAX_USER_BYTES_MB * 1024 * 1024
+            return UserStorageDAO().reserve(user_id, digest, incoming_bytes,
+                                            MAX_USER_BYTES_MB * 1024 * 1024, design_id)
+        except sqlite3.Error:
+            return False
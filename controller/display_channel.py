@@ -0,0 +1,61 @@
+from flask import jsonify
+
+from model.display_channel import DEFAULT_CHANNEL_ID, DisplayChannelDAO
+from controller.user import User
+
+
+class DisplayChannel:
+    """
+    Handler for display channel operations.
+    Anyone signed in can list channels; only admins can add or remove them.
+    """
+
+    def __init__(self, email=None, json_data=None):
+        """Initialize the handler with user email and request data."""
+        self.email = email
+        if email:
+            self.user = User(email=email)
+        self.json_data = json_data
+        self.dao = DisplayChannelDAO()
+
+    def get_channels(self):
+        """Get every channel with its queue length and active item."""
+        try:
+            return jsonify({"channels": self.dao.get_all_channels()}), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    def add_channel(self):
+        """Create a channel for another LED board."""
+        if self.email is None:
+            return jsonify(error="Unauthorized. No token."), 401
+        if not self.user.is_admin():
+            return jsonify(error="Unauthorized."), 403
+
+        name = (self.json_data or {}).get('name')
+        if not isinstance(name, str) or not name.strip():
+            return jsonify({"error": "name is required"}), 400
+
+        try:
+            channel_id = self.dao.add_channel(name.strip())
+            if channel_id is None:
+                return jsonify({"error": f"A channel named '{name.strip()}' already exists"}), 409
+            return jsonify({"success": True, "channel": self.dao.get_channel(channel_id)}), 201
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    def remove_channel(self, channel_id):
+        """Delete a channel with its queue and schedule."""
+        if self.email is None:
+            return jsonify(error="Unauthorized. No token."), 401
+        if not self.user.is_admin():
+            return jsonify(error="Unauthorized."), 403
+        if channel_id == DEFAULT_CHANNEL_ID:
+            return jsonify({"error": "The default channel can't be removed"}), 400
+
+        try:
+            if self.dao.remove_channel(channel_id):
+                return jsonify({"success": True, "message": f"Channel {channel_id} removed"}), 200
+            return jsonify({"error": f"Channel {channel_id} not found"}), 404
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
@@ -0,0 +1,187 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+from flask import has_request_context
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+from model.unit_of_work import get_unit_of_work
+from model.user import UserDAO
+
+IDENTITY_TTL_SECONDS = 300
+IDENTITY_CACHE_SIZE = 1024
+
+# Invalidations are remembered at least this long (longer than any access token lives)
+INVALIDATION_MEMORY_SECONDS = 24 * 60 * 60
+INVALIDATION_LOG_SIZE = 4096
+
+
+class Principal(NamedTuple):
+    user_id: int
+    email: str
+    is_admin: bool
+
+
+class IdentityCache:
+    """
+    Bounded TTL/LRU cache of principals keyed by email.
+
+    Also keeps a log of when each user was last invalidated so that claims
+    from access tokens issued before a role change or deletion are ignored.
+
+    The log lives in this process only. Tokens issued before the process
+    started are always checked against the DB, but an invalidation doesn't
+    reach other worker processes: they keep trusting the old claims until
+    the token expires or they restart.
+    """
+
+    def __init__(self, ttl: float = IDENTITY_TTL_SECONDS, maxsize: int = IDENTITY_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # email -> (principal, expires_at)
+        self._invalidated = OrderedDict()  # user_id -> invalidated_at (epoch seconds)
+        # Tokens issued before the newest forgotten invalidation can't be trusted,
+        # and neither can those from before startup, whose invalidations were never seen
+        self._forgotten_before = time.time()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'from_claims': 0, 'from_db': 0, 'invalidations': 0}
+
+    def get(self, email: str) -> Optional[Principal]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            principal, expires_at = entry
+            if expires_at <= now:
+                del self._entries[email]
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(email)
+            self._stats['hits'] += 1
+            return principal
+
+    def put(self, principal: Principal, source: str):
+        with self._lock:
+            self._entries[principal.email] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(principal.email)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            self._stats[f'from_{source}'] += 1
+
+    def invalidate(self, user_id: int):
+        """Drop a user's cached principal and distrust claims issued before now."""
+        now = time.time()
+        with self._lock:
+            for email, (principal, _) in list(self._entries.items()):
+                if principal.user_id == user_id:
+                    del self._entries[email]
+
+            self._invalidated[user_id] = now
+            self._invalidated.move_to_end(user_id)
+            while self._invalidated:
+                oldest_id, oldest_at = next(iter(self._invalidated.items()))
+                if len(self._invalidated) <= INVALIDATION_LOG_SIZE and now - oldest_at < INVALIDATION_MEMORY_SECONDS:
+                    break
+                self._invalidated.popitem(last=False)
+                self._forgotten_before = max(self._forgotten_before, oldest_at)
+
+            self._stats['invalidations'] += 1
+
+    def claims_are_current(self, user_id: int, issued_at: float) -> bool:
+        """True if no invalidation for the user happened after the token was issued."""
+        with self._lock:
+            if issued_at <= self._forgotten_before:
+                return False
+            invalidated_at = self._invalidated.get(user_id)
+            return invalidated_at is None or issued_at > invalidated_at
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        stats['maxsize'] = self.maxsize
+        stats['ttl'] = self.ttl
+        return stats
+
+
+identity_cache = IdentityCache()
+
+
+def _principal_from_claims(email: str) -> Optional[Principal]:
+    """Build the principal from the verified access token, if it is for this email."""
+    if not has_request_context():
+        return None
+
+    try:
+        if get_jwt_identity() != email:
+            return None
+        claims = get_jwt()
+    except RuntimeError:
+        # Route isn't protected by @jwt_required
+        return None
+
+    user_id = claims.get('user_id')
+    role = claims.get('role')
+    issued_at = claims.get('iat')
+    if user_id is None or role is None or issued_at is None:
+        return None
+
+    if not identity_cache.claims_are_current(user_id, issued_at):
+        return None
+
+    return Principal(user_id=user_id, email=email, is_admin=bool(role))
+
+
+def resolve_principal(email: str) -> Optional[Principal]:
+    """
+    Resolve who is making the request.
+
+    Order: cache, then the access token's claims, then a single database query.
+
+    Returns:
+        Principal or None if the user doesn't exist
+    """
+    if email is None:
+        return None
+
+    principal = identity_cache.get(email)
+    if principal is not None:
+        return principal
+
+    principal = _principal_from_claims(email)
+    if principal is not None:
+        identity_cache.put(principal, 'claims')
+        return principal
+
+    row = UserDAO().get_principal_by_email(email)
+    if row is None:
+        return None
+
+    principal = Principal(user_id=row[0], email=email, is_admin=row[1] == 1)
+    identity_cache.put(principal, 'db')
+    return principal
+
+
+def invalidate_user(user_id: int):
+    """
+    Forget everything cached about a user after it changes.
+
+    Inside a request the change isn't visible to other requests until the
+    unit of work commits, and one resolving the user before then would
+    cache the old row again, so the invalidation waits for the commit.
+    """
+    unit = get_unit_of_work()
+    if unit is not None and unit.conn is not None and unit.conn.in_transaction:
+        unit.after_commit(lambda: identity_cache.invalidate(user_id))
+    else:
+        identity_cache.invalidate(user_id)
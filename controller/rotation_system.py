@@ -1,35 +1,74 @@
-from flask import jsonify
+from flask import Response, jsonify
 from datetime import datetime, timedelta, timezone
 
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
+from model.design import DesignDAO
+from model.display_channel import DEFAULT_CHANNEL_ID, DisplayChannelDAO
+from model.frame import FRAME_FORMAT, FRAME_HEIGHT, FRAME_WIDTH
 from model.rotation_system import RotationSystemDAO
+from services.frame_prefetcher import frame_prefetcher
+from services.frame_transport import frame_transports
+from services.rotation_broadcaster import rotation_broadcasters
+from services.rotation_engine import rotation_engine
+from services.rotation_timeline import DEFAULT_TIMELINE_COUNT, MAX_TIMELINE_COUNT, forecast
 from utilities.validators import validate_required_fields
+from controller.design import thumbnail_url
 from controller.user import User
 
 class RotationSystem:
     """
     Handler for image rotation operations.
     Sits between the routes and the DAO layer.
+    Works on one display channel; items and schedules are addressed by their own IDs.
     """
     
-    def __init__(self, email=None, json_data=None):
-        """Initialize the handler with user email and request data."""
+    def __init__(self, email=None, json_data=None, channel_id=DEFAULT_CHANNEL_ID):
+        """Initialize the handler with user email, request data and the channel to work on."""
         self.email = email
         if email:
             self.user = User(email=email)
         self.json_data = json_data
-        self.dao = RotationSystemDAO()
+        self.channel_id = channel_id
+        self.dao = RotationSystemDAO(channel_id=channel_id)
     
-    def get_current_image(self):
-        """Get the currently active image."""
+    def _missing_channel(self):
+        """Error response if the channel doesn't exist, None if it does."""
+        if DisplayChannelDAO().get_channel(self.channel_id) is None:
+            return jsonify({"error": f"Channel {self.channel_id} not found"}), 404
+        return None
+    
+    def _rotation_etag(self):
+        """ETag for the channel's current rotation state version."""
+        return f"rotation-{self.channel_id}-{self.dao.get_rotation_version()}"
+
+    def _with_etag(self, response, etag, weak=False):
+        response.set_etag(etag, weak=weak)
+        # Let clients keep the body but always revalidate it
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    def _not_modified(self, etag, weak=False):
+        return self._with_etag(Response(status=304), etag, weak)
+
+    def get_current_image(self, if_none_match=None, include_pixels=True):
+        """
+        Get the currently active image.
+        The ETag is weak because time_left keeps changing while the state doesn't.
+        """
         try:
-            active_image = self.dao.get_active_image()
+            etag = self._rotation_etag()
+            if if_none_match is not None and if_none_match.contains_weak(etag):
+                return self._not_modified(etag, weak=True)
+            
+            active_image = self.dao.get_active_image(include_pixels=include_pixels)
             if not active_image:
                 return jsonify({"error": "No active image"}), 404
             
-            # Calculate time left
-            time_left = self.dao.get_time_left_for_current()
+            # Calculate time left, from memory when the rotation engine is running
+            time_left = rotation_engine.time_left(active_image['item_id'], self.channel_id)
+            if time_left is None:
+                time_left = self.dao.get_time_left_for_current()
             
             # Add time_left to the response
             response = {
@@ -37,11 +76,108 @@ class RotationSystem:
                 "time_left": time_left
             }
             
-            return jsonify(response), 200
+            return self._with_etag(jsonify(response), etag, weak=True), 200
             
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
+    def get_current_frame(self, if_none_match=None):
+        """
+        Get the active design as a packed frame for the LED board.
+        The body is raw RGB888 bytes; the design and frame version are in headers.
+        """
+        try:
+            # Normally already prefetched, then no query is needed at all
+            prefetched = frame_prefetcher.current(self.channel_id)
+            if prefetched:
+                etag = f"frame-{prefetched['design_id']}-{prefetched['frame_version']}"
+                if if_none_match is not None and if_none_match.contains(etag):
+                    return self._frame_headers(self._not_modified(etag), prefetched)
+                response = Response(prefetched['frame'], mimetype='application/octet-stream')
+                return self._frame_headers(self._with_etag(response, etag), prefetched), 200
+
+            info = self.dao.get_active_frame_info()
+            if not info:
+                return jsonify({"error": "No active image"}), 404
+
+            design_id = info['design_id']
+            if info['frame_version'] is not None:
+                etag = f"frame-{design_id}-{info['frame_version']}"
+                if if_none_match is not None and if_none_match.contains(etag):
+                    return self._frame_headers(self._not_modified(etag), info)
+
+            frame = DesignDAO().get_frame(design_id)
+            if frame is None:
+                return jsonify({"error": "No active image"}), 404
+
+            info['frame_version'], body = frame
+            response = Response(body, mimetype='application/octet-stream')
+            etag = f"frame-{design_id}-{info['frame_version']}"
+            return self._frame_headers(self._with_etag(response, etag), info), 200
+
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    def get_frame_packets(self, since=None, checksum=None):
+        """
+        Get the frame packets that bring an LED controller up to date.
+
+        Args:
+            since: Seq of the last packet the controller applied
+            checksum: Hex CRC32 of the frame it shows, as sent in that packet
+        """
+        try:
+            try:
+                checksum = int(checksum, 16) if checksum else None
+            except ValueError:
+                checksum = None
+
+            missing = self._missing_channel()
+            if missing:
+                return missing
+
+            result = frame_transports.get(self.channel_id).packets_since(since, checksum)
+            if result is None:
+                return jsonify({"error": "No active image"}), 404
+
+            data, seq, info = result
+            response = Response(data, mimetype='application/octet-stream') if data else Response(status=204)
+            response.headers['X-Frame-Seq'] = str(seq)
+            response.headers['Cache-Control'] = 'no-store'
+            return self._frame_headers(response, info)
+
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    def _frame_headers(self, response, info):
+        response.headers['X-Design-Id'] = str(info['design_id'])
+        response.headers['X-Frame-Version'] = str(info['frame_version'])
+        response.headers['X-Frame-Format'] = f"{FRAME_FORMAT};{FRAME_WIDTH}x{FRAME_HEIGHT}"
+        time_left = rotation_engine.time_left(info['item_id'], self.channel_id)
+        if time_left is not None:
+            # Lets the board sleep until the next switch instead of polling
+            response.headers['X-Time-Left'] = f"{time_left:.3f}"
+        return response
+
+    def stream(self, last_event_id=None):
+        """Stream rotation changes to the client as Server-Sent Events."""
+        if self.email is None:
+            return jsonify(error="Unauthorized. No token."), 401
+
+        missing = self._missing_channel()
+        if missing:
+            return missing
+
+        return Response(
+            rotation_broadcasters.get(self.channel_id).open_stream(last_event_id),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                # Don't let a reverse proxy hold events back
+                'X-Accel-Buffering': 'no'
+            }
+        )
+    
     def add_unscheduled_image(self):
         """Add an unscheduled image to the rotation queue."""
         try:
@@ -74,12 +210,17 @@ class RotationSystem:
                     "error": "Duration must be an integer of at least 30 seconds"
                 }), 400
 
+            missing = self._missing_channel()
+            if missing:
+                return missing
+
             # Add to rotation queue
             item_id = self.dao.add_unscheduled_image(design_id, end_time, duration, override_current)
             
             return jsonify({
                 "success": True,
                 "item_id": item_id,
+                "channel_id": self.channel_id,
                 "message": f"Image with design ID {design_id} added to rotation"
             }), 201
             
@@ -135,7 +276,11 @@ class RotationSystem:
                     "error": "Duration must be an integer of at least 30 seconds"
                 }), 400
             
-            # Check for duplicate start times at minute precision
+            missing = self._missing_channel()
+            if missing:
+                return missing
+            
+            # Check for duplicate start times at minute precision, on this channel
             existing_scheduled = self.dao.get_scheduled_items()
             
             # Check if any item has the same start time (at minute precision)
@@ -161,6 +306,7 @@ class RotationSystem:
             response = {
                 "success": True,
                 "schedule_id": schedule_id,
+                "channel_id": self.channel_id,
                 "message": f"Image with design ID {design_id} scheduled for {start_time.isoformat()}"
             }
             
@@ -228,8 +374,9 @@ class RotationSystem:
                     "error": f"Schedule with ID {schedule_id} not found"
                 }), 404
             
-            # Check for duplicate start times at minute precision, excluding this schedule
-            existing_scheduled = self.dao.get_scheduled_items()
+            # Check for duplicate start times at minute precision on the schedule's
+            # channel, excluding this schedule
+            existing_scheduled = self.dao.for_channel(existing_schedule['channel_id']).get_scheduled_items()
             
             # Check if any other item has the same start time (at minute precision)
             for item in existing_scheduled:
@@ -286,10 +433,10 @@ class RotationSystem:
 
         return jsonify(error="Unauthorized. No token."), 401
     
-    def rotate_to_next(self):
+    def rotate_to_next(self, include_pixels=True):
         """Manually rotate to the next image."""
         try:
-            new_active = self.dao.rotate_to_next()
+            new_active = self.dao.rotate_to_next(include_pixels=include_pixels)
             
             if new_active:
                 return jsonify({
@@ -305,21 +452,50 @@ class RotationSystem:
         except Exception as e:
             return jsonify({"error": str(e)}), 500
         
-    def get_all_items(self):
+    def get_all_items(self, if_none_match=None, include_pixels=True):
         """Get all items in the rotation queue."""
         try:
-            items = self.dao.get_all_rotation_items()
-            return jsonify({"items": items}), 200
+            etag = self._rotation_etag()
+            if if_none_match is not None and if_none_match.contains_weak(etag):
+                return self._not_modified(etag)
+            
+            items = self.dao.get_all_rotation_items(include_pixels=include_pixels)
+            return self._with_etag(jsonify({"items": items}), etag), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
-    def get_items_paginated(self, page, page_size):
+    def get_items_paginated(self, page, page_size, if_none_match=None, include_pixels=True):
         """Get paginated items from the rotation queue."""
         try:    
+            etag = self._rotation_etag()
+            if if_none_match is not None and if_none_match.contains_weak(etag):
+                return self._not_modified(etag)
+            
             # Get paginated items
-            result = self.dao.get_rotation_items_paginated(page, page_size)
+            result = self.dao.get_rotation_items_paginated(page, page_size, include_pixels=include_pixels)
             
-            return jsonify(result), 200
+            return self._with_etag(jsonify(result), etag), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    def get_timeline(self, count=DEFAULT_TIMELINE_COUNT, if_none_match=None):
+        """
+        Forecast the next count activations, from one read of the queue,
+        the active item and the pending schedules.
+        The ETag is weak because a lagging engine shifts the times, not the order.
+        """
+        try:
+            if count is None or not 1 <= count <= MAX_TIMELINE_COUNT:
+                return jsonify({"error": f"count must be between 1 and {MAX_TIMELINE_COUNT}"}), 400
+
+            etag = f"{self._rotation_etag()}-timeline-{count}"
+            if if_none_match is not None and if_none_match.contains_weak(etag):
+                return self._not_modified(etag, weak=True)
+
+            queue, active, schedules = self.dao.get_timeline_state()
+            result = forecast(queue, active, schedules, count, datetime.now(timezone.utc))
+
+            return self._with_etag(jsonify(result), etag, weak=True), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -384,13 +560,17 @@ class RotationSystem:
         next_day = start_time + timedelta(days=1)
         return next_day
 
-    def get_scheduled_items_paginated(self, page, page_size):
+    def get_scheduled_items_paginated(self, page, page_size, if_none_match=None, include_pixels=True):
         """Get paginated scheduled items."""
         try:    
+            etag = self._rotation_etag()
+            if if_none_match is not None and if_none_match.contains_weak(etag):
+                return self._not_modified(etag)
+            
             # Get paginated scheduled items
-            result = self.dao.get_scheduled_items_paginated(page, page_size)
+            result = self.dao.get_scheduled_items_paginated(page, page_size, include_pixels=include_pixels)
         
-            return jsonify(result), 200
+            return self._with_etag(jsonify(result), etag), 200
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
@@ -403,18 +583,19 @@ class RotationSystem:
             return jsonify({"error": str(e)}), 500
 
     @jwt_required()
-    def get_user_history(self):
+    def get_user_history(self, include_pixels=True):
         """
         Retrieve the rotation queue history for the authenticated user.
+        Without include_pixels each entry links a thumbnail instead of carrying pixel_data.
         """
         user_email = get_jwt_identity()
         # Fetch records from DAO
-        rows = self.dao.get_user_history(user_email)
+        rows = self.dao.get_user_history(user_email, include_pixels)
 
         # Transform to JSON-friendly format
         history = []
         for row in rows:
-            history.append({
+            entry = {
                 'history_id': row['history_id'],
                 'item_id': row['item_id'],
                 'created_at': row['created_at'],
@@ -423,8 +604,12 @@ class RotationSystem:
                 'expiry_time': row['expiry_time'],
                 'status': row['status'],
                 'title': row['title'],
-                'pixel_data': row['pixel_data'],
-            })
+            }
+            if include_pixels:
+                entry['pixel_data'] = row['pixel_data']
+            else:
+                entry['thumbnail_url'] = thumbnail_url(row['design_id'], row['frame_version'])
+            history.append(entry)
         return jsonify(history), 200
     
     def get_scheduled_item(self, schedule_id):
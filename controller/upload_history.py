@@ -2,6 +2,7 @@ import math
 
 from flask import jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from controller.design import thumbnail_url
 from model.upload_history import UploadHistoryDAO
 
 class UploadHistory:
@@ -65,8 +66,23 @@ class UploadHistory:
             return jsonify("Not Found"), 404
         return jsonify(f"Successfully deleted UploadHistory with ID {deleted_id}!"), 200
 
+    def make_list_json(self, tuples):
+        """Like make_json, but the last column is the frame version and becomes a thumbnail link."""
+        result = []
+        for t in tuples:
+            D = {
+                'history_id': t[0],
+                'design_id': t[1],
+                'attempt_time': t[2],
+                'status': t[3],
+                'title': t[4],
+                'thumbnail_url': thumbnail_url(t[1], t[5])
+            }
+            result.append(D)
+        return result
+
     @jwt_required()
-    def getAllUploadHistoryPaginated(self):
+    def getAllUploadHistoryPaginated(self, include_pixels=True):
         try:
             email = get_jwt_identity()
             page = int(request.args.get('page', 1))
@@ -74,8 +90,8 @@ class UploadHistory:
             dao = UploadHistoryDAO()
 
             total = dao.countByUserEmail(email)
-            rows = dao.getByUserEmailPaginated(email, page, size)
-            items = self.make_json(rows)
+            rows = dao.getByUserEmailPaginated(email, page, size, include_pixels)
+            items = self.make_json(rows) if include_pixels else self.make_list_json(rows)
             pages = math.ceil(total / size) if size > 0 else 0
 
             return jsonify({
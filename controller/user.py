@@ -13,7 +13,9 @@ from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+from controller.identity import invalidate_user, resolve_principal
 from model.temp_password import TempPasswordDAO
+from model.unit_of_work import flush_unit_of_work
 from model.user import UserDAO
 from model.verification_code import VerificationCodeDAO
 
@@ -108,16 +110,12 @@ class User:
             self.password = json_data.get("password", None)
 
     def is_admin(self) -> bool:
-        dao = UserDAO()
-        response = dao.get_admin_by_email(email=self.email)
+        principal = resolve_principal(self.email)
 
-        if response is None:  # User was not found
+        if principal is None:  # User was not found
             return False
 
-        if response == 1:
-            return True
-
-        return False
+        return principal.is_admin
 
     def is_email_verified(self) -> bool:
         dao = UserDAO()
@@ -173,16 +171,13 @@ class User:
 
     ## INTERNAL USE ##
     def get_user_id(self):
-        if self.email is not None:
-            model = UserDAO()
-            user_id = model.get_userid_by_email(self.email)
-            if user_id is not None:
-                return user_id
-            else:
-                return None
-        else:
+        principal = resolve_principal(self.email)
+
+        if principal is None:
             return None
 
+        return principal.user_id
+
     def add_new_user(self):
         """
 
@@ -267,6 +262,7 @@ class User:
 
         dao = UserDAO()
         response = dao.updateUserById(user_id, data)
+        invalidate_user(user_id)
         if not User:
             return jsonify("Not Found"), 404
         else:
@@ -281,6 +277,7 @@ class User:
     def deleteUserById(self, user_id):
         dao = UserDAO()
         user = dao.deleteUserById(user_id)
+        invalidate_user(user_id)
         if user:
             return jsonify("Not Found"), 404
         else:
@@ -288,8 +285,7 @@ class User:
 
     def generate_verification_code(self):
         verification_code = str(random.randint(100000, 999999))
-        user_dao = UserDAO()
-        user_id = user_dao.get_userid_by_email(self.email)
+        user_id = self.get_user_id()
         if user_id is not None:
             verification_code_dao = VerificationCodeDAO()
             response = verification_code_dao.add_new_verification_code(user_id, verification_code)
@@ -301,8 +297,7 @@ class User:
         if self.is_email_verified():
             return jsonify(error="User is already verified."), 400
 
-        user_dao = UserDAO()
-        user_id = user_dao.get_userid_by_email(self.email)
+        user_id = self.get_user_id()
 
         verification_code_dao = VerificationCodeDAO()
 
@@ -344,8 +339,7 @@ class User:
         return jsonify(error="Couldn't create new code"), 500
 
     def get_new_temp_password(self):
-        user_dao = UserDAO()
-        user_id = user_dao.get_userid_by_email(self.email)
+        user_id = self.get_user_id()
 
         if user_id is None:
             return jsonify(error="Couldn't find user"), 404
@@ -397,7 +391,7 @@ class User:
 
     def verify_email(self, json_data):
         user_dao = UserDAO()
-        user_id = user_dao.get_userid_by_email(self.email)
+        user_id = self.get_user_id()
 
         if user_id is None:
             return jsonify(error="Not a valid user."), 404
@@ -425,7 +419,7 @@ class User:
 
     def reset_password(self, password, new_password):
         user_dao = UserDAO()
-        user_id = user_dao.get_userid_by_email(self.email)
+        user_id = self.get_user_id()
 
         if user_id is None:
             return jsonify(error="Not a valid user"), 404
@@ -473,6 +467,9 @@ class User:
         return jsonify(message="Password has been reset"), 200
 
     def send_verification_email(self, verification_code):
+        # Don't hold the write lock while talking to Gmail
+        flush_unit_of_work()
+
         try:
             creds = load_credentials()
         except FileNotFoundError:
@@ -503,6 +500,9 @@ class User:
         return send_message
 
     def send_temp_password(self, temp_password):
+        # Don't hold the write lock while talking to Gmail
+        flush_unit_of_work()
+
         try:
             creds = load_credentials()
         except FileNotFoundError:
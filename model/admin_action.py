@@ -1,12 +1,11 @@
 import sqlite3
 
+from model.connection_pool import pool
+
 class AdminActionDAO:
 
     def __init__(self):
-        database_path = 'data.db'
-        print("Connecting to SQLite database at:", database_path)
-        self.conn = sqlite3.connect(database_path)
-        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn = pool.connect()
 
     def getAllAdminAction(self):
         cursor = self.conn.cursor()
@@ -34,11 +33,12 @@ class AdminActionDAO:
                    VALUES (?, ?, ?, ?, ?, ?, ?);"""
         cursor.execute(query, (user_id, target_user_id, target_design_id, target_queue_id,
                                action_type, action_details, timestamp))
+        action_id = cursor.lastrowid
         self.conn.commit()
 
         # Return the newly inserted record
-        query = "SELECT * FROM admin_action ORDER BY action_id DESC LIMIT 1;"
-        cursor.execute(query)
+        query = "SELECT * FROM admin_action WHERE action_id = ?;"
+        cursor.execute(query, (action_id,))
         result = cursor.fetchone()
         cursor.close()
         return result
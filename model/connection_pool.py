@@ -0,0 +1,247 @@
+import sqlite3
+import threading
+import time
+import weakref
+from typing import Dict, Optional
+
+from model.db_profile import DATABASE_PATH, profile_pragmas
+from model.pixel_codec import register_functions
+
+# Applied once, when the pool opens a connection. Connections are reused
+# afterwards, so DAOs no longer pay for these on every instantiation.
+DEFAULT_PRAGMAS = profile_pragmas()
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection handed out by a ConnectionPool.
+    close() gives the connection back to the pool instead of closing it,
+    so DAOs keep their usual open/close pattern. While a unit of work owns
+    the connection, commit() is deferred to the unit, and rollback() only
+    undoes what was written since the last commit(), as it would without one.
+    """
+
+    pool = None
+
+    def _owning_unit(self):
+        unit = self.pool.current_unit() if self.pool is not None else None
+        return unit if unit is not None and unit.conn is self else None
+
+    def commit(self):
+        unit = self._owning_unit()
+        if unit is not None:
+            unit.defer_commit()
+        else:
+            super().commit()
+
+    def rollback(self):
+        unit = self._owning_unit()
+        if unit is not None:
+            unit.rollback_uncommitted()
+        else:
+            super().rollback()
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+
+class _Lease:
+    """A connection pinned to one thread, with a re-entrancy depth."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.depth = 1
+        self.finalizer = None
+
+
+class ConnectionPool:
+    """
+    Thread-aware pool of SQLite connections.
+
+    A thread that asks for a connection keeps the same one until it releases
+    it as many times as it acquired it (or calls release_thread()), so every
+    DAO used while handling one request shares a single connection. Released
+    connections go back to an idle stack and are reused by the next thread.
+    """
+
+    def __init__(self, database_path: str = DATABASE_PATH, max_connections: int = 16,
+                 timeout: float = 30.0, pragmas=DEFAULT_PRAGMAS):
+        self.database_path = database_path
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.pragmas = tuple(pragmas)
+
+        self._idle = []
+        self._open_count = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'timeouts': 0,
+        }
+
+    def connect(self) -> PooledConnection:
+        """
+        Get the calling thread's connection, checking one out if needed.
+
+        Returns:
+            A connection that must be given back with close() or release()
+        """
+        lease = getattr(self._local, 'lease', None)
+        if lease is not None:
+            lease.depth += 1
+            with self._cond:
+                self._stats['hits'] += 1
+            return lease.conn
+
+        conn = self._checkout()
+        lease = _Lease(conn)
+        # If the thread dies without releasing, the lease is garbage collected
+        # and the connection still finds its way back to the pool.
+        lease.finalizer = weakref.finalize(lease, self._checkin, conn)
+        lease.finalizer.atexit = False
+        self._local.lease = lease
+
+        unit = self.current_unit()
+        if unit is not None:
+            # The unit holds its own reference until it ends
+            lease.depth += 1
+            unit.attach(conn)
+        return conn
+
+    def release(self, conn: Optional[sqlite3.Connection] = None):
+        """Undo one connect() made by the calling thread."""
+        lease = getattr(self._local, 'lease', None)
+        if lease is None or (conn is not None and lease.conn is not conn):
+            return
+
+        lease.depth -= 1
+        if lease.depth <= 0:
+            self._local.lease = None
+            lease.finalizer()
+
+    def bind_unit(self, unit):
+        """Route the calling thread's connection through a unit of work."""
+        self._local.unit = unit
+
+    def unbind_unit(self):
+        self._local.unit = None
+
+    def current_unit(self):
+        return getattr(self._local, 'unit', None)
+
+    def release_thread(self):
+        """Give the calling thread's connection back regardless of depth."""
+        lease = getattr(self._local, 'lease', None)
+        if lease is not None:
+            self._local.lease = None
+            lease.finalizer()
+
+    def close_all(self):
+        """Close every idle connection. Leased connections close on release."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open_count -= len(idle)
+            self._cond.notify_all()
+
+        for conn in idle:
+            sqlite3.Connection.close(conn)
+
+    def stats(self) -> Dict:
+        """Return a snapshot of the pool counters."""
+        with self._cond:
+            stats = dict(self._stats)
+            idle = len(self._idle)
+            open_count = self._open_count
+
+        requests = stats['hits'] + stats['misses']
+        stats['wait_time_ms'] = round(stats.pop('wait_time') * 1000, 3)
+        stats['hit_ratio'] = round(stats['hits'] / requests, 4) if requests else None
+        stats['open'] = open_count
+        stats['idle'] = idle
+        stats['in_use'] = open_count - idle
+        stats['max_connections'] = self.max_connections
+        return stats
+
+    def _checkout(self) -> PooledConnection:
+        started = None
+        with self._cond:
+            while not self._idle and self._open_count >= self.max_connections:
+                now = time.monotonic()
+                if started is None:
+                    started = now
+                    self._stats['waits'] += 1
+
+                remaining = self.timeout - (now - started)
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    self._stats['wait_time'] += now - started
+                    raise sqlite3.OperationalError("Connection pool exhausted")
+                self._cond.wait(remaining)
+
+            if started is not None:
+                self._stats['wait_time'] += time.monotonic() - started
+
+            if self._idle:
+                self._stats['hits'] += 1
+                return self._idle.pop()
+
+            # Reserve the slot before opening outside of the lock
+            self._open_count += 1
+            self._stats['misses'] += 1
+
+        try:
+            return self._open()
+        except sqlite3.Error:
+            with self._cond:
+                self._open_count -= 1
+                self._cond.notify()
+            raise
+
+    def _checkin(self, conn: PooledConnection):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Connection is unusable, drop it and free the slot
+            with self._cond:
+                self._open_count -= 1
+                self._cond.notify()
+            sqlite3.Connection.close(conn)
+            return
+
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def _open(self) -> PooledConnection:
+        conn = sqlite3.connect(self.database_path, check_same_thread=False,
+                               factory=PooledConnection)
+        conn.row_factory = sqlite3.Row  # Rows support both index and name access
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        register_functions(conn)
+        conn.pool = self
+        return conn
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database_path: str = DATABASE_PATH) -> ConnectionPool:
+    """Return the shared pool for a database file, creating it on first use."""
+    with _pools_lock:
+        if database_path not in _pools:
+            _pools[database_path] = ConnectionPool(database_path)
+        return _pools[database_path]
+
+
+# Shared pool for the application database
+pool = get_pool()
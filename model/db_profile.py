@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+DATABASE_PATH = 'data.db'
+
+# Runtime profile applied to every pooled connection.
+# WAL lets the rotation jobs write while request threads keep reading, and
+# synchronous=NORMAL is durable in WAL mode except for the last transactions
+# before a power loss (never corrupts the database).
+RUNTIME_PROFILE = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'foreign_keys': 'ON',
+    'busy_timeout': 5000,                # ms
+    'mmap_size': 64 * 1024 * 1024,       # bytes
+    'cache_size': -8192,                 # negative = KiB, ~8 MiB per connection
+    'temp_store': 'MEMORY',
+    # Backstop only; the scheduler's WalCheckpointer normally keeps the WAL small
+    'wal_autocheckpoint': 4000,          # pages
+}
+
+# WAL size above which the checkpointer truncates the file instead of
+# running a passive checkpoint.
+TRUNCATE_WAL_BYTES = 32 * 1024 * 1024
+
+# How often the scheduler runs the checkpoint policy
+CHECKPOINT_INTERVAL_SECONDS = 30
+
+
+def profile_pragmas(profile: Dict = None) -> Tuple[str, ...]:
+    """Build the PRAGMA statements for a runtime profile."""
+    if profile is None:
+        profile = RUNTIME_PROFILE
+    return tuple(f"PRAGMA {name} = {value}" for name, value in profile.items())
+
+
+class WalCheckpointer:
+    """
+    Checkpoint policy for the write-ahead log.
+
+    Runs a PASSIVE checkpoint on every call (never blocks readers or writers)
+    and escalates to TRUNCATE once the WAL file grows past truncate_bytes.
+    Uses its own connection so it never competes for a pooled one.
+    """
+
+    def __init__(self, database_path: str = DATABASE_PATH, truncate_bytes: int = TRUNCATE_WAL_BYTES):
+        self.database_path = database_path
+        self.truncate_bytes = truncate_bytes
+        self._conn = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'runs': 0,
+            'passive': 0,
+            'truncate': 0,
+            'busy': 0,
+            'errors': 0,
+            'last_mode': None,
+            'last_duration_ms': None,
+            'last_run_at': None,
+            'last_complete_at': None,
+            'log_frames': None,
+            'checkpointed_frames': None,
+        }
+
+    @property
+    def wal_path(self) -> str:
+        return self.database_path + '-wal'
+
+    def wal_size(self) -> int:
+        """Current size of the WAL file in bytes (0 if it doesn't exist)."""
+        try:
+            return os.path.getsize(self.wal_path)
+        except OSError:
+            return 0
+
+    def run(self) -> Optional[Dict]:
+        """
+        Apply the checkpoint policy once.
+
+        Returns:
+            Dict with the checkpoint result, or None if there was nothing to do
+        """
+        wal_bytes = self.wal_size()
+        if wal_bytes == 0:
+            return None
+
+        mode = 'TRUNCATE' if wal_bytes >= self.truncate_bytes else 'PASSIVE'
+        started = time.perf_counter()
+
+        with self._lock:
+            try:
+                conn = self._get_connection()
+                busy, log_frames, checkpointed = conn.execute(
+                    f"PRAGMA wal_checkpoint({mode})"
+                ).fetchone()
+            except sqlite3.Error as e:
+                self._stats['errors'] += 1
+                print(f"WAL checkpoint failed: {e}")
+                return None
+
+            now = datetime.now(timezone.utc)
+            self._stats['runs'] += 1
+            self._stats[mode.lower()] += 1
+            self._stats['busy'] += 1 if busy else 0
+            self._stats['last_mode'] = mode
+            self._stats['last_duration_ms'] = round((time.perf_counter() - started) * 1000, 3)
+            self._stats['last_run_at'] = now
+            self._stats['log_frames'] = log_frames
+            self._stats['checkpointed_frames'] = checkpointed
+            if not busy and log_frames == checkpointed:
+                self._stats['last_complete_at'] = now
+
+            return {
+                'mode': mode,
+                'busy': bool(busy),
+                'log_frames': log_frames,
+                'checkpointed_frames': checkpointed,
+            }
+
+    def stats(self) -> Dict:
+        """Return WAL size and checkpoint lag for diagnostics."""
+        with self._lock:
+            stats = dict(self._stats)
+
+        lag_frames = None
+        if stats['log_frames'] is not None and stats['log_frames'] >= 0:
+            lag_frames = stats['log_frames'] - stats['checkpointed_frames']
+
+        lag_seconds = None
+        if stats['last_complete_at'] is not None:
+            lag_seconds = round((datetime.now(timezone.utc) - stats['last_complete_at']).total_seconds(), 3)
+
+        for key in ('last_run_at', 'last_complete_at'):
+            if stats[key] is not None:
+                stats[key] = stats[key].isoformat()
+
+        stats['wal_bytes'] = self.wal_size()
+        stats['lag_frames'] = lag_frames
+        stats['lag_seconds'] = lag_seconds
+        stats['truncate_bytes'] = self.truncate_bytes
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.database_path, check_same_thread=False)
+            self._conn.execute(f"PRAGMA busy_timeout = {RUNTIME_PROFILE['busy_timeout']}")
+        return self._conn
+
+
+# Shared checkpointer for the application database
+checkpointer = WalCheckpointer()
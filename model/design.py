@@ -1,17 +1,34 @@
 import sqlite3
+import time
+from typing import Dict, Optional, Tuple
+
+from model.connection_pool import pool
+from model.frame import compile_frame, patch_frame
+from model.pixel_codec import compile_packed_frame, is_packed, pack_pixels, payload_hash
+from model.rotation_events import notify
+
+# The pixel_data of the design aliased d, as the JSON text clients expect
+PIXEL_DATA_COLUMN = "pixel_json((SELECT dp.pixel_data FROM design_payload dp WHERE dp.payload_hash = d.payload_hash))"
+# Design rows as clients know them, pixel_data in its old place after the title
+DESIGN_COLUMNS = (
+    f"d.design_id, d.user_id, d.title, {PIXEL_DATA_COLUMN} AS pixel_data, d.is_approved, d.status, "
+    "d.created_at, d.updated_at"
+)
+# Everything but pixel_data, for list views
+LIST_COLUMNS = (
+    "d.design_id, d.user_id, d.title, d.is_approved, d.status, d.created_at, d.updated_at, "
+    "df.version AS frame_version"
+)
 
 
 class DesignDAO:
 
     def __init__(self):
-        database_path = 'data.db'
-
-        self.conn = sqlite3.connect(database_path)
-        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn = pool.connect()
 
     def get_design_by_id(self, design_id: int):
         cursor = self.conn.cursor()
-        query = "SELECT * FROM design WHERE design_id = ?;"
+        query = f"SELECT {DESIGN_COLUMNS} FROM design d WHERE d.design_id = ?;"
         try:
             cursor.execute(query, (design_id,))
             result = cursor.fetchone()
@@ -33,27 +50,40 @@ class DesignDAO:
         finally:
             cursor.close()
 
-    def get_designs_by_id(self, user_id: int, page: int, page_size: int):
+    def get_designs_by_id(self, user_id: int, page_size: int, after: Optional[Tuple[str, int]] = None,
+                          offset: int = 0, include_pixels: bool = True):
+        """
+        One page of a user's designs, most recently updated first.
+
+        A page is a range of idx_design_gallery. Starting after the
+        (updated_at, design_id) of the previous page's last design costs the
+        same however deep the page is; skipping offset designs doesn't.
+
+        Without include_pixels, pixel_data is left out and each design's
+        frame_version is returned so the caller can link a thumbnail.
+
+        Returns:
+            (designs, whether more follow), None on errors
+        """
         cursor = self.conn.cursor()
-        query = """
-                SELECT d.*,
-                       CASE WHEN rq.design_id IS NOT NULL THEN 1 ELSE 0 END AS is_in_queue,
-                       CASE WHEN si.design_id IS NOT NULL THEN 1 ELSE 0 END AS is_scheduled
+        query = f"""
+                SELECT {DESIGN_COLUMNS if include_pixels else LIST_COLUMNS},
+                       EXISTS (SELECT 1 FROM rotation_queue rq WHERE rq.design_id = d.design_id) AS is_in_queue,
+                       EXISTS (SELECT 1 FROM scheduled_items si WHERE si.design_id = d.design_id) AS is_scheduled
                 FROM design d
-                         LEFT JOIN rotation_queue rq ON d.design_id = rq.design_id
-                         LEFT JOIN scheduled_items si ON d.design_id = si.design_id
-                WHERE d.user_id = ?
-                GROUP BY d.design_id
-                ORDER BY d.updated_at DESC
-                LIMIT ? OFFSET ?; \
+                         LEFT JOIN design_frame df ON d.design_id = df.design_id
+                WHERE d.user_id = ? {"AND (d.updated_at, d.design_id) < (?, ?)" if after else ""}
+                ORDER BY d.updated_at DESC, d.design_id DESC
+                LIMIT ? OFFSET ?
                 """
 
         try:
-            cursor.execute(query, (user_id, page_size, (page - 1) * page_size))
+            # One extra row tells whether there's a next page
+            cursor.execute(query, (user_id, *(after or ()), page_size + 1, offset))
             columns = [col[0] for col in cursor.description]
             rows = cursor.fetchall()
-            result = [dict(zip(columns, row)) for row in rows]
-            return result
+            result = [dict(zip(columns, row)) for row in rows[:page_size]]
+            return result, len(rows) > page_size
         except sqlite3.Error:
             return None
         finally:
@@ -77,17 +107,30 @@ class DesignDAO:
             cursor.close()
 
     def add_new_design(self, user_id, title, pixel_data):
+        """
+        Returns the new design_id, -2 if the user already has this drawing
+        under this title (or the insert hit a constraint), -1 on other errors.
+        The codes are negative so they can't be mistaken for a design_id.
+        """
         cursor = self.conn.cursor()
-        query = "INSERT INTO design (user_id, title, pixel_data) VALUES (?, ?, ?);"
+        query = "INSERT INTO design (user_id, title, payload_hash) VALUES (?, ?, ?);"
+        digest = payload_hash(pixel_data)
         try:
-            cursor.execute(query, (user_id, title, pixel_data))
-            self.conn.commit()
+            cursor.execute("SELECT 1 FROM design WHERE payload_hash = ? AND user_id = ? AND title = ?",
+                           (digest, user_id, title))
+            if cursor.fetchone():
+                return -2
+
+            stored = self._store_payload(cursor, digest, pixel_data)
+            cursor.execute(query, (user_id, title, digest))
             new_id = cursor.lastrowid
+            self._store_frame(cursor, new_id, stored)
+            self.conn.commit()
             return new_id
         except sqlite3.IntegrityError:
-            return 2
+            return -2
         except sqlite3.Error:
-            return 1
+            return -1
         finally:
             cursor.close()
 
@@ -109,11 +152,17 @@ class DesignDAO:
     def update_design_image(self, design_id: int, pixel_data):
         status = 1
         cursor = self.conn.cursor()
-        query = "UPDATE design SET pixel_data = ?, updated_at = CURRENT_TIMESTAMP WHERE design_id = ?"
+        query = "UPDATE design SET payload_hash = ?, updated_at = CURRENT_TIMESTAMP WHERE design_id = ?"
+        digest = payload_hash(pixel_data)
 
         try:
-            cursor.execute(query, (pixel_data, design_id))
+            stored = self._store_payload(cursor, digest, pixel_data)
+            # Triggers move the references over and drop the old payload if nothing else uses it
+            cursor.execute(query, (digest, design_id))
+            if cursor.rowcount:
+                self._store_frame(cursor, design_id, stored)
             self.conn.commit()
+            notify('design_changed', design_id=design_id)
             status = 0
         except sqlite3.Error:
             status = 1
@@ -121,6 +170,185 @@ class DesignDAO:
             cursor.close()
             return status
 
+    def get_design_payload(self, design_id: int):
+        """
+        What a patch is applied to: (user_id, payload_hash, stored pixel_data,
+        frame version, frame), the last two None if the frame was never
+        compiled. None if the design doesn't exist.
+        """
+        cursor = self.conn.cursor()
+        query = """
+                SELECT d.user_id, d.payload_hash, dp.pixel_data, df.version, df.frame
+                FROM design d
+                         JOIN design_payload dp ON dp.payload_hash = d.payload_hash
+                         LEFT JOIN design_frame df ON df.design_id = d.design_id
+                WHERE d.design_id = ?
+                """
+        try:
+            cursor.execute(query, (design_id,))
+            row = cursor.fetchone()
+            return tuple(row) if row else None
+        except sqlite3.Error:
+            return None
+        finally:
+            cursor.close()
+
+    def patch_design_image(self, design_id: int, old_hash: bytes, digest: bytes, packed: bytes,
+                           changed: Dict[int, Optional[str]], frame: Optional[bytes] = None) -> int:
+        """
+        Move a design to its patched pixels, if it still has the ones the
+        patch was applied to.
+
+        Args:
+            design_id: Design to update
+            old_hash: payload_hash the patch was applied to
+            digest: payload_hash of the patched pixel_data
+            packed: The patched pixel_data, packed
+            changed: Cells the patch changed
+            frame: The design's current frame, patched instead of compiling a new one
+
+        Returns:
+            The new frame version, -2 if the design changed in the meantime, -1 on errors
+        """
+        cursor = self.conn.cursor()
+        query = """
+                UPDATE design SET payload_hash = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE design_id = ? AND payload_hash = ?
+                """
+        try:
+            self._store_payload(cursor, digest, packed)
+            cursor.execute(query, (digest, design_id, old_hash))
+            if cursor.rowcount == 0:
+                self.conn.rollback()
+                return -2
+
+            version = self._store_frame(cursor, design_id, packed,
+                                        patch_frame(frame, changed) if frame is not None else None)
+            self.conn.commit()
+            notify('design_changed', design_id=design_id)
+            return version
+        except sqlite3.Error:
+            return -1
+        finally:
+            cursor.close()
+
+    def get_frame(self, design_id: int) -> Optional[Tuple[int, bytes]]:
+        """
+        Return (version, frame) for a design, compiling the frame first if it
+        was never stored. None if the design doesn't exist.
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("SELECT version, frame FROM design_frame WHERE design_id = ?", (design_id,))
+            row = cursor.fetchone()
+            if row:
+                return row[0], row[1]
+
+            cursor.execute("""
+                           SELECT dp.pixel_data
+                           FROM design d
+                           JOIN design_payload dp ON dp.payload_hash = d.payload_hash
+                           WHERE d.design_id = ?
+                           """, (design_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+
+            frame = self._compile(row[0])
+            version = self._store_frame(cursor, design_id, row[0], frame)
+            self.conn.commit()
+            notify('design_changed', design_id=design_id)
+            return version, frame
+        except sqlite3.Error:
+            return None
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _store_frame(cursor, design_id: int, pixel_data, frame: Optional[bytes] = None) -> int:
+        """Compile (unless given) and store a design's frame, bumping its version. Returns the version."""
+        cursor.execute("""
+                       INSERT INTO design_frame (design_id, version, frame)
+                       VALUES (?, 1, ?)
+                       ON CONFLICT (design_id) DO UPDATE
+                           SET version    = version + 1,
+                               frame      = excluded.frame,
+                               updated_at = CURRENT_TIMESTAMP
+                       RETURNING version
+                       """, (design_id, frame if frame is not None else DesignDAO._compile(pixel_data)))
+        return cursor.fetchone()[0]
+
+    @staticmethod
+    def _store_payload(cursor, digest: bytes, pixel_data: str):
+        """
+        Make sure the payload with this hash exists, packing pixel_data (if
+        it isn't already) only if it's new. Returns the payload as stored.
+        """
+        cursor.execute("SELECT pixel_data FROM design_payload WHERE payload_hash = ?", (digest,))
+        row = cursor.fetchone()
+        if row:
+            return row[0]
+
+        stored = pack_pixels(pixel_data)
+        size = len(stored) if isinstance(stored, bytes) else len(stored.encode('utf-8'))
+        cursor.execute("INSERT INTO design_payload (payload_hash, pixel_data, size) VALUES (?, ?, ?)",
+                       (digest, stored, size))
+        return stored
+
+    @staticmethod
+    def _compile(pixel_data) -> bytes:
+        """Compile pixel_data into a frame in whichever form it's stored."""
+        return compile_packed_frame(pixel_data) if is_packed(pixel_data) else compile_frame(pixel_data)
+
+    def pack_payload_batch(self, after_hash: bytes = b'', batch_size: int = 200) -> Tuple[int, Optional[bytes]]:
+        """
+        Repack one batch of payloads still stored as JSON text, in its own
+        short transaction so requests keep getting the database in between.
+
+        Only the storage changes: the hash, frames and rotation versions stay
+        as they are, and a trigger moves the owners' ledger to the new size.
+        Payloads that can't be packed are left as text and skipped by
+        continuing after the last hash.
+
+        Args:
+            after_hash: Only look at payloads with a higher hash
+            batch_size: Most payloads to look at in this batch
+
+        Returns:
+            (payloads packed, last hash looked at), the hash is None once none are left
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("""
+                           SELECT payload_hash, pixel_data
+                           FROM design_payload
+                           WHERE typeof(pixel_data) = 'text'
+                             AND payload_hash > ?
+                           ORDER BY payload_hash
+                           LIMIT ?
+                           """, (after_hash, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                return 0, None
+
+            packed = []
+            for digest, pixel_data in rows:
+                stored = pack_pixels(pixel_data)
+                if is_packed(stored):
+                    packed.append((stored, len(stored), digest))
+
+            cursor.executemany("""
+                               UPDATE design_payload SET pixel_data = ?, size = ?
+                               WHERE payload_hash = ? AND typeof(pixel_data) = 'text'
+                               """, packed)
+            self.conn.commit()
+            return cursor.rowcount, rows[-1][0]
+        except sqlite3.Error:
+            self.conn.rollback()
+            return 0, None
+        finally:
+            cursor.close()
+
     def update_design_approval(self, design_id: int, is_approved: int):
         status = 1
         cursor = self.conn.cursor()
@@ -160,6 +388,9 @@ class DesignDAO:
             self.conn.commit()
             if cursor.rowcount == 0:
                 return 1  # No row deleted
+            # Deleting cascades to the rotation queue and schedules; triggers release
+            # the payload and delete it once no design uses it
+            notify('design_deleted', design_id=design_id)
             return 0
         except sqlite3.Error:
             return 1
@@ -168,7 +399,7 @@ class DesignDAO:
 
     def getApprovedDesigns(self):
         cursor = self.conn.cursor()
-        query = "SELECT * FROM design WHERE is_approved = 1;"
+        query = f"SELECT {DESIGN_COLUMNS} FROM design d WHERE d.is_approved = 1;"
         try:
             cursor.execute(query)
             result = []
@@ -180,26 +411,29 @@ class DesignDAO:
         finally:
             cursor.close()
 
-    def get_bytes_by_userid(self, user_id):
-        cursor = self.conn.cursor()
-        query = "SELECT SUM(LENGTH(pixel_data)) AS bytes FROM design WHERE user_id = ?;"
-        try:
-            cursor.execute(query, (user_id,))
-            result = cursor.fetchone()
-            return result[0] if result and result[0] is not None else 0
-        except sqlite3.Error:
-            return -1
-        finally:
-            cursor.close()
 
-    def get_design_bytes(self, design_id, user_id):
-        cursor = self.conn.cursor()
-        query = "SELECT LENGTH(pixel_data) FROM design WHERE design_id = ? AND user_id = ?"
-        try:
-            cursor.execute(query, (design_id, user_id))
-            result = cursor.fetchone()
-            return result[0] if result and result[0] is not None else 0
-        except sqlite3.Error:
-            return -1
-        finally:
-            cursor.close()
+# Legacy payloads repacked per transaction, and the pause that lets requests write in between
+PACK_BATCH_SIZE = 200
+PACK_BATCH_PAUSE = 0.05
+
+
+def pack_legacy_designs() -> int:
+    """
+    Repack every design payload still stored as JSON text, one batch at a
+    time. Runs once in the background after startup. Returns how many were packed.
+    """
+    dao = DesignDAO()
+    packed = 0
+    after_hash = b''
+    try:
+        while after_hash is not None:
+            count, after_hash = dao.pack_payload_batch(after_hash, PACK_BATCH_SIZE)
+            packed += count
+            if after_hash is not None:
+                time.sleep(PACK_BATCH_PAUSE)
+    finally:
+        dao.conn.close()
+
+    if packed:
+        print(f"Packed pixel_data of {packed} legacy design payloads")
+    return packed
@@ -0,0 +1,132 @@
+import sqlite3
+from typing import Dict, List, Optional
+
+from model.connection_pool import get_pool
+from model.rotation_events import notify
+
+# The channel every pre-channel queue item belongs to, and the one used
+# when a request doesn't name a channel
+DEFAULT_CHANNEL_ID = 1
+
+
+class DisplayChannelDAO:
+    """
+    Data Access Object for display channels.
+    Each channel drives one LED board with its own queue, schedule and active item.
+    """
+
+    def __init__(self, db_path='data.db'):
+        """Initialize the DAO with the database path."""
+        self.db_path = db_path
+
+    def _get_connection(self):
+        return get_pool(self.db_path).connect()
+
+    def get_all_channels(self) -> List[Dict]:
+        """
+        Get every channel with its queue length and active item.
+
+        Returns:
+            List of dicts with channel_id, name, created_at, item_count and active_item_id
+        """
+        conn = self._get_connection()
+        cur = conn.cursor()
+
+        try:
+            cur.execute("""
+            SELECT c.channel_id, c.name, c.created_at,
+                   (SELECT COUNT(*) FROM rotation_queue rq WHERE rq.channel_id = c.channel_id) AS item_count,
+                   ai.item_id AS active_item_id
+            FROM display_channel c
+            LEFT JOIN active_item ai ON ai.id = c.channel_id
+            ORDER BY c.channel_id ASC
+            """)
+            return [dict(row) for row in cur.fetchall()]
+
+        finally:
+            cur.close()
+            conn.close()
+
+    def get_channel_ids(self) -> List[int]:
+        """Get the id of every channel."""
+        conn = self._get_connection()
+        cur = conn.cursor()
+
+        try:
+            cur.execute("SELECT channel_id FROM display_channel ORDER BY channel_id ASC")
+            return [row['channel_id'] for row in cur.fetchall()]
+
+        finally:
+            cur.close()
+            conn.close()
+
+    def get_channel(self, channel_id: int) -> Optional[Dict]:
+        """
+        Get a channel by ID.
+
+        Returns:
+            Dict with channel_id, name and created_at, or None if not found
+        """
+        conn = self._get_connection()
+        cur = conn.cursor()
+
+        try:
+            cur.execute("SELECT channel_id, name, created_at FROM display_channel WHERE channel_id = ?",
+                        (channel_id,))
+            row = cur.fetchone()
+            return dict(row) if row else None
+
+        finally:
+            cur.close()
+            conn.close()
+
+    def add_channel(self, name: str) -> Optional[int]:
+        """
+        Create a channel. Its active item row is created by a trigger.
+
+        Returns:
+            The new channel's ID, or None if the name is taken
+        """
+        conn = self._get_connection()
+        cur = conn.cursor()
+
+        try:
+            cur.execute("INSERT INTO display_channel (name) VALUES (?)", (name,))
+            channel_id = cur.lastrowid
+            conn.commit()
+            notify('channel_added', channel_id=channel_id)
+            return channel_id
+
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            return None
+
+        finally:
+            cur.close()
+            conn.close()
+
+    def remove_channel(self, channel_id: int) -> bool:
+        """
+        Delete a channel together with its queue, schedule and active item.
+        The default channel can't be removed.
+
+        Returns:
+            Success status
+        """
+        if channel_id == DEFAULT_CHANNEL_ID:
+            return False
+
+        conn = self._get_connection()
+        cur = conn.cursor()
+
+        try:
+            cur.execute("DELETE FROM display_channel WHERE channel_id = ?", (channel_id,))
+            success = cur.rowcount > 0
+            conn.commit()
+            if success:
+                notify('channel_removed', channel_id=channel_id)
+            return success
+
+        finally:
+            cur.close()
+            conn.close()
@@ -0,0 +1,90 @@
+"""
+Packed frame buffers for the 64x64 LED board.
+
+A frame is FRAME_WIDTH x FRAME_HEIGHT pixels stored row by row from the
+top-left corner, three bytes (R, G, B) per pixel: 12,288 bytes in total.
+"""
+import json
+import string
+from typing import Dict, Optional, Tuple
+
+FRAME_WIDTH = 64
+FRAME_HEIGHT = 64
+BYTES_PER_PIXEL = 3
+FRAME_SIZE = FRAME_WIDTH * FRAME_HEIGHT * BYTES_PER_PIXEL
+FRAME_FORMAT = 'rgb888'
+
+# pixel_data keys are editor canvas coordinates, CELL_SIZE units per board pixel
+CELL_SIZE = 8
+# The web renderer draws colors it can't parse in magenta, so does the board
+INVALID_COLOR = (0xFF, 0x00, 0xFF)
+
+
+def parse_color(color) -> Optional[Tuple[int, int, int]]:
+    """Parse '#rrggbb' or '#rgb' into an (r, g, b) tuple, None if it isn't one."""
+    if not isinstance(color, str) or not color.startswith('#'):
+        return None
+
+    digits = color[1:]
+    if len(digits) == 3:
+        digits = ''.join(digit * 2 for digit in digits)
+    if len(digits) != 6 or not all(digit in string.hexdigits for digit in digits):
+        return None
+
+    value = int(digits, 16)
+    return value >> 16, (value >> 8) & 0xFF, value & 0xFF
+
+
+def compile_frame(pixel_data) -> bytes:
+    """
+    Compile pixel_data ({"x,y": "#rrggbb"} as JSON text or a dict) into a packed frame.
+
+    Unset pixels are black. Entries with malformed keys or keys outside the
+    board are skipped, so this never fails on bad input.
+    """
+    if isinstance(pixel_data, (str, bytes)):
+        try:
+            pixel_data = json.loads(pixel_data)
+        except ValueError:
+            pixel_data = {}
+    if not isinstance(pixel_data, dict):
+        pixel_data = {}
+
+    frame = bytearray(FRAME_SIZE)
+    # Designs use a handful of colors, parse each one once
+    colors = {}
+    for key, color in pixel_data.items():
+        try:
+            x, y = (int(value) for value in key.split(','))
+        except (ValueError, AttributeError):
+            continue
+
+        column, row = x // CELL_SIZE, y // CELL_SIZE
+        if not (0 <= column < FRAME_WIDTH and 0 <= row < FRAME_HEIGHT):
+            continue
+
+        offset = (row * FRAME_WIDTH + column) * BYTES_PER_PIXEL
+        if not isinstance(color, str):
+            color = None
+        rgb = colors.get(color)
+        if rgb is None:
+            rgb = colors[color] = bytes(parse_color(color) or INVALID_COLOR)
+        frame[offset:offset + BYTES_PER_PIXEL] = rgb
+
+    return bytes(frame)
+
+
+def patch_frame(frame: bytes, cells: Dict[int, Optional[str]]) -> bytes:
+    """
+    Recolor some cells of a compiled frame, as compile_frame would have.
+
+    Args:
+        frame: The frame to start from
+        cells: Board cell (row * FRAME_WIDTH + column) to its new color, None to clear it
+    """
+    patched = bytearray(frame)
+    for cell, color in cells.items():
+        offset = cell * BYTES_PER_PIXEL
+        rgb = bytes(BYTES_PER_PIXEL) if color is None else bytes(parse_color(color) or INVALID_COLOR)
+        patched[offset:offset + BYTES_PER_PIXEL] = rgb
+    return bytes(patched)
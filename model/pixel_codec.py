@@ -0,0 +1,237 @@
+"""
+Packed storage format for design pixel_data.
+
+Clients send and receive pixel_data as JSON text ({"x,y": "#rrggbb"}, keys
+in editor canvas coordinates), which costs about 20 bytes per pixel. Designs
+drawn on the board's grid are stored instead as a palette of the colors they
+use plus run-length encoded palette indexes over the 64x64 board:
+
+    MAGIC, FORMAT_VERSION
+    uvarint palette size, then per color: uvarint byte length, UTF-8 text
+    (uvarint run length, uvarint index) until all 4096 cells are covered;
+    index 0 is an unset cell, index i is palette[i - 1]
+
+Colors are kept as the exact strings the client sent, so unpacking gives
+back the same object. pixel_data that doesn't fit the grid (keys off the
+board or not on a cell corner, non-string colors) stays JSON text, and
+design_payload.pixel_data holds either form.
+"""
+import hashlib
+import json
+import sqlite3
+from typing import Dict, List, Optional, Tuple, Union
+
+from model.frame import (BYTES_PER_PIXEL, CELL_SIZE, FRAME_HEIGHT, FRAME_SIZE, FRAME_WIDTH,
+                         INVALID_COLOR, parse_color)
+
+# 0x89 never starts UTF-8 text, so a packed value can't be mistaken for JSON
+MAGIC = b'\x89PXL'
+FORMAT_VERSION = 1
+CELL_COUNT = FRAME_WIDTH * FRAME_HEIGHT
+
+# The only keys that can be packed, and the cell each one maps to
+CELL_KEYS = [f"{column * CELL_SIZE},{row * CELL_SIZE}"
+              for row in range(FRAME_HEIGHT) for column in range(FRAME_WIDTH)]
+CELL_OF_KEY = {key: cell for cell, key in enumerate(CELL_KEYS)}
+
+
+def _write_uvarint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_uvarint(data: bytes, offset: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def is_packed(value) -> bool:
+    """True if a stored pixel_data value is in the packed format."""
+    return isinstance(value, bytes) and value[:len(MAGIC)] == MAGIC
+
+
+def pack_pixels(pixel_data: Union[str, bytes]) -> Union[str, bytes]:
+    """
+    Convert pixel_data to the form it should be stored in.
+
+    Args:
+        pixel_data: JSON text; packed values are returned as is
+
+    Returns:
+        Packed bytes, or the JSON text when the design can't be packed
+    """
+    if is_packed(pixel_data):
+        return pixel_data
+
+    try:
+        pixels = json.loads(pixel_data)
+    except ValueError:
+        return pixel_data
+    if not isinstance(pixels, dict):
+        return pixel_data
+
+    cells: List[Optional[str]] = [None] * CELL_COUNT
+    for key, color in pixels.items():
+        cell = CELL_OF_KEY.get(key)
+        if cell is None or not isinstance(color, str):
+            return pixel_data
+        cells[cell] = color
+
+    try:
+        return pack_cells(cells)
+    except UnicodeEncodeError:
+        # Lone surrogates survive JSON but not UTF-8
+        return pixel_data
+
+
+def pack_cells(cells: List[Optional[str]]) -> bytes:
+    """
+    Pack a board's cells, row by row, into the stored format.
+
+    Args:
+        cells: CELL_COUNT colors, None for unset cells
+
+    Raises:
+        UnicodeEncodeError: If a color can't be encoded as UTF-8
+    """
+    palette: Dict[str, int] = {}
+    indexes = [0] * CELL_COUNT
+    for cell, color in enumerate(cells):
+        if color is not None:
+            index = palette.get(color)
+            if index is None:
+                index = palette[color] = len(palette) + 1
+            indexes[cell] = index
+
+    out = bytearray(MAGIC)
+    out.append(FORMAT_VERSION)
+    encoded_colors = [color.encode('utf-8') for color in palette]
+    _write_uvarint(out, len(encoded_colors))
+    for encoded in encoded_colors:
+        _write_uvarint(out, len(encoded))
+        out += encoded
+
+    start = 0
+    while start < CELL_COUNT:
+        index = indexes[start]
+        end = start + 1
+        while end < CELL_COUNT and indexes[end] == index:
+            end += 1
+        _write_uvarint(out, end - start)
+        _write_uvarint(out, index)
+        start = end
+
+    return bytes(out)
+
+
+def payload_hash(pixel_data: str) -> bytes:
+    """
+    Content address of a design's pixels: the SHA-256 of its JSON text.
+    Uploads are canonicalized first, so the same drawing hashes the same.
+    """
+    return hashlib.sha256(pixel_data.encode('utf-8', 'surrogatepass')).digest()
+
+
+def stored_size(pixel_data: str) -> int:
+    """Bytes pixel_data will take up once stored, for quota checks."""
+    stored = pack_pixels(pixel_data)
+    return len(stored) if isinstance(stored, bytes) else len(stored.encode('utf-8'))
+
+
+def packed_runs(packed: bytes) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """
+    Split a packed value into its palette and (run length, index) runs.
+
+    Raises:
+        ValueError: If the value isn't a packed design this version can read
+    """
+    if not is_packed(packed) or len(packed) <= len(MAGIC) or packed[len(MAGIC)] != FORMAT_VERSION:
+        raise ValueError("Not a packed pixel_data value")
+
+    try:
+        offset = len(MAGIC) + 1
+        size, offset = _read_uvarint(packed, offset)
+        palette = []
+        for _ in range(size):
+            length, offset = _read_uvarint(packed, offset)
+            palette.append(packed[offset:offset + length].decode('utf-8'))
+            offset += length
+
+        runs = []
+        covered = 0
+        while covered < CELL_COUNT:
+            length, offset = _read_uvarint(packed, offset)
+            index, offset = _read_uvarint(packed, offset)
+            if length == 0 or index > size:
+                raise ValueError("Corrupt packed pixel_data")
+            runs.append((length, index))
+            covered += length
+    except IndexError:
+        raise ValueError("Truncated packed pixel_data") from None
+
+    if covered != CELL_COUNT or offset != len(packed):
+        raise ValueError("Corrupt packed pixel_data")
+    return palette, runs
+
+
+def unpack_cells(packed: bytes) -> List[Optional[str]]:
+    """Expand a packed value into its CELL_COUNT colors, row by row, None for unset cells."""
+    palette, runs = packed_runs(packed)
+    colors = [None] + palette
+    cells: List[Optional[str]] = []
+    for length, index in runs:
+        cells.extend([colors[index]] * length)
+    return cells
+
+
+def unpack_pixels(value) -> Optional[str]:
+    """
+    Return stored pixel_data as the JSON text clients expect.
+
+    Values that aren't packed (JSON text, NULL) are returned unchanged.
+    """
+    if not is_packed(value):
+        return value
+
+    palette, runs = packed_runs(value)
+    # Colors were valid JSON strings on the way in, encode each one once
+    colors = [json.dumps(color) for color in palette]
+    parts = []
+    cell = 0
+    for length, index in runs:
+        if index:
+            color = colors[index - 1]
+            parts.extend(f'"{key}":{color}' for key in CELL_KEYS[cell:cell + length])
+        cell += length
+    return '{' + ','.join(parts) + '}'
+
+
+def compile_packed_frame(packed: bytes) -> bytes:
+    """Compile a packed value straight into a frame, like compile_frame does for JSON text."""
+    palette, runs = packed_runs(packed)
+    colors = [bytes(parse_color(color) or INVALID_COLOR) for color in palette]
+
+    frame = bytearray(FRAME_SIZE)
+    offset = 0
+    for length, index in runs:
+        size = length * BYTES_PER_PIXEL
+        if index:
+            frame[offset:offset + size] = colors[index - 1] * length
+        offset += size
+    return bytes(frame)
+
+
+def register_functions(conn: sqlite3.Connection):
+    """
+    Make pixel_json(pixel_data) available to a connection's queries, so
+    reads hand clients JSON text whichever form a row is stored in.
+    """
+    conn.create_function('pixel_json', 1, unpack_pixels, deterministic=True)
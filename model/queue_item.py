@@ -1,15 +1,14 @@
 import datetime
 import sqlite3
 
+from model.connection_pool import pool
+from model.design import PIXEL_DATA_COLUMN
+
 
 class QueueItemDAO:
 
     def __init__(self):
-        database_path = 'data.db'
-        print("Connecting to SQLite database at:", database_path)
-
-        self.conn = sqlite3.connect(database_path)
-        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn = pool.connect()
 
     def getAllQueueItem(self):
         cursor = self.conn.cursor()
@@ -163,7 +162,7 @@ class QueueItemDAO:
 
     def getScheduledDesigns(self):
         cursor = self.conn.cursor()
-        query = """
+        query = f"""
             SELECT q.queue_id,
                 q.design_id,
                 q.start_time,
@@ -172,7 +171,7 @@ class QueueItemDAO:
                 q.display_order,
                 q.scheduled,
                 q.scheduled_at,
-                d.pixel_data,
+                {PIXEL_DATA_COLUMN} AS pixel_data,
                 d.is_approved,
                 d.created_at,
                 d.updated_at
@@ -198,14 +197,14 @@ class QueueItemDAO:
         offset = (page - 1) * page_size
 
         try:
-            query = """
+            query = f"""
             SELECT q.queue_id,
                 q.design_id,
                 q.start_time,
                 q.display_order,
                 q.scheduled,                  
                 q.scheduled_at,
-                d.pixel_data,
+                {PIXEL_DATA_COLUMN} AS pixel_data,
                 d.title,
                 d.is_approved
             FROM queue_item q
@@ -254,7 +253,7 @@ class QueueItemDAO:
 
     def getByUserEmail(self, email):
         cursor = self.conn.cursor()
-        query = """
+        query = f"""
             SELECT
                 qi.queue_id      AS history_id,
                 qi.design_id,
@@ -263,7 +262,7 @@ class QueueItemDAO:
                 qi.display_order,
                 qi.scheduled     AS status,
                 d.title,
-                d.pixel_data
+                {PIXEL_DATA_COLUMN} AS pixel_data
             FROM queue_item qi
             JOIN design d 
               ON d.design_id = qi.design_id
@@ -0,0 +1,50 @@
+from typing import Callable, Dict, List
+
+from model.connection_pool import pool
+
+# Callbacks receive (event, details). Events published by the DAOs:
+#   active_changed     channel_id, item_id, activated_at (None item_id = nothing showing)
+#   item_added         channel_id, item_id
+#   item_removed       channel_id, item_id
+#   items_expired      channel_id, item_ids
+#   reordered          channel_id, item_id
+#   schedule_changed   channel_id, schedule_id, start_time (None once it's removed)
+#   items_activated    channel_id, item_ids
+#   channel_added      channel_id
+#   channel_removed    channel_id
+#   design_changed     design_id
+#   design_deleted     design_id (may affect any channel)
+_listeners: List[Callable[[str, Dict], None]] = []
+
+
+def add_listener(callback: Callable[[str, Dict], None]):
+    """Register a callback for rotation state changes."""
+    if callback not in _listeners:
+        _listeners.append(callback)
+
+
+def remove_listener(callback: Callable[[str, Dict], None]):
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+
+def notify(event: str, **details):
+    """
+    Publish a rotation state change.
+
+    Inside a request the change isn't durable until the unit of work
+    commits, so delivery is deferred until then (and dropped on rollback).
+    """
+    unit = pool.current_unit()
+    if unit is not None and unit.conn is not None and unit.conn.in_transaction:
+        unit.after_commit(lambda: _deliver(event, details))
+    else:
+        _deliver(event, details)
+
+
+def _deliver(event: str, details: Dict):
+    for callback in list(_listeners):
+        try:
+            callback(event, details)
+        except Exception as e:
+            print(f"Error in rotation listener for {event}: {e}")
@@ -1,25 +1,137 @@
 import sqlite3
+import threading
+import time
 from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional, Any, Tuple
 
+from model.connection_pool import get_pool
+from model.design import PIXEL_DATA_COLUMN
+from model.display_channel import DEFAULT_CHANNEL_ID
+from model.rotation_events import notify
+
+
+def parse_utc_timestamp(value) -> Optional[datetime]:
+    """
+    Parse a timestamp stored by SQLite or by the datetime adapter and
+    return it as an aware UTC datetime.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        # Remove Z suffix if present to avoid ValueError with fromisoformat
+        value = datetime.fromisoformat(value.replace('Z', ''))
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+# The queue is ordered by sparse sort keys so an insert, move or removal
+# only writes the row involved. Positions shown to clients are derived.
+SORT_KEY_GAP = 1024.0
+# Neighbouring keys closer than this are spread out again by a rebalance
+REBALANCE_MIN_GAP = 1e-3
+# Below this, midpoints can no longer be told apart reliably
+MIN_SORT_KEY_STEP = 1e-6
+
+
+def spread_sort_keys(low: Optional[float], high: Optional[float], count: int) -> Optional[Tuple[float, float]]:
+    """
+    Place count new keys strictly between two neighbouring keys.
+    
+    Args:
+        low: Key of the item before the new ones (None = start of the queue)
+        high: Key of the item after the new ones (None = end of the queue)
+        count: Number of keys needed
+        
+    Returns:
+        (base, step) so that the i-th new key (1-based) is base + step * i,
+        or None if there's no room left and the queue must be rebalanced
+    """
+    if high is None:
+        base, step = (low if low is not None else 0.0), SORT_KEY_GAP
+    elif low is None:
+        base, step = high - SORT_KEY_GAP * (count + 1), SORT_KEY_GAP
+    else:
+        base, step = low, (high - low) / (count + 1)
+    
+    if step < MIN_SORT_KEY_STEP:
+        return None
+    if (low is not None and base + step <= low) or (high is not None and base + step * count >= high):
+        return None
+    return base, step
+
+
+_sweep_lock = threading.Lock()
+_sweep_stats = {
+    'runs': 0,
+    'removed': 0,
+    'last_removed': 0,
+    'last_ms': None,
+    'max_ms': 0.0,
+}
+
+
+def _record_sweep(removed: int, elapsed_ms: float):
+    with _sweep_lock:
+        _sweep_stats['runs'] += 1
+        _sweep_stats['removed'] += removed
+        _sweep_stats['last_removed'] = removed
+        _sweep_stats['last_ms'] = round(elapsed_ms, 3)
+        _sweep_stats['max_ms'] = max(_sweep_stats['max_ms'], round(elapsed_ms, 3))
+
+
+def expiry_sweep_stats() -> Dict:
+    """Return how much the expiry sweeps removed and how long they took."""
+    with _sweep_lock:
+        return dict(_sweep_stats)
+
+
+# Explicit projections so metadata reads never pull pixel_data through the
+# sqlite3 row machinery. Queue and schedule timestamps win over the design's,
+# as they did with "rq.*, d.*".
+QUEUE_ITEM_COLUMNS = (
+    "rq.item_id, rq.channel_id, rq.design_id, rq.duration, rq.expiry_time, rq.created_at, rq.updated_at, rq.sort_key, "
+    "d.user_id, d.title, d.is_approved, d.status"
+)
+# A single queue item's 1-based position in its channel, derived from the sort keys.
+# Correlated, so it runs once per row: multi-row queries number rows with ROW_NUMBER() instead.
+DISPLAY_ORDER_COLUMN = (
+    "(SELECT COUNT(*) FROM rotation_queue pos WHERE pos.channel_id = rq.channel_id "
+    "AND (pos.sort_key, pos.item_id) <= (rq.sort_key, rq.item_id)) AS display_order"
+)
+SCHEDULED_ITEM_COLUMNS = (
+    "s.schedule_id, s.channel_id, s.design_id, s.duration, s.start_time, s.end_time, s.override_current, "
+    "s.created_at, s.updated_at, d.user_id, d.title, d.is_approved, d.status"
+)
+
+
+def _with_pixels(columns: str, include_pixels: bool) -> str:
+    return f"{columns}, {PIXEL_DATA_COLUMN} AS pixel_data" if include_pixels else columns
+
 
 class RotationSystemDAO:
     """
     Data Access Object for the image rotation system.
     Handles all database operations.
+    
+    A DAO works on one display channel's queue, schedule and active item.
+    Items and schedules are looked up by their own (global) IDs, and the
+    background sweeps run over every channel at once.
     """
     
-    def __init__(self, db_path='data.db'):
-        """Initialize the DAO with the database path."""
+    def __init__(self, db_path='data.db', channel_id: int = DEFAULT_CHANNEL_ID):
+        """Initialize the DAO with the database path and the channel to work on."""
         self.db_path = db_path
+        self.channel_id = channel_id
+    
+    def for_channel(self, channel_id: int) -> 'RotationSystemDAO':
+        """Get a DAO for another channel of the same database."""
+        return RotationSystemDAO(self.db_path, channel_id)
     
     def _get_connection(self):
-        """Create and return a database connection."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Enable row factory for dict-like access
-        conn.execute("PRAGMA foreign_keys = ON")
-        conn.execute("PRAGMA busy_timeout = 5000;")
-        return conn
+        """
+        Get a pooled database connection.
+        Rows come back as sqlite3.Row and closing the connection returns it to the pool.
+        """
+        return get_pool(self.db_path).connect()
 
     def get_rotation_item_byid(self, item_id):
         conn = self._get_connection()
@@ -29,12 +141,16 @@ class RotationSystemDAO:
         cursor.execute(query, (item_id,))
         result = cursor.fetchone()
         cursor.close()
+        conn.close()
         return result
     
-    def get_active_image(self) -> Optional[Dict]:
+    def get_active_image(self, include_pixels: bool = False) -> Optional[Dict]:
         """
         Get information about the currently active image.
         
+        Args:
+            include_pixels: Also return the design's pixel_data
+            
         Returns:
             Dict with image information or None if no active image
         """
@@ -42,13 +158,13 @@ class RotationSystemDAO:
         cur = conn.cursor()
         
         try:
-            cur.execute("""
-            SELECT rq.*, d.*, ai.activated_at 
+            cur.execute(f"""
+            SELECT {_with_pixels(QUEUE_ITEM_COLUMNS, include_pixels)}, ai.activated_at, {DISPLAY_ORDER_COLUMN}
             FROM active_item ai
             JOIN rotation_queue rq ON ai.item_id = rq.item_id
             JOIN design d ON rq.design_id = d.design_id
-            WHERE ai.id = 1
-            """)
+            WHERE ai.id = ?
+            """, (self.channel_id,))
             
             result = cur.fetchone()
             
@@ -72,36 +188,14 @@ class RotationSystemDAO:
         cur = conn.cursor()
         try:
             if override_current:
-                # Get current active item's display_order
-                active_item_id = self._get_active_item_id(conn)
-                if active_item_id:
-                    cur.execute("""
-                    SELECT display_order FROM rotation_queue
-                    WHERE item_id = ?
-                    """, (active_item_id,))
-                    result = cur.fetchone()
-                    current_order = result['display_order'] if result else 0
-
-                    # Shift all items with display_order > current_order up by 1
-                    cur.execute("""
-                    UPDATE rotation_queue
-                    SET display_order = display_order + 1,
-                        updated_at = ?
-                    WHERE display_order > ?
-                    """, (datetime.now(timezone.utc), current_order))
-                    
-                    # Insert new item at current_order + 1
-                    display_order = current_order + 1
-                else:
-                    # No active item, just use order 1
-                    display_order = 1
+                # Right after the current item (or first if nothing is active)
+                base, step = self._make_room_after(conn, self._get_active_item_id(conn), 1)
             else:
-                cur.execute("SELECT COALESCE(MAX(display_order), 0) AS max_order FROM rotation_queue")
-                display_order = cur.fetchone()['max_order'] + 1
+                base, step = self._make_room_at_end(conn)
             
             cur.execute(
-                "INSERT INTO rotation_queue (design_id, duration, display_order, expiry_time) VALUES (?, ?, ?, ?)",
-                (design_id, duration, display_order, end_time)
+                "INSERT INTO rotation_queue (channel_id, design_id, duration, sort_key, expiry_time) VALUES (?, ?, ?, ?, ?)",
+                (self.channel_id, design_id, duration, base + step, end_time)
             )
 
             item_id = cur.lastrowid
@@ -112,8 +206,8 @@ class RotationSystemDAO:
                 cur.execute("""
                 UPDATE active_item
                 SET item_id = ?, activated_at = ?
-                WHERE id = 1
-                """, (item_id, datetime.now(timezone.utc)))
+                WHERE id = ?
+                """, (item_id, datetime.now(timezone.utc), self.channel_id))
 
             # Make active if first
             self._ensure_active_item(conn)
@@ -124,6 +218,7 @@ class RotationSystemDAO:
                 (design_id, 'successful')
             )
             conn.commit()
+            notify('item_added', channel_id=self.channel_id, item_id=item_id)
             return item_id
         finally:
             cur.close()
@@ -141,16 +236,19 @@ class RotationSystemDAO:
         try:
             if end_time:
                 cur.execute(
-                    "INSERT INTO scheduled_items (design_id, duration, start_time, end_time, override_current) VALUES (?, ?, ?, ?, ?)",
-                    (design_id, duration, start_time, end_time, override_current)
+                    "INSERT INTO scheduled_items (channel_id, design_id, duration, start_time, end_time, override_current) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.channel_id, design_id, duration, start_time, end_time, override_current)
                 )
             else:
                 cur.execute(
-                    "INSERT INTO scheduled_items (design_id, duration, start_time, override_current) VALUES (?, ?, ?, ?)",
-                    (design_id, duration, start_time, override_current)
+                    "INSERT INTO scheduled_items (channel_id, design_id, duration, start_time, override_current) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (self.channel_id, design_id, duration, start_time, override_current)
                 )
             schedule_id = cur.lastrowid
             conn.commit()
+            notify('schedule_changed', channel_id=self.channel_id, schedule_id=schedule_id, start_time=start_time)
             return schedule_id
         finally:
             cur.close()
@@ -166,23 +264,31 @@ class RotationSystemDAO:
             if end_time:
                 cur.execute(
                     "UPDATE scheduled_items SET design_id = ?, duration = ?, start_time = ?, "
-                    "end_time = ?, override_current = ? WHERE schedule_id = ?",
+                    "end_time = ?, override_current = ? WHERE schedule_id = ? RETURNING channel_id",
                     (design_id, duration, start_time, end_time, override_current, schedule_id)
                 )
             else:
                 cur.execute(
                     "UPDATE scheduled_items SET design_id = ?, duration = ?, start_time = ?, "
-                    "end_time = NULL, override_current = ? WHERE schedule_id = ?",
+                    "end_time = NULL, override_current = ? WHERE schedule_id = ? RETURNING channel_id",
                     (design_id, duration, start_time, override_current, schedule_id)
                 )
+            rows = cur.fetchall()
             conn.commit()
+            if rows:
+                notify('schedule_changed', channel_id=rows[0]['channel_id'], schedule_id=schedule_id,
+                       start_time=start_time)
         finally:
             cur.close()
             conn.close()
     
     def process_scheduled_images(self) -> bool:
         """
-        Check for scheduled images that should be active now and insert them into the rotation.
+        Move every scheduled image that is due into its channel's rotation.
+        
+        All due items, on every channel, are activated together in one
+        transaction with set-based statements per channel that has any,
+        no matter how many there are.
         
         Returns:
             True if any scheduled items were processed, False otherwise
@@ -192,99 +298,131 @@ class RotationSystemDAO:
         cur = conn.cursor()
         
         try:
-            # Get scheduled items that should be active now
+            # Take the write lock up front so the due set can't change under us
+            if not conn.in_transaction:
+                cur.execute("BEGIN IMMEDIATE")
+            
             cur.execute("""
-            SELECT * FROM scheduled_items
+            SELECT channel_id, COUNT(*) AS due, COALESCE(SUM(override_current), 0) AS overrides
+            FROM scheduled_items
             WHERE start_time <= ?
-            ORDER BY start_time ASC
+            GROUP BY channel_id
             """, (now,))
-            
-            scheduled_items = cur.fetchall()
-            if not scheduled_items:
+            due_channels = cur.fetchall()
+            if not due_channels:
+                conn.commit()
                 return False
             
-            activated = False
-            
-            for item in scheduled_items:
-                # Calculate expiry time based on end_time if provided, otherwise default to 1 day
-                # Convert string representation of end_time to datetime with timezone info
-                if item['end_time'] and isinstance(item['end_time'], str):
-                    # Parse the string but ensure it's treated as UTC
-                    # Remove Z suffix if present to avoid ValueError with fromisoformat
-                    clean_end_time = item['end_time'].replace('Z', '')
-                    expiry_time = datetime.fromisoformat(clean_end_time).replace(tzinfo=timezone.utc)
-                elif item['end_time']:
-                    # Already datetime object, just ensure it has UTC timezone
-                    expiry_time = item['end_time'].replace(tzinfo=timezone.utc) if item['end_time'].tzinfo is None else item['end_time']
-                else:
-                    # Default to 1 day from now, in UTC
-                    expiry_time = now + timedelta(days=1)
-                
-                # If override_current is true, need to place it right after current item
-                if item['override_current']:
-                    # Get current active item's display_order
-                    active_item_id = self._get_active_item_id(conn)
-                    if active_item_id:
-                        cur.execute("""
-                        SELECT display_order FROM rotation_queue
-                        WHERE item_id = ?
-                        """, (active_item_id,))
-                        result = cur.fetchone()
-                        current_order = result['display_order'] if result else 0
-
-                        # Shift all items with display_order > current_order up by 1
-                        cur.execute("""
-                        UPDATE rotation_queue
-                        SET display_order = display_order + 1,
-                            updated_at = ?
-                        WHERE display_order > ?
-                        """, (now, current_order))
-                        
-                        # Insert new item at current_order + 1
-                        display_order = current_order + 1
-                    else:
-                        # No active item, just use order 1
-                        display_order = 1
-                else:
-                    # Get the highest display_order for non-override items
-                    cur.execute("SELECT COALESCE(MAX(display_order), 0) as max_order FROM rotation_queue")
-                    max_order = cur.fetchone()['max_order']
-                    display_order = max_order + 1
-                
-                # Insert into rotation_queue
-                cur.execute("""
-                INSERT INTO rotation_queue
-                (design_id, duration, display_order, expiry_time)
-                VALUES (?, ?, ?, ?)
-                """, (item['design_id'], item['duration'], display_order, expiry_time))
-
-                item_id = cur.lastrowid
-                
-                # If override_current is true, make this the active item
-                if item['override_current']:
-                    cur.execute("""
-                    UPDATE active_item
-                    SET item_id = ?, activated_at = ?
-                    WHERE id = 1
-                    """, (item_id, now))
-
-                cur.execute(
-                "INSERT INTO upload_history (design_id, attempt_time, status) VALUES (?, ?, ?);",
-                (item['design_id'], datetime.utcnow().isoformat(), 'successful')
-                )
-                
-                # Remove from scheduled_items
-                cur.execute("DELETE FROM scheduled_items WHERE schedule_id = ?", (item['schedule_id'],))
-                
-                activated = True
+            activated = {
+                counts['channel_id']: self.for_channel(counts['channel_id'])._activate_due(conn, now, counts)
+                for counts in due_channels
+            }
+            
+            cur.execute("""
+            INSERT INTO upload_history (design_id, attempt_time, status)
+            SELECT design_id, ?, 'successful'
+            FROM scheduled_items
+            WHERE start_time <= ?
+            ORDER BY start_time, schedule_id
+            """, (datetime.utcnow().isoformat(), now))
+            
+            cur.execute("DELETE FROM scheduled_items WHERE start_time <= ?", (now,))
             
             conn.commit()
             
-            # If this is the first item, make sure it's active
-            if activated:
-                self._ensure_active_item(conn)
+            for channel_id, item_ids in activated.items():
+                # If this is the channel's first item, make sure it's active
+                self.for_channel(channel_id)._ensure_active_item(conn)
+                notify('items_activated', channel_id=channel_id, item_ids=item_ids)
+            
+            return True
+            
+        except Exception:
+            conn.rollback()
+            raise
+            
+        finally:
+            cur.close()
+            conn.close()
+    
+    def _activate_due(self, conn, now: datetime, counts) -> List[int]:
+        """
+        Insert this channel's due scheduled items into its queue. The caller
+        holds the write transaction and deletes the scheduled rows.
+        
+        Args:
+            conn: Connection with the open transaction
+            now: Cut-off for due items
+            counts: Row with the channel's due and overrides counts
             
-            return activated
+        Returns:
+            IDs of the inserted queue items
+        """
+        cur = conn.cursor()
+        try:
+            activated_item_ids = []
+            default_expiry = now + timedelta(days=1)
+            
+            if counts['overrides']:
+                # Override items go right after the current item, in start order,
+                # and the last of them becomes the active item
+                base, step = self._make_room_after(conn, self._get_active_item_id(conn), counts['overrides'])
+                
+                cur.execute("""
+                INSERT INTO rotation_queue (channel_id, design_id, duration, sort_key, expiry_time)
+                SELECT channel_id, design_id, duration,
+                       ? + ? * ROW_NUMBER() OVER (ORDER BY start_time, schedule_id),
+                       COALESCE(end_time, ?)
+                FROM scheduled_items
+                WHERE channel_id = ? AND start_time <= ? AND override_current = 1
+                RETURNING item_id, sort_key
+                """, (base, step, default_expiry, self.channel_id, now))
+                inserted = cur.fetchall()
+                activated_item_ids.extend(row['item_id'] for row in inserted)
+                
+                newest = max(inserted, key=lambda row: row['sort_key'])
+                cur.execute("""
+                UPDATE active_item
+                SET item_id = ?, activated_at = ?
+                WHERE id = ?
+                """, (newest['item_id'], now, self.channel_id))
+            
+            if counts['due'] > counts['overrides']:
+                # Everything else is appended at the end, in start order
+                base, step = self._make_room_at_end(conn)
+                
+                cur.execute("""
+                INSERT INTO rotation_queue (channel_id, design_id, duration, sort_key, expiry_time)
+                SELECT channel_id, design_id, duration,
+                       ? + ? * ROW_NUMBER() OVER (ORDER BY start_time, schedule_id),
+                       COALESCE(end_time, ?)
+                FROM scheduled_items
+                WHERE channel_id = ? AND start_time <= ? AND override_current = 0
+                RETURNING item_id
+                """, (base, step, default_expiry, self.channel_id, now))
+                activated_item_ids.extend(row['item_id'] for row in cur.fetchall())
+            
+            return activated_item_ids
+        finally:
+            cur.close()
+    
+    def get_pending_schedule_times(self) -> List[Dict]:
+        """
+        Get the start time of every pending scheduled item on any channel, earliest first.
+        
+        Returns:
+            List of dicts with schedule_id and start_time
+        """
+        conn = self._get_connection()
+        cur = conn.cursor()
+        
+        try:
+            cur.execute("""
+            SELECT schedule_id, start_time
+            FROM scheduled_items
+            ORDER BY start_time ASC
+            """)
+            return [dict(row) for row in cur.fetchall()]
             
         finally:
             cur.close()
@@ -292,57 +430,67 @@ class RotationSystemDAO:
     
     def clean_expired_images(self) -> int:
         """
-        Remove images that have expired from the rotation queue.
+        Remove images that have expired from the rotation queue of every channel.
+        
+        The sweep is a single short write transaction: one indexed DELETE
+        that returns the removed ids. Positions are derived from the sort
+        keys, so nothing has to be renumbered afterwards.
         
         Returns:
             Number of items removed
         """
+        started = time.perf_counter()
         now = datetime.now(timezone.utc)
         conn = self._get_connection()
         cur = conn.cursor()
         
         try:
-            # Check if the active item is expired
-            active_item_id = self._get_active_item_id(conn)
+            if not conn.in_transaction:
+                cur.execute("BEGIN IMMEDIATE")
             
-            # Get list of expired items
+            # Channels whose active item is about to go
             cur.execute("""
-            SELECT item_id FROM rotation_queue
-            WHERE expiry_time <= ?
+            SELECT ai.id AS channel_id
+            FROM rotation_queue rq
+            JOIN active_item ai ON ai.item_id = rq.item_id
+            WHERE rq.expiry_time <= ?
             """, (now,))
+            lost_active = [row['channel_id'] for row in cur.fetchall()]
             
-            expired_items = [row['item_id'] for row in cur.fetchall()]
-            
-            if not expired_items:
-                return 0
-            
-            # Delete expired items
             cur.execute("""
             DELETE FROM rotation_queue
             WHERE expiry_time <= ?
+            RETURNING item_id, channel_id
             """, (now,))
+            expired_by_channel: Dict[int, List[int]] = {}
+            for row in cur.fetchall():
+                expired_by_channel.setdefault(row['channel_id'], []).append(row['item_id'])
+            expired_items = [item_id for item_ids in expired_by_channel.values() for item_id in item_ids]
             
-            removed_count = cur.rowcount
-
-            # After removal, update the orders 
-            cur.execute("SELECT item_id FROM rotation_queue ORDER BY display_order ASC")
-            items = cur.fetchall()
-            for index, item in enumerate(items):
-                cur.execute(
-                "UPDATE rotation_queue SET display_order = ? WHERE item_id = ?",
-                (index + 1, item[0])
-                )
-            
-            # If the active item was expired, select a new one
-            if active_item_id in expired_items:
-                self._select_new_active_item(conn)
+            # If a channel's active item was expired, select a new one in the same transaction
+            activated = [(channel_id, *self.for_channel(channel_id)._activate_first_item(cur))
+                         for channel_id in lost_active]
             
             conn.commit()
-            return removed_count
+            
+        except Exception:
+            conn.rollback()
+            raise
             
         finally:
             cur.close()
             conn.close()
+        
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        _record_sweep(len(expired_items), elapsed_ms)
+        
+        if expired_items:
+            print(f"Expiry sweep removed {len(expired_items)} item(s) in {elapsed_ms:.1f} ms")
+            for channel_id, item_ids in expired_by_channel.items():
+                notify('items_expired', channel_id=channel_id, item_ids=item_ids)
+        for channel_id, item_id, activated_at in activated:
+            notify('active_changed', channel_id=channel_id, item_id=item_id, activated_at=activated_at)
+        return len(expired_items)
     
     def check_rotation(self):
         """Check if it's time to rotate to the next image."""
@@ -350,10 +498,13 @@ class RotationSystemDAO:
         if time_left is None or (time_left <= 0):
             self.rotate_to_next()
     
-    def rotate_to_next(self) -> Optional[Dict]:
+    def rotate_to_next(self, include_pixels: bool = False) -> Optional[Dict]:
         """
         Advance to the next image in the rotation.
         
+        Args:
+            include_pixels: Also return the new active design's pixel_data
+            
         Returns:
             Dict containing information about the new active image, or None if no images available
         """
@@ -363,8 +514,10 @@ class RotationSystemDAO:
             conn = self._get_connection()
             cur = conn.cursor()
             
-            # Start a transaction to ensure consistency
-            cur.execute("BEGIN TRANSACTION")
+            # Start a transaction to ensure consistency, unless the
+            # request's unit of work already has one open
+            if not conn.in_transaction:
+                cur.execute("BEGIN TRANSACTION")
             
             # Get current active item
             active_item_id = self._get_active_item_id(conn)
@@ -375,9 +528,9 @@ class RotationSystemDAO:
                 conn.commit()
                 return result
             
-            # Get current display_order
+            # Get current sort key
             cur.execute("""
-            SELECT display_order FROM rotation_queue
+            SELECT sort_key FROM rotation_queue
             WHERE item_id = ?
             """, (active_item_id,))
             
@@ -388,50 +541,54 @@ class RotationSystemDAO:
                 conn.commit()
                 return result
             
-            current_order = current_order_row['display_order']
+            current_key = current_order_row['sort_key']
             
-            # Find item with next display_order
+            # Find the item that comes next
             cur.execute("""
             SELECT * FROM rotation_queue
-            WHERE display_order > ?
-            ORDER BY display_order ASC
+            WHERE channel_id = ? AND (sort_key, item_id) > (?, ?)
+            ORDER BY sort_key ASC, item_id ASC
             LIMIT 1
-            """, (current_order,))
+            """, (self.channel_id, current_key, active_item_id))
             
             next_item = cur.fetchone()
             
             if next_item is None:
-                # No item with higher order, go back to the beginning
+                # Nothing after it, go back to the beginning
                 cur.execute("""
                 SELECT * FROM rotation_queue
-                ORDER BY display_order ASC
+                WHERE channel_id = ?
+                ORDER BY sort_key ASC, item_id ASC
                 LIMIT 1
-                """)
+                """, (self.channel_id,))
                 next_item = cur.fetchone()
             
+            now = datetime.now(timezone.utc)
             if next_item is None:
                 # No items at all
                 cur.execute("""
                 UPDATE active_item 
                 SET item_id = NULL, activated_at = ? 
-                WHERE id = 1
-                """, (datetime.now(timezone.utc),))
+                WHERE id = ?
+                """, (now, self.channel_id))
                 conn.commit()
+                notify('active_changed', channel_id=self.channel_id, item_id=None, activated_at=now)
                 return None
             
             # Update active item
             cur.execute("""
             UPDATE active_item
             SET item_id = ?, activated_at = ?
-            WHERE id = 1
-            """, (next_item['item_id'], datetime.now(timezone.utc)))
+            WHERE id = ?
+            """, (next_item['item_id'], now, self.channel_id))
             
             # Store the item_id before committing and closing connection
             next_item_id = next_item['item_id']
             conn.commit()
+            notify('active_changed', channel_id=self.channel_id, item_id=next_item_id, activated_at=now)
             
             # Return the full information about the active image
-            return self._get_image_info_by_id(next_item_id)
+            return self._get_image_info_by_id(next_item_id, include_pixels)
             
         except Exception as e:
             if conn:
@@ -444,12 +601,13 @@ class RotationSystemDAO:
             if conn:
                 conn.close()
 
-    def _get_image_info_by_id(self, item_id: int) -> Optional[Dict]:
+    def _get_image_info_by_id(self, item_id: int, include_pixels: bool = False) -> Optional[Dict]:
         """
-        Get full information about an image by its item_id.
+        Get information about an image by its item_id.
         
         Args:
             item_id: The ID of the item to fetch
+            include_pixels: Also return the design's pixel_data
             
         Returns:
             Dict containing image information or None if not found
@@ -458,8 +616,8 @@ class RotationSystemDAO:
             conn = self._get_connection()
             cur = conn.cursor()
             
-            cur.execute("""
-            SELECT rq.*, d.* 
+            cur.execute(f"""
+            SELECT {_with_pixels(QUEUE_ITEM_COLUMNS, include_pixels)}, {DISPLAY_ORDER_COLUMN}
             FROM rotation_queue rq
             JOIN design d ON rq.design_id = d.design_id
             WHERE rq.item_id = ?
@@ -479,30 +637,247 @@ class RotationSystemDAO:
                 conn.close()
 
     def reorder_images(self, item_id: int, new_order: int):
-
+        """
+        Move an item to a 1-based position in its channel's queue. Only the moved row is written.
+        """
         status = 1
-        query = None
         conn = self._get_connection()
         cursor = conn.cursor()
-        old_order = self.get_rotation_item_byid(item_id)[3]
         now = datetime.now(timezone.utc)
-        if new_order < old_order:
-            query = "UPDATE rotation_queue SET display_order = display_order + 1, updated_at = ? WHERE display_order >= ? AND display_order < ?"
-        elif new_order > old_order:
-            query = "UPDATE rotation_queue SET display_order = display_order - 1, updated_at = ? WHERE display_order <= ? AND display_order > ?"
-        try:
-            if query:
-                cursor.execute(query, (now, new_order, old_order))
-            shift = "UPDATE rotation_queue SET display_order = ?, updated_at = ? WHERE item_id = ?"
-            cursor.execute(shift,(new_order, now, item_id))
+        try:
+            cursor.execute("SELECT channel_id FROM rotation_queue WHERE item_id = ?", (item_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return status
+            
+            channel = self.for_channel(row['channel_id'])
+            sort_key = channel._sort_key_for_position(conn, item_id, max(1, int(new_order)))
+            cursor.execute("UPDATE rotation_queue SET sort_key = ?, updated_at = ? WHERE item_id = ?",
+                           (sort_key, now, item_id))
             conn.commit()
+            notify('reordered', channel_id=channel.channel_id, item_id=item_id)
             status = 0
         except sqlite3.Error:
             status = 1
         finally:
             cursor.close()
+            conn.close()
             return status
 
+    def get_rotation_state(self) -> Tuple[List[Dict], Optional[Dict]]:
+        """
+        Get the queue order and the active pointer without any design payloads.
+        Used by the rotation engine to rebuild its in-memory state.
+        
+        Returns:
+            Tuple of (queue items in rotation order, active item row)
+        """
+        conn = self._get_connection()
+        cur = conn.cursor()
+        
+        try:
+            cur.execute("""
+            SELECT item_id, sort_key, duration
+            FROM rotation_queue
+            WHERE channel_id = ?
+            ORDER BY sort_key ASC, item_id ASC
+            """, (self.channel_id,))
+            queue = [dict(row) for row in cur.fetchall()]
+            
+            cur.execute("SELECT item_id, activated_at FROM active_item WHERE id = ?", (self.channel_id,))
+            row = cur.fetchone()
+            active = dict(row) if row else None
+            
+            return queue, active
+            
+        finally:
+            cur.close()
+            conn.close()
+
+    def get_all_rotation_states(self) -> Dict[int, Tuple[List[Dict], Optional[Dict]]]:
+        """
+        Get every channel's queue order and active pointer in two reads.
+        Used to rebuild the rotation engine's state for all channels at once.
+        
+        Returns:
+            Dict of channel_id to (queue items in rotation order, active item row)
+        """
+        conn = self._get_connection()
+        cur = conn.cursor()
+        
+        try:
+            # Every channel has an active_item row, even with an empty queue
+            cur.execute("SELECT id AS channel_id, item_id, activated_at FROM active_item")
+            states = {row['channel_id']: ([], {'item_id': row['item_id'], 'activated_at': row['activated_at']})
+                      for row in cur.fetchall()}
+            
+            cur.execute("""
+            SELECT channel_id, item_id, sort_key, duration
+            FROM rotation_queue
+            ORDER BY channel_id ASC, sort_key ASC, item_id ASC
+            """)
+            for row in cur.fetchall():
+                if row['channel_id'] in states:
+                    states[row['channel_id']][0].append(
+                        {'item_id': row['item_id'], 'sort_key': row['sort_key'], 'duration': row['duration']})
+            
+            return states
+            
+        finally:
+            cur.close()
+            conn.close()
+
+    def get_timeline_state(self) -> Tuple[List[Dict], Optional[Dict], List[Dict]]:
+        """
+        Get everything needed to forecast upcoming activations, in one read.
+        
+        Returns:
+            Tuple of (queue items in rotation order with their expiry_time,
+            active item row, pending schedules in activation order)
+        """
+        conn = self._get_connection()
+        cur = conn.cursor()
+        
+        try:
+            cur.execute("""
+            SELECT item_id, design_id, duration, expiry_time
+            FROM rotation_queue
+            WHERE channel_id = ?
+            ORDER BY sort_key ASC, item_id ASC
+            """, (self.channel_id,))
+            queue = [dict(row) for row in cur.fetchall()]
+            
+            cur.execute("SELECT item_id, activated_at FROM active_item WHERE id = ?", (self.channel_id,))
+            row = cur.fetchone()
+            active = dict(row) if row else None
+            
+            cur.execute("""
+            SELECT schedule_id, design_id, duration, start_time, end_time, override_current
+            FROM scheduled_items
+            WHERE channel_id = ?
+            ORDER BY start_time ASC, schedule_id ASC
+            """, (self.channel_id,))
+            schedules = [dict(row) for row in cur.fetchall()]
+            
+            return queue, active, schedules
+            
+        finally:
+            cur.close()
+            conn.close()
+
+    def activate_item(self, item_id: Optional[int], activated_at: datetime) -> bool:
+        """
+        Point the active item at item_id (or at nothing).
+        
+        Args:
+            item_id: Item to activate, None to clear the active item
+            activated_at: Activation time (UTC)
+            
+        Returns:
+            False if the item is no longer in this channel's queue
+        """
+        conn = self._get_connection()
+        cur = conn.cursor()
+        
+        try:
+            if item_id is None:
+                cur.execute("UPDATE active_item SET item_id = NULL, activated_at = ? WHERE id = ?",
+                            (activated_at, self.channel_id))
+            else:
+                cur.execute("""
+                UPDATE active_item
+                SET item_id = ?, activated_at = ?
+                WHERE id = ?
+                AND EXISTS (SELECT 1 FROM rotation_queue WHERE item_id = ? AND channel_id = ?)
+                """, (item_id, activated_at, self.channel_id, item_id, self.channel_id))
+            
+            success = cur.rowcount > 0
+            conn.commit()
+            if success:
+                notify('active_changed', channel_id=self.channel_id, item_id=item_id, activated_at=activated_at)
+            return success
+            
+        finally:
+            cur.close()
+            conn.close()
+
+    def get_rotation_version(self) -> int:
+        """
+        Get the channel's rotation state version. It goes up on every change
+        to its queue, its schedule, its active item or a design in either of them.
+        """
+        conn = self._get_connection()
+        cur = conn.cursor()
+        
+        try:
+            cur.execute("SELECT version FROM display_channel WHERE channel_id = ?", (self.channel_id,))
+            row = cur.fetchone()
+            return row['version'] if row else 0
+            
+        finally:
+            cur.close()
+            conn.close()
+
+    def get_active_frame_info(self) -> Optional[Dict]:
+        """
+        Get the active item's design and frame version, without the frame
+        itself, so callers can revalidate before fetching the blob.
+
+        Returns:
+            Dict with item_id, design_id and frame_version (None if the
+            frame hasn't been compiled yet), or None if nothing is active
+        """
+        conn = self._get_connection()
+        cur = conn.cursor()
+        
+        try:
+            cur.execute("""
+            SELECT ai.item_id, rq.design_id, df.version AS frame_version
+            FROM active_item ai
+            JOIN rotation_queue rq ON ai.item_id = rq.item_id
+            LEFT JOIN design_frame df ON rq.design_id = df.design_id
+            WHERE ai.id = ?
+            """, (self.channel_id,))
+            row = cur.fetchone()
+            return dict(row) if row else None
+            
+        finally:
+            cur.close()
+            conn.close()
+
+    def get_item_frames(self, item_ids: List[int], include_frame: bool = True) -> List[Dict]:
+        """
+        Get the compiled frames of some queue items.
+
+        Args:
+            item_ids: Rotation queue items to look up
+            include_frame: Leave the frame blob out to only compare versions
+
+        Returns:
+            List of dicts with item_id, design_id, frame_version and frame
+            (both None if the design's frame hasn't been compiled yet)
+        """
+        if not item_ids:
+            return []
+
+        conn = self._get_connection()
+        cur = conn.cursor()
+        
+        try:
+            placeholders = ','.join('?' * len(item_ids))
+            cur.execute(f"""
+            SELECT rq.item_id, rq.design_id, df.version AS frame_version,
+                   {'df.frame' if include_frame else 'NULL'} AS frame
+            FROM rotation_queue rq
+            LEFT JOIN design_frame df ON rq.design_id = df.design_id
+            WHERE rq.item_id IN ({placeholders})
+            """, item_ids)
+            return [dict(row) for row in cur.fetchall()]
+            
+        finally:
+            cur.close()
+            conn.close()
+
     def get_time_left_for_current(self) -> Optional[float]:
         """
         Get the number of seconds left for the current active image.
@@ -519,14 +894,7 @@ class RotationSystemDAO:
         now = datetime.now(timezone.utc)
         
         # Handle the activated_at time, ensuring it's interpreted as UTC
-        if active_image['activated_at'] and isinstance(active_image['activated_at'], str):
-            # Remove Z suffix if present to avoid ValueError with fromisoformat
-            clean_activated_at = active_image['activated_at'].replace('Z', '')
-            # Parse the string and ensure it has UTC timezone
-            activated_at = datetime.fromisoformat(clean_activated_at).replace(tzinfo=timezone.utc)
-        else:
-            # Already a datetime object, ensure it has UTC timezone
-            activated_at = active_image['activated_at'].replace(tzinfo=timezone.utc) if active_image['activated_at'].tzinfo is None else active_image['activated_at']
+        activated_at = parse_utc_timestamp(active_image['activated_at'])
         
         # Calculate elapsed time
         elapsed_seconds = (now - activated_at).total_seconds()
@@ -536,10 +904,13 @@ class RotationSystemDAO:
         return max(0, time_left)
     
 
-    def get_all_rotation_items(self) -> List[Dict]:
+    def get_all_rotation_items(self, include_pixels: bool = False) -> List[Dict]:
         """
         Get all items in the rotation queue with their associated design info.
         
+        Args:
+            include_pixels: Also return each design's pixel_data
+            
         Returns:
             List of dicts with rotation queue and design information
         """
@@ -547,12 +918,14 @@ class RotationSystemDAO:
         cur = conn.cursor()
         
         try:
-            cur.execute("""
-            SELECT rq.*, d.* 
+            cur.execute(f"""
+            SELECT {_with_pixels(QUEUE_ITEM_COLUMNS, include_pixels)},
+                   ROW_NUMBER() OVER (ORDER BY rq.sort_key, rq.item_id) AS display_order
             FROM rotation_queue rq
             JOIN design d ON rq.design_id = d.design_id
-            ORDER BY rq.display_order ASC
-            """)
+            WHERE rq.channel_id = ?
+            ORDER BY rq.sort_key ASC, rq.item_id ASC
+            """, (self.channel_id,))
             
             results = cur.fetchall()
             
@@ -565,13 +938,15 @@ class RotationSystemDAO:
             cur.close()
             conn.close()
 
-    def get_rotation_items_paginated(self, page: int = 1, page_size: int = 6) -> Dict:
+    def get_rotation_items_paginated(self, page: int = 1, page_size: int = 6,
+                                     include_pixels: bool = False) -> Dict:
         """
         Get paginated items from the rotation queue with their associated design info.
         
         Args:
             page: Page number (starting from 1)
             page_size: Number of items per page
+            include_pixels: Also return each design's pixel_data
             
         Returns:
             Dict with pagination info and items
@@ -584,20 +959,22 @@ class RotationSystemDAO:
             offset = (page - 1) * page_size
             
             # Get total count
-            cur.execute("SELECT COUNT(*) as count FROM rotation_queue")
+            cur.execute("SELECT COUNT(*) as count FROM rotation_queue WHERE channel_id = ?", (self.channel_id,))
             total = cur.fetchone()['count']
             
             # Calculate total pages
             total_pages = (total + page_size - 1) // page_size
             
             # Get items for current page
-            cur.execute("""
-            SELECT rq.*, d.* 
+            cur.execute(f"""
+            SELECT {_with_pixels(QUEUE_ITEM_COLUMNS, include_pixels)},
+                   ROW_NUMBER() OVER (ORDER BY rq.sort_key, rq.item_id) AS display_order
             FROM rotation_queue rq
             JOIN design d ON rq.design_id = d.design_id
-            ORDER BY rq.display_order ASC
+            WHERE rq.channel_id = ?
+            ORDER BY rq.sort_key ASC, rq.item_id ASC
             LIMIT ? OFFSET ?
-            """, (page_size, offset))
+            """, (self.channel_id, page_size, offset))
             
             results = cur.fetchall()
             
@@ -618,7 +995,7 @@ class RotationSystemDAO:
 
     def remove_item_from_rotation(self, item_id: int) -> bool:
         """
-        Remove an item from the rotation queue.
+        Remove an item from the rotation queue of whichever channel it's in.
         
         Args:
             item_id: ID of the item to remove
@@ -630,8 +1007,14 @@ class RotationSystemDAO:
         cur = conn.cursor()
         
         try:
+            cur.execute("SELECT channel_id FROM rotation_queue WHERE item_id = ?", (item_id,))
+            row = cur.fetchone()
+            if row is None:
+                return False
+            channel = self.for_channel(row['channel_id'])
+            
             # Check if this is the active item
-            active_item_id = self._get_active_item_id(conn)
+            active_item_id = channel._get_active_item_id(conn)
             
             # Delete the item
             cur.execute("DELETE FROM rotation_queue WHERE item_id = ?", (item_id,))
@@ -640,17 +1023,11 @@ class RotationSystemDAO:
             
             # If we deleted the active item, select a new one
             if success and item_id == active_item_id:
-                self._select_new_active_item(conn)
-
-            cur.execute("SELECT item_id FROM rotation_queue ORDER BY display_order ASC")
-            items = cur.fetchall()
-            for index, item in enumerate(items):
-                cur.execute(
-                "UPDATE rotation_queue SET display_order = ? WHERE item_id = ?",
-                (index + 1, item[0])
-                )
+                channel._select_new_active_item(conn)
 
             conn.commit()
+            if success:
+                notify('item_removed', channel_id=channel.channel_id, item_id=item_id)
             return success
             
         except Exception as e:
@@ -677,8 +1054,9 @@ class RotationSystemDAO:
             SELECT s.*, d.title
             FROM scheduled_items s
             JOIN design d ON s.design_id = d.design_id
+            WHERE s.channel_id = ?
             ORDER BY s.start_time ASC
-            """)
+            """, (self.channel_id,))
             
             results = cur.fetchall()
             
@@ -691,13 +1069,15 @@ class RotationSystemDAO:
             cur.close()
             conn.close()
         
-    def get_scheduled_items_paginated(self, page: int = 1, page_size: int = 6) -> Dict:
+    def get_scheduled_items_paginated(self, page: int = 1, page_size: int = 6,
+                                      include_pixels: bool = False) -> Dict:
         """
         Get paginated items from the scheduled queue with their associated design info.
         
         Args:
             page: Page number (starting from 1)
             page_size: Number of items per page
+            include_pixels: Also return each design's pixel_data
             
         Returns:
             Dict with pagination info and items
@@ -710,20 +1090,21 @@ class RotationSystemDAO:
             offset = (page - 1) * page_size
             
             # Get total count
-            cur.execute("SELECT COUNT(*) as count FROM scheduled_items")
+            cur.execute("SELECT COUNT(*) as count FROM scheduled_items WHERE channel_id = ?", (self.channel_id,))
             total = cur.fetchone()['count']
             
             # Calculate total pages
             total_pages = (total + page_size - 1) // page_size
             
             # Get items for current page
-            cur.execute("""
-            SELECT s.*, d.*
+            cur.execute(f"""
+            SELECT {_with_pixels(SCHEDULED_ITEM_COLUMNS, include_pixels)}
             FROM scheduled_items s
             JOIN design d ON s.design_id = d.design_id
+            WHERE s.channel_id = ?
             ORDER BY s.start_time ASC
             LIMIT ? OFFSET ?
-            """, (page_size, offset))
+            """, (self.channel_id, page_size, offset))
             
             results = cur.fetchall()
             
@@ -753,8 +1134,11 @@ class RotationSystemDAO:
         cur = conn.cursor()
         
         try:
-            cur.execute("DELETE FROM scheduled_items WHERE schedule_id = ?", (schedule_id,))
+            cur.execute("DELETE FROM scheduled_items WHERE schedule_id = ? RETURNING channel_id", (schedule_id,))
+            rows = cur.fetchall()
             conn.commit()
+            if rows:
+                notify('schedule_changed', channel_id=rows[0]['channel_id'], schedule_id=schedule_id, start_time=None)
             
         finally:
             cur.close()
@@ -769,7 +1153,7 @@ class RotationSystemDAO:
             
         cur = conn.cursor()
         try:
-            cur.execute("SELECT item_id FROM active_item WHERE id = 1")
+            cur.execute("SELECT item_id FROM active_item WHERE id = ?", (self.channel_id,))
             result = cur.fetchone()
             return result['item_id'] if result and result['item_id'] is not None else None
         finally:
@@ -778,7 +1162,7 @@ class RotationSystemDAO:
                 conn.close()
     
     def _select_new_active_item(self, conn=None) -> Optional[Dict]:
-        """Select a new active item from the rotation queue."""
+        """Select a new active item from the channel's rotation queue."""
         should_close = False
         if conn is None:
             conn = self._get_connection()
@@ -786,36 +1170,13 @@ class RotationSystemDAO:
             
         cur = conn.cursor()
         try:
-            # Get the first item in the queue by display_order
-            cur.execute("""
-            SELECT item_id FROM rotation_queue 
-            ORDER BY display_order ASC 
-            LIMIT 1
-            """)
-            
-            result = cur.fetchone()
-            now = datetime.now(timezone.utc)
-            if not result:
-                # No items in queue
-                cur.execute("UPDATE active_item SET item_id = NULL, activated_at = ? WHERE id = 1", (now,))
-                conn.commit()
-                return None
-            
-            # Set as active
-            cur.execute("""
-            UPDATE active_item
-            SET item_id = ?, activated_at = ?
-            WHERE id = 1
-            """, (result['item_id'], now))
-            
+            item_id, now = self._activate_first_item(cur)
             conn.commit()
+            notify('active_changed', channel_id=self.channel_id, item_id=item_id, activated_at=now)
+            if item_id is None:
+                return None
             
-            # Return full information - need to close connection first
-            if should_close:
-                cur.close()
-                conn.close()
-                
-            # Get full information with fresh connection
+            # Get full information, reusing this thread's pooled connection
             return self.get_active_image()
         except Exception as e:
             conn.rollback()
@@ -825,8 +1186,163 @@ class RotationSystemDAO:
             if should_close and conn:
                 conn.close()
     
+    def _activate_first_item(self, cur) -> Tuple[Optional[int], datetime]:
+        """
+        Make the first item in the channel's queue active, or none if it's
+        empty, without committing. Returns (item_id, activated_at).
+        """
+        cur.execute("""
+        SELECT item_id FROM rotation_queue 
+        WHERE channel_id = ?
+        ORDER BY sort_key ASC, item_id ASC 
+        LIMIT 1
+        """, (self.channel_id,))
+        
+        result = cur.fetchone()
+        item_id = result['item_id'] if result else None
+        now = datetime.now(timezone.utc)
+        cur.execute("UPDATE active_item SET item_id = ?, activated_at = ? WHERE id = ?",
+                    (item_id, now, self.channel_id))
+        return item_id, now
+    
+    def _make_room_after(self, conn, item_id: Optional[int], count: int) -> Tuple[float, float]:
+        """
+        Find room for count new items right after item_id (at the front if None).
+        
+        Returns:
+            (base, step) as returned by spread_sort_keys
+        """
+        cur = conn.cursor()
+        try:
+            for _ in range(2):
+                low = None
+                if item_id is not None:
+                    cur.execute("SELECT sort_key FROM rotation_queue WHERE item_id = ?", (item_id,))
+                    row = cur.fetchone()
+                    low = row['sort_key'] if row else None
+                
+                if low is None:
+                    cur.execute("""
+                    SELECT sort_key FROM rotation_queue
+                    WHERE channel_id = ?
+                    ORDER BY sort_key ASC, item_id ASC
+                    LIMIT 1
+                    """, (self.channel_id,))
+                else:
+                    cur.execute("""
+                    SELECT sort_key FROM rotation_queue
+                    WHERE channel_id = ? AND (sort_key, item_id) > (?, ?)
+                    ORDER BY sort_key ASC, item_id ASC
+                    LIMIT 1
+                    """, (self.channel_id, low, item_id))
+                row = cur.fetchone()
+                high = row['sort_key'] if row else None
+                
+                spread = spread_sort_keys(low, high, count)
+                if spread is not None:
+                    return spread
+                # Neighbours are too close together
+                self._rebalance(conn)
+            
+            raise RuntimeError("Couldn't make room in the rotation order")
+        finally:
+            cur.close()
+    
+    def _make_room_at_end(self, conn) -> Tuple[float, float]:
+        """Find room for new items after the last one in the queue."""
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT MAX(sort_key) AS max_key FROM rotation_queue WHERE channel_id = ?", (self.channel_id,))
+            return spread_sort_keys(cur.fetchone()['max_key'], None, 1)
+        finally:
+            cur.close()
+    
+    def _sort_key_for_position(self, conn, item_id: int, position: int) -> float:
+        """Sort key that puts item_id at the given 1-based position among the other items."""
+        cur = conn.cursor()
+        try:
+            for _ in range(2):
+                # The neighbours are the (position - 1)th and position-th of the other items
+                cur.execute("""
+                SELECT sort_key FROM rotation_queue
+                WHERE channel_id = ? AND item_id != ?
+                ORDER BY sort_key ASC, item_id ASC
+                LIMIT 2 OFFSET ?
+                """, (self.channel_id, item_id, max(0, position - 2)))
+                keys = [row['sort_key'] for row in cur.fetchall()]
+                
+                if position == 1:
+                    low, high = None, keys[0] if keys else None
+                else:
+                    low = keys[0] if keys else None
+                    high = keys[1] if len(keys) > 1 else None
+                    if low is None:
+                        # Past the end, move it last
+                        cur.execute("SELECT MAX(sort_key) AS max_key FROM rotation_queue "
+                                    "WHERE channel_id = ? AND item_id != ?", (self.channel_id, item_id))
+                        low = cur.fetchone()['max_key']
+                
+                spread = spread_sort_keys(low, high, 1)
+                if spread is not None:
+                    return spread[0] + spread[1]
+                self._rebalance(conn)
+            
+            raise RuntimeError("Couldn't make room in the rotation order")
+        finally:
+            cur.close()
+    
+    def _rebalance(self, conn) -> int:
+        """Spread the channel's sort keys SORT_KEY_GAP apart again, keeping the order."""
+        cur = conn.cursor()
+        try:
+            cur.execute("""
+            UPDATE rotation_queue
+            SET sort_key = ranked.position * ?
+            FROM (SELECT item_id, ROW_NUMBER() OVER (ORDER BY sort_key, item_id) AS position
+                  FROM rotation_queue
+                  WHERE channel_id = ?) AS ranked
+            WHERE rotation_queue.item_id = ranked.item_id
+            """, (SORT_KEY_GAP, self.channel_id))
+            return cur.rowcount
+        finally:
+            cur.close()
+    
+    def rebalance_sort_keys(self) -> int:
+        """
+        Rebalance the rotation order of every channel whose neighbouring sort
+        keys have become too close.
+        Meant to run in the background so edits rarely have to do it themselves.
+        
+        Returns:
+            Number of rows rewritten (0 if no order needed it)
+        """
+        conn = self._get_connection()
+        cur = conn.cursor()
+        
+        try:
+            cur.execute("""
+            SELECT channel_id
+            FROM (SELECT channel_id, sort_key,
+                         LEAD(sort_key) OVER (PARTITION BY channel_id ORDER BY sort_key, item_id) AS next_key
+                  FROM rotation_queue)
+            GROUP BY channel_id
+            HAVING MIN(next_key - sort_key) < ?
+            """, (REBALANCE_MIN_GAP,))
+            crowded = [row['channel_id'] for row in cur.fetchall()]
+            if not crowded:
+                return 0
+            
+            rewritten = sum(self.for_channel(channel_id)._rebalance(conn) for channel_id in crowded)
+            conn.commit()
+            print(f"Rebalanced rotation order of {len(crowded)} channel(s) ({rewritten} items)")
+            return rewritten
+            
+        finally:
+            cur.close()
+            conn.close()
+
     def _ensure_active_item(self, conn=None):
-        """Make sure there is an active item if the queue isn't empty."""
+        """Make sure the channel has an active item if its queue isn't empty."""
         should_close = False
         if conn is None:
             conn = self._get_connection()
@@ -841,17 +1357,19 @@ class RotationSystemDAO:
             if should_close:
                 conn.close()
 
-    def get_user_history(self, email: str) -> List[Dict[str, Any]]:
+    def get_user_history(self, email: str, include_pixels: bool = True) -> List[Dict[str, Any]]:
         """
-        Return rotation queue history for designs created by the given user email.
+        Return rotation queue history, on every channel, for designs created by the given user email.
+        display_order is the position in the item's own channel. pixel_data is only selected with include_pixels.
         """
         conn = self._get_connection()
         cur = conn.cursor()
         try:
-            query = """
+            query = f"""
                 SELECT
                     rq.item_id       AS history_id,
                     rq.item_id       AS item_id,
+                    rq.channel_id    AS channel_id,
                     rq.created_at    AS created_at,
                     rq.duration      AS duration,
                     rq.display_order AS display_order,
@@ -861,10 +1379,14 @@ class RotationSystemDAO:
                         ELSE 'expired'
                     END             AS status,
                     d.title          AS title,
-                    d.pixel_data     AS pixel_data
-                FROM rotation_queue rq
+                    d.design_id      AS design_id,
+                    df.version       AS frame_version
+                    {f', {PIXEL_DATA_COLUMN} AS pixel_data' if include_pixels else ''}
+                FROM (SELECT *, ROW_NUMBER() OVER (PARTITION BY channel_id ORDER BY sort_key, item_id) AS display_order
+                      FROM rotation_queue) rq
                 JOIN design d ON d.design_id = rq.design_id
                 JOIN user u ON u.user_id = d.user_id
+                LEFT JOIN design_frame df ON df.design_id = d.design_id
                 WHERE u.email = ?
                 ORDER BY rq.created_at DESC;
             """
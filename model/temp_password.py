@@ -1,10 +1,11 @@
 import sqlite3
 
+from model.connection_pool import pool
+
 
 class TempPasswordDAO:
     def __init__(self):
-        database_path = 'data.db'
-        self.conn = sqlite3.connect(database_path)
+        self.conn = pool.connect()
 
     def add_temp_password(self, user_id, temp_password):
         status = 1
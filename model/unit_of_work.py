@@ -0,0 +1,212 @@
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+from flask import g, has_request_context
+
+from model.connection_pool import ConnectionPool, pool
+
+# Statements that manage the transaction rather than read or write data
+_CONTROL_STATEMENTS = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE', 'PRAGMA')
+
+_stats_lock = threading.Lock()
+_stats = {
+    'requests': 0,
+    'requests_with_db': 0,
+    'queries': 0,
+    'max_queries': 0,
+    'commits': 0,
+    'deferred_commits': 0,
+    'rollbacks': 0,
+}
+
+
+class UnitOfWork:
+    """
+    One connection and one transaction for a whole HTTP request.
+
+    The connection is only checked out when a DAO first asks the pool for
+    one. From then on every DAO on the request thread shares it, their
+    commit() calls are deferred, and the unit commits once at the end.
+
+    Each deferred commit sets a savepoint, so a DAO that rolls back after
+    an error undoes its own writes and keeps the ones committed before it.
+    """
+
+    def __init__(self, connection_pool: ConnectionPool = pool):
+        self.pool = connection_pool
+        self.conn: Optional[sqlite3.Connection] = None
+        self.query_count = 0
+        self.deferred_commits = 0
+        self._after_commit = []
+        self._savepoint = False
+        self._lost = False
+        self.rolled_back = False
+
+    def attach(self, conn: sqlite3.Connection):
+        """Called by the pool when the request thread first gets a connection."""
+        self.conn = conn
+        conn.set_trace_callback(self._trace)
+
+    def defer_commit(self):
+        self.deferred_commits += 1
+        if self.conn is not None and self.conn.in_transaction:
+            if self._savepoint:
+                self.conn.execute("RELEASE uow_deferred")
+            self.conn.execute("SAVEPOINT uow_deferred")
+            self._savepoint = True
+
+    def rollback_uncommitted(self):
+        """A DAO's rollback(): undo the writes since the last deferred commit."""
+        if self._savepoint and self.conn.in_transaction:
+            # Events already queued belong to commits before the savepoint
+            self.conn.execute("ROLLBACK TO uow_deferred")
+            return
+
+        # SQLite may have aborted the whole transaction, deferred commits included
+        self._lost = self._lost or self._savepoint
+        self.rollback()
+
+    def after_commit(self, callback):
+        """Run callback once the pending writes are committed (never on rollback)."""
+        self._after_commit.append(callback)
+
+    def flush(self):
+        """Commit what has been written so far without ending the unit."""
+        if self.conn is not None and self.conn.in_transaction:
+            self.commit()
+
+    def commit(self):
+        self._savepoint = False
+        if self._lost:
+            self._lost = False
+            self._after_commit = []
+            raise sqlite3.OperationalError("Writes committed earlier in the request were rolled back")
+        if self.conn is not None:
+            sqlite3.Connection.commit(self.conn)
+
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            callback()
+
+    def rollback(self):
+        self._after_commit = []
+        self._savepoint = False
+        if self.conn is not None:
+            sqlite3.Connection.rollback(self.conn)
+
+    def close(self):
+        """Detach from the connection and hand it back to the pool."""
+        self.pool.unbind_unit()
+        if self.conn is not None:
+            self.conn.set_trace_callback(None)
+            self.conn = None
+            self.pool.release_thread()
+
+    def _trace(self, statement: str):
+        if not statement.lstrip().upper().startswith(_CONTROL_STATEMENTS):
+            self.query_count += 1
+
+
+def begin_unit_of_work():
+    """before_request hook: start the request's unit of work and bind it to g."""
+    unit = UnitOfWork()
+    g.unit_of_work = unit
+    unit.pool.bind_unit(unit)
+
+
+def get_unit_of_work() -> Optional[UnitOfWork]:
+    """Return the current request's unit of work, if any."""
+    if not has_request_context():
+        return None
+    return g.get('unit_of_work')
+
+
+def flush_unit_of_work():
+    """
+    Commit pending writes early, e.g. before slow network calls,
+    so the write lock isn't held for the rest of the request.
+    """
+    unit = get_unit_of_work()
+    if unit is not None:
+        unit.flush()
+
+
+def commit_unit_of_work(response):
+    """
+    after_request hook: commit the request's transaction once.
+    Runs before the response is sent so a failed commit can still be reported.
+
+    Error responses roll back instead. DAOs report failures as status codes
+    without rolling back, so whatever a failed request wrote before the
+    error would otherwise be kept while the client is told it failed.
+    Writes flushed earlier in the request are already committed and stay.
+    """
+    unit = get_unit_of_work()
+    if unit is None or unit.conn is None:
+        return response
+
+    if response.status_code >= 400:
+        unit.rollback()
+        unit.rolled_back = True
+        response.headers['X-DB-Queries'] = str(unit.query_count)
+        return response
+
+    try:
+        unit.commit()
+        committed = True
+    except sqlite3.Error as e:
+        print(f"Error committing request transaction: {e}")
+        unit.rollback()
+        unit.rolled_back = True
+        committed = False
+
+    response.headers['X-DB-Queries'] = str(unit.query_count)
+    if not committed:
+        response.status_code = 500
+        response.set_data(b'{"error": "Couldn\'t save changes"}\n')
+        response.mimetype = 'application/json'
+    return response
+
+
+def end_unit_of_work(exception=None):
+    """
+    teardown_request hook: roll back anything left uncommitted (unhandled
+    errors skip after_request), release the connection and record stats.
+    """
+    unit = g.pop('unit_of_work', None)
+    if unit is None:
+        return
+
+    rolled_back = unit.rolled_back
+    try:
+        if unit.conn is not None and unit.conn.in_transaction:
+            unit.rollback()
+            rolled_back = True
+    except sqlite3.Error as e:
+        print(f"Error rolling back request transaction: {e}")
+    finally:
+        used_db = unit.conn is not None
+        unit.close()
+
+    with _stats_lock:
+        _stats['requests'] += 1
+        if used_db:
+            _stats['requests_with_db'] += 1
+        _stats['queries'] += unit.query_count
+        _stats['max_queries'] = max(_stats['max_queries'], unit.query_count)
+        _stats['deferred_commits'] += unit.deferred_commits
+        if rolled_back:
+            _stats['rollbacks'] += 1
+        elif used_db:
+            _stats['commits'] += 1
+
+
+def unit_of_work_stats() -> Dict:
+    """Return aggregate per-request query statistics."""
+    with _stats_lock:
+        stats = dict(_stats)
+
+    requests = stats['requests_with_db']
+    stats['avg_queries'] = round(stats['queries'] / requests, 2) if requests else None
+    return stats
@@ -1,13 +1,12 @@
 import sqlite3
 
+from model.connection_pool import pool
+from model.design import PIXEL_DATA_COLUMN
+
 class UploadHistoryDAO:
     def __init__(self):
-        database_path = 'data.db'
-        print("Connecting to SQLite database at:", database_path)
         try:
-            self.conn = sqlite3.connect(database_path)
-            self.conn.execute("PRAGMA foreign_keys = ON")
-            self.conn.execute("PRAGMA busy_timeout = 5000;")
+            self.conn = pool.connect()
         except sqlite3.Error as e:
             print(f"Database connection error: {e}")
             raise
@@ -46,8 +45,9 @@ class UploadHistoryDAO:
                 "INSERT INTO upload_history (design_id, attempt_time, status) VALUES (?, ?, ?);",
                 (design_id, attempt_time, status)
             )
+            history_id = cursor.lastrowid
             self.conn.commit()
-            cursor.execute("SELECT * FROM upload_history ORDER BY history_id DESC LIMIT 1;")
+            cursor.execute("SELECT * FROM upload_history WHERE history_id = ?;", (history_id,))
             return cursor.fetchone()
         except sqlite3.Error as e:
             print(f"Error adding new upload history: {e}")
@@ -103,14 +103,14 @@ class UploadHistoryDAO:
         cursor = None
         try:
             cursor = self.conn.cursor()
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT
                   uh.history_id,
                   uh.design_id,
                   uh.attempt_time,
                   uh.status,
                   d.title,
-                  d.pixel_data
+                  {PIXEL_DATA_COLUMN} AS pixel_data
                 FROM upload_history uh
                 JOIN design d ON d.design_id = uh.design_id
                 JOIN user   u ON u.user_id   = d.user_id
@@ -144,22 +144,27 @@ class UploadHistoryDAO:
             if cursor:
                 cursor.close()
 
-    def getByUserEmailPaginated(self, email, page, page_size):
+    def getByUserEmailPaginated(self, email, page, page_size, include_pixels=True):
+        """
+        The last column is pixel_data, or the design's frame version when
+        include_pixels is False (list views link a thumbnail instead).
+        """
         cursor = None
         offset = (page - 1) * page_size
         try:
             cursor = self.conn.cursor()
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT
                   uh.history_id,
                   uh.design_id,
                   uh.attempt_time,
                   uh.status,
                   d.title,
-                  d.pixel_data
+                  {f'{PIXEL_DATA_COLUMN} AS pixel_data' if include_pixels else 'df.version'}
                 FROM upload_history uh
                 JOIN design d ON d.design_id = uh.design_id
                 JOIN user   u ON u.user_id   = d.user_id
+                LEFT JOIN design_frame df ON df.design_id = d.design_id
                 WHERE u.email = ?
                 ORDER BY uh.attempt_time DESC
                 LIMIT ? OFFSET ?
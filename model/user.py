@@ -1,12 +1,12 @@
 import sqlite3
 
+from model.connection_pool import pool
+
 
 class UserDAO:
 
     def __init__(self):
-        database_path = 'data.db'
-        self.conn = sqlite3.connect(database_path)
-        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn = pool.connect()
 
     def get_all_users(self):
         cursor = self.conn.cursor()
@@ -109,6 +109,25 @@ class UserDAO:
         finally:
             cursor.close()
 
+    def get_principal_by_email(self, email):
+        """
+        Everything needed to authorize a request in one lookup.
+        :param email:
+        :return: (user_id, is_admin) or None
+        """
+        cursor = self.conn.cursor()
+        query = "SELECT user_id, is_admin FROM user WHERE email = ?;"
+
+        try:
+            cursor.execute(query, (email,))
+            return cursor.fetchone()
+
+        except sqlite3.Error:
+            return None
+
+        finally:
+            cursor.close()
+
     def get_email_verification_by_email(self, email):
         status = 1
         cursor = self.conn.cursor()
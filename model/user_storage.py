@@ -0,0 +1,151 @@
+import sqlite3
+from typing import Optional
+
+from model.connection_pool import get_pool
+
+
+class UserStorageDAO:
+    """
+    Data Access Object for the per-user storage ledger.
+
+    Triggers on the design table keep each user's byte count current, so
+    reading it is a primary key lookup. A user pays once for each distinct
+    payload their designs use. reconcile() recomputes it all from the
+    designs in case anything ever wrote around the triggers.
+    """
+
+    def __init__(self, db_path='data.db'):
+        """Initialize the DAO with the database path."""
+        self.db_path = db_path
+
+    def _get_connection(self):
+        return get_pool(self.db_path).connect()
+
+    def get_bytes(self, user_id: int) -> int:
+        """Get the bytes a user's designs take up (0 for a user without designs)."""
+        conn = self._get_connection()
+        cur = conn.cursor()
+
+        try:
+            cur.execute("SELECT bytes FROM user_storage WHERE user_id = ?", (user_id,))
+            row = cur.fetchone()
+            return row['bytes'] if row else 0
+
+        finally:
+            cur.close()
+            conn.close()
+
+    def reserve(self, user_id: int, digest: bytes, incoming_bytes: int, limit_bytes: int,
+                design_id: Optional[int] = None) -> bool:
+        """
+        Check that a design write fits in the user's quota and hold the
+        database write lock until the transaction ends.
+
+        The check is a conditional write, so it takes the lock itself and no
+        other upload can commit between it and the design write. Call it in
+        the transaction that writes the design (the request's unit of work);
+        the ledger triggers then record the new size.
+
+        Args:
+            user_id: Owner of the design
+            digest: payload_hash of the new pixel_data
+            incoming_bytes: Stored size of the new pixel_data, if it isn't stored yet
+            limit_bytes: The user's quota
+            design_id: Design being replaced, its payload is credited back if
+                nothing else of the user's uses it
+
+        Returns:
+            True if the write fits
+        """
+        conn = self._get_connection()
+        cur = conn.cursor()
+
+        try:
+            cur.execute("INSERT INTO user_storage (user_id) VALUES (?) ON CONFLICT (user_id) DO NOTHING", (user_id,))
+            cur.execute("""
+                        UPDATE user_storage
+                        SET bytes = bytes
+                        WHERE user_id = :user
+                          AND bytes
+                              + CASE
+                                    WHEN EXISTS (SELECT 1 FROM user_payload
+                                                 WHERE user_id = :user AND payload_hash = :hash) THEN 0
+                                    ELSE COALESCE((SELECT size FROM design_payload WHERE payload_hash = :hash),
+                                                  :incoming)
+                                END
+                              - COALESCE((SELECT dp.size
+                                          FROM design d
+                                          JOIN user_payload up
+                                            ON up.user_id = d.user_id AND up.payload_hash = d.payload_hash
+                                          JOIN design_payload dp ON dp.payload_hash = d.payload_hash
+                                          WHERE d.design_id = :design
+                                            AND d.user_id = :user
+                                            AND up.ref_count = 1
+                                            AND d.payload_hash IS NOT :hash), 0)
+                              <= :limit
+                        """, {'user': user_id, 'hash': digest, 'incoming': incoming_bytes,
+                              'design': design_id, 'limit': limit_bytes})
+            return cur.rowcount == 1
+
+        finally:
+            cur.close()
+            conn.close()
+
+    def reconcile(self) -> int:
+        """
+        Recompute the payload reference counts and every user's ledger row
+        from the designs, and delete payloads no design uses.
+
+        Returns:
+            Number of users whose count had drifted and was corrected
+        """
+        conn = self._get_connection()
+        cur = conn.cursor()
+
+        try:
+            refs = "SELECT COUNT(*) FROM design d WHERE d.payload_hash = design_payload.payload_hash"
+            cur.execute(f"UPDATE design_payload SET ref_count = ({refs}) WHERE ref_count IS NOT ({refs})")
+            cur.execute("DELETE FROM design_payload WHERE ref_count = 0")
+            collected = cur.rowcount
+
+            cur.execute("DELETE FROM user_payload")
+            cur.execute("""
+                        INSERT INTO user_payload (user_id, payload_hash, ref_count)
+                        SELECT user_id, payload_hash, COUNT(*) FROM design GROUP BY user_id, payload_hash
+                        """)
+
+            used = """SELECT COALESCE(SUM(dp.size), 0)
+                      FROM user_payload up
+                      JOIN design_payload dp ON dp.payload_hash = up.payload_hash
+                      WHERE up.user_id = s.user_id"""
+            cur.execute(f"""
+                        UPDATE user_storage AS s
+                        SET bytes = ({used})
+                        WHERE bytes IS NOT ({used})
+                        """)
+            corrected = cur.rowcount
+            # Users with designs the ledger has no row for
+            cur.execute("""
+                        INSERT INTO user_storage (user_id, bytes)
+                        SELECT up.user_id, SUM(dp.size)
+                        FROM user_payload up
+                        JOIN design_payload dp ON dp.payload_hash = up.payload_hash
+                        WHERE NOT EXISTS (SELECT 1 FROM user_storage s WHERE s.user_id = up.user_id)
+                        GROUP BY up.user_id
+                        """)
+            corrected += cur.rowcount
+            cur.execute("UPDATE user_storage SET reconciled_at = CURRENT_TIMESTAMP")
+            conn.commit()
+
+            if corrected or collected:
+                print(f"Storage ledger: corrected {corrected} user(s), collected {collected} unused payload(s)")
+            return corrected
+
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"Storage ledger reconciliation failed: {e}")
+            return 0
+
+        finally:
+            cur.close()
+            conn.close()
@@ -0,0 +1,51 @@
+import threading
+from typing import Callable, Dict, Generic, List, Tuple, TypeVar
+
+from model.rotation_events import add_listener
+
+T = TypeVar('T')
+
+
+class ChannelRegistry(Generic[T]):
+    """
+    One instance of a service per display channel, created the first time
+    the channel is asked for, so state that belongs to one LED board (an
+    event buffer, a packet log) is never shared with another.
+
+    Instances are dropped when their channel is removed; ones with a
+    close() method are closed first.
+    """
+
+    def __init__(self, factory: Callable[[int], T]):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._instances: Dict[int, T] = {}
+        self._listening = False
+
+    def get(self, channel_id: int) -> T:
+        with self._lock:
+            if not self._listening:
+                add_listener(self._on_event)
+                self._listening = True
+
+            instance = self._instances.get(channel_id)
+            if instance is None:
+                instance = self._instances[channel_id] = self._factory(channel_id)
+            return instance
+
+    def items(self) -> List[Tuple[int, T]]:
+        with self._lock:
+            return sorted(self._instances.items())
+
+    def stats(self) -> Dict[int, Dict]:
+        return {channel_id: instance.stats() for channel_id, instance in self.items()}
+
+    def _on_event(self, event: str, details: Dict):
+        if event != 'channel_removed':
+            return
+
+        with self._lock:
+            instance = self._instances.pop(details['channel_id'], None)
+        close = getattr(instance, 'close', None)
+        if close is not None:
+            close()
@@ -0,0 +1,217 @@
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from model.display_channel import DEFAULT_CHANNEL_ID, DisplayChannelDAO
+from model.rotation_events import add_listener, remove_listener
+from model.rotation_system import RotationSystemDAO
+from services.rotation_engine import RESYNC_INTERVAL_MINUTES
+
+# Items kept ready after the active one
+PREFETCH_DEPTH = 4
+# One refill job per channel, named PREFETCH_JOB_ID:<channel_id>
+PREFETCH_JOB_ID = 'frame_prefetch'
+PREFETCH_RESYNC_JOB_ID = 'frame_prefetch_resync'
+
+# DAO events that can change which items (or frames) belong in a ring
+_REFILL_EVENTS = ('item_added', 'item_removed', 'items_expired', 'items_activated', 'reordered',
+                  'channel_added', 'design_changed', 'design_deleted')
+
+
+class _ChannelRing:
+    """One channel's prefetched frames."""
+
+    def __init__(self):
+        self.ring: Dict[int, Dict] = {}  # item_id -> item_id, design_id, frame_version, frame
+        self.active_id: Optional[int] = None
+        self.current: Optional[Dict] = None
+        # Bumped on every active_changed so a slow refill can't undo a newer swap
+        self.epoch = 0
+
+
+class FramePrefetcher:
+    """
+    Keeps the compiled frames of each channel's active item and the next
+    PREFETCH_DEPTH items in memory.
+
+    When a channel's active item changes the new one is normally already
+    in its ring, so serving it is a pointer swap that doesn't wait on the
+    database. The ring is refilled on a scheduler thread afterwards, and
+    whenever the channel's queue or one of its designs changes, only
+    loading the frames it doesn't already hold.
+    """
+
+    def __init__(self):
+        self.scheduler = None
+        self.dao: Optional[RotationSystemDAO] = None
+        self.db_path = 'data.db'
+        self.running = False
+        self._lock = threading.Lock()
+        self._refill_lock = threading.Lock()
+        self._channels: Dict[int, _ChannelRing] = {}
+        self._stats = {'refills': 0, 'frames_loaded': 0, 'hits': 0, 'misses': 0, 'failed_refills': 0}
+
+    def start(self, scheduler, db_path: str = 'data.db'):
+        """Fill every channel's ring and keep them in sync using the given scheduler."""
+        self.scheduler = scheduler
+        self.db_path = db_path
+        self.dao = RotationSystemDAO(db_path)
+        add_listener(self._on_event)
+        self.running = True
+        self.refill_all()
+
+        self.scheduler.add_job(
+            self.refill_all,
+            'interval',
+            minutes=RESYNC_INTERVAL_MINUTES,
+            id=PREFETCH_RESYNC_JOB_ID,
+            replace_existing=True
+        )
+
+    def stop(self):
+        remove_listener(self._on_event)
+        self.running = False
+        with self._lock:
+            self._channels = {}
+
+    def current(self, channel_id: int = DEFAULT_CHANNEL_ID) -> Optional[Dict]:
+        """
+        A channel's active item frame, from memory.
+
+        Returns:
+            Dict with item_id, design_id, frame_version and frame, or None
+            if it isn't in the ring and has to be read from the database
+        """
+        with self._lock:
+            channel = self._channels.get(channel_id)
+            return channel.current if self.running and channel else None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['running'] = self.running
+            stats['channels'] = len(self._channels)
+            stats['ring_size'] = sum(len(channel.ring) for channel in self._channels.values())
+            stats['ring_bytes'] = sum(len(entry['frame']) for channel in self._channels.values()
+                                      for entry in channel.ring.values())
+        return stats
+
+    def refill_all(self):
+        """Refill the ring of every channel, dropping rings of removed channels."""
+        try:
+            channel_ids = DisplayChannelDAO(self.db_path).get_channel_ids()
+        except sqlite3.Error as e:
+            print(f"Error listing display channels: {e}")
+            return
+
+        with self._lock:
+            for channel_id in set(self._channels) - set(channel_ids):
+                del self._channels[channel_id]
+        for channel_id in channel_ids:
+            self.refill(channel_id)
+
+    def refill(self, channel_id: int = DEFAULT_CHANNEL_ID):
+        """Bring a channel's ring in line with its queue, loading only missing or outdated frames."""
+        if self.dao is None:
+            return
+
+        dao = self.dao.for_channel(channel_id)
+        with self._refill_lock:
+            with self._lock:
+                channel = self._channels.setdefault(channel_id, _ChannelRing())
+                epoch = channel.epoch
+                held = {item_id: (entry['design_id'], entry['frame_version'])
+                        for item_id, entry in channel.ring.items()}
+
+            try:
+                queue, active = dao.get_rotation_state()
+                active_id = active['item_id'] if active else None
+                window = self._window([item['item_id'] for item in queue], active_id)
+
+                versions = dao.get_item_frames(window, include_frame=False)
+                stale = [row['item_id'] for row in versions
+                         if row['frame_version'] is not None
+                         and held.get(row['item_id']) != (row['design_id'], row['frame_version'])]
+                loaded = dao.get_item_frames(stale) if stale else []
+            except sqlite3.Error as e:
+                print(f"Error prefetching rotation frames for channel {channel_id}: {e}")
+                with self._lock:
+                    self._stats['failed_refills'] += 1
+                return
+
+            with self._lock:
+                if self._channels.get(channel_id) is not channel:
+                    # Removed while we were reading
+                    return
+
+                ring = {item_id: channel.ring[item_id] for item_id in window
+                        if item_id in channel.ring and item_id not in stale}
+                for row in loaded:
+                    if row['frame'] is not None:
+                        ring[row['item_id']] = row
+
+                channel.ring = ring
+                if channel.epoch == epoch:
+                    channel.active_id = active_id
+                channel.current = ring.get(channel.active_id)
+                self._stats['refills'] += 1
+                self._stats['frames_loaded'] += len(loaded)
+
+    @staticmethod
+    def _window(order: List[int], active_id: Optional[int]) -> List[int]:
+        """The active item and the ones after it, wrapping around like the engine does."""
+        if not order:
+            return []
+
+        start = order.index(active_id) if active_id in order else 0
+        size = min(len(order), PREFETCH_DEPTH + 1)
+        return [order[(start + offset) % len(order)] for offset in range(size)]
+
+    def _on_event(self, event: str, details: Dict):
+        if not self.running:
+            return
+
+        channel_id = details.get('channel_id')
+        if event == 'active_changed':
+            with self._lock:
+                channel = self._channels.setdefault(channel_id, _ChannelRing())
+                channel.epoch += 1
+                channel.active_id = details['item_id']
+                channel.current = channel.ring.get(channel.active_id)
+                if channel.active_id is not None:
+                    self._stats['hits' if channel.current else 'misses'] += 1
+            # Slide the window forward off the switching thread
+            self._schedule_refill(channel_id)
+        elif event == 'channel_removed':
+            with self._lock:
+                self._channels.pop(channel_id, None)
+        elif event in _REFILL_EVENTS:
+            if channel_id is None:
+                # A design change can touch any channel's ring
+                with self._lock:
+                    channel_ids = list(self._channels)
+                for channel_id in channel_ids:
+                    self._schedule_refill(channel_id)
+            else:
+                self._schedule_refill(channel_id)
+
+    def _schedule_refill(self, channel_id: int):
+        if self.scheduler is None:
+            return
+
+        self.scheduler.add_job(
+            self.refill,
+            'date',
+            run_date=datetime.now(timezone.utc),
+            args=(channel_id,),
+            id=f"{PREFETCH_JOB_ID}:{channel_id}",
+            replace_existing=True,
+            # One may wait while another is running; the refill lock serializes them
+            max_instances=2,
+            misfire_grace_time=None
+        )
+
+
+# Create a singleton instance
+frame_prefetcher = FramePrefetcher()
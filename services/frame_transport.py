@@ -0,0 +1,269 @@
+import struct
+import threading
+import zlib
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from model.design import DesignDAO
+from model.display_channel import DEFAULT_CHANNEL_ID
+from model.frame import BYTES_PER_PIXEL, FRAME_SIZE
+from model.rotation_system import RotationSystemDAO
+from services.channel_registry import ChannelRegistry
+from services.frame_prefetcher import frame_prefetcher
+
+PACKET_MAGIC = b'RF'
+FORMAT_VERSION = 1
+KIND_KEYFRAME = 0
+KIND_DELTA = 1
+# magic, format version, kind, seq, base seq, design id, frame version, CRC32 of the result, payload length
+PACKET_HEADER = struct.Struct('>2sBBIIIIII')
+# Delta run: pixels to leave alone, then pixels to paint, then their color
+DELTA_RUN = struct.Struct('>HH3s')
+MAX_RUN = 0xFFFF
+
+# Every Nth packet is a keyframe, so no chain of deltas gets long
+KEYFRAME_INTERVAL = 16
+# Packets kept for boards that missed a few switches
+HISTORY_SIZE = 64
+
+FRAME_PIXELS = FRAME_SIZE // BYTES_PER_PIXEL
+
+
+class Packet(NamedTuple):
+    seq: int
+    kind: int
+    checksum: int
+    data: bytes
+
+
+def frame_checksum(frame: bytes) -> int:
+    return zlib.crc32(frame) & 0xFFFFFFFF
+
+
+def encode_delta(previous: bytes, frame: bytes) -> bytes:
+    """
+    Encode frame as runs against previous. A run starts at a changed pixel
+    and covers every following pixel of the same color, changed or not.
+    """
+    runs = []
+    skip = 0
+    pixel = 0
+    while pixel < FRAME_PIXELS:
+        offset = pixel * BYTES_PER_PIXEL
+        color = frame[offset:offset + BYTES_PER_PIXEL]
+        if previous[offset:offset + BYTES_PER_PIXEL] == color:
+            skip += 1
+            pixel += 1
+            continue
+
+        length = 1
+        while pixel + length < FRAME_PIXELS and length < MAX_RUN:
+            next_offset = (pixel + length) * BYTES_PER_PIXEL
+            if frame[next_offset:next_offset + BYTES_PER_PIXEL] != color:
+                break
+            length += 1
+
+        runs.append(DELTA_RUN.pack(skip, length, color))
+        skip = 0
+        pixel += length
+
+    return b''.join(runs)
+
+
+def apply_delta(previous: bytes, payload: bytes) -> bytes:
+    frame = bytearray(previous)
+    pixel = 0
+    for skip, length, color in DELTA_RUN.iter_unpack(payload):
+        pixel += skip
+        frame[pixel * BYTES_PER_PIXEL:(pixel + length) * BYTES_PER_PIXEL] = color * length
+        pixel += length
+    return bytes(frame)
+
+
+def decode_packets(data: bytes, frame: Optional[bytes] = None) -> Tuple[bytes, int, int]:
+    """
+    Apply a response from /rotation/frames, as a board would.
+
+    Args:
+        data: Concatenated packets
+        frame: The frame the board currently shows (needed if the first packet is a delta)
+
+    Returns:
+        Tuple of (resulting frame, last seq, its checksum)
+
+    Raises:
+        ValueError: If the data is malformed or a checksum doesn't match
+    """
+    position = 0
+    seq = checksum = None
+    while position < len(data):
+        magic, version, kind, seq, _base_seq, _design_id, _frame_version, checksum, length = \
+            PACKET_HEADER.unpack_from(data, position)
+        if magic != PACKET_MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a frame packet")
+
+        position += PACKET_HEADER.size
+        payload = data[position:position + length]
+        position += length
+
+        if kind == KIND_KEYFRAME:
+            frame = payload
+        elif frame is None:
+            raise ValueError("Delta without a base frame")
+        else:
+            frame = apply_delta(frame, payload)
+
+        if frame_checksum(frame) != checksum:
+            raise ValueError(f"Checksum mismatch at packet {seq}")
+
+    if frame is None:
+        raise ValueError("No packets")
+    return frame, seq, checksum
+
+
+class FrameTransport:
+    """
+    Delivers the frames a channel displays to its LED controller as
+    keyframes plus run-length coded deltas against the previously
+    displayed design.
+
+    Every design shown is given the next number in a packet log built
+    lazily when a board polls. A board that sends the seq and checksum it
+    last applied gets only the packets after it. A board that is unknown,
+    too far behind or out of sync gets a keyframe of the current frame.
+    """
+
+    def __init__(self, db_path: str = 'data.db', channel_id: int = DEFAULT_CHANNEL_ID):
+        self.channel_id = channel_id
+        self.dao = RotationSystemDAO(db_path, channel_id)
+        self._lock = threading.Lock()
+        self._history: deque = deque(maxlen=HISTORY_SIZE)
+        self._seq = 0
+        self._since_keyframe = 0
+        self._shown: Optional[Tuple[int, int]] = None  # design_id, frame_version of the last packet
+        self._frame: Optional[bytes] = None
+        self._stats = {'packets': 0, 'keyframes': 0, 'deltas': 0, 'responses': 0, 'up_to_date': 0,
+                       'resyncs': 0, 'bytes_sent': 0, 'full_frame_bytes': 0}
+
+    def packets_since(self, since: Optional[int] = None, checksum: Optional[int] = None
+                      ) -> Optional[Tuple[bytes, int, Dict]]:
+        """
+        Packets that take a board from (since, checksum) to the current frame.
+
+        Returns:
+            Tuple of (concatenated packets, empty if up to date; current seq;
+            active item info), or None if nothing is active
+        """
+        current = self._current_frame()
+        if current is None:
+            return None
+
+        with self._lock:
+            self._advance(current)
+            self._stats['responses'] += 1
+
+            if since == self._seq and checksum == self._history[-1].checksum:
+                self._stats['up_to_date'] += 1
+                return b'', self._seq, current
+
+            packets = self._chain_after(since, checksum)
+            if packets is None:
+                if since is not None:
+                    self._stats['resyncs'] += 1
+                packets = [self._keyframe()]
+
+            data = b''.join(packet.data for packet in packets)
+            self._stats['bytes_sent'] += len(data)
+            self._stats['full_frame_bytes'] += len(packets) * (PACKET_HEADER.size + FRAME_SIZE)
+            return data, self._seq, current
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['seq'] = self._seq
+            stats['history'] = len(self._history)
+        if stats['full_frame_bytes']:
+            stats['bytes_saved_ratio'] = round(1 - stats['bytes_sent'] / stats['full_frame_bytes'], 3)
+        return stats
+
+    def _current_frame(self) -> Optional[Dict]:
+        """The active item's frame, from the prefetch ring when possible."""
+        current = frame_prefetcher.current(self.channel_id)
+        if current:
+            return current
+
+        info = self.dao.get_active_frame_info()
+        if not info:
+            return None
+        frame = DesignDAO().get_frame(info['design_id'])
+        if frame is None:
+            return None
+        info['frame_version'], info['frame'] = frame
+        return info
+
+    def _advance(self, current: Dict):
+        """Log a packet if the current frame isn't the last one sent. Lock must be held."""
+        shown = (current['design_id'], current['frame_version'])
+        if shown == self._shown:
+            return
+
+        frame = current['frame']
+        self._seq += 1
+        delta = None
+        if self._frame is not None and self._since_keyframe + 1 < KEYFRAME_INTERVAL:
+            delta = encode_delta(self._frame, frame)
+            # Deltas only pay off while they are smaller than the frame itself
+            if len(delta) >= FRAME_SIZE:
+                delta = None
+
+        if delta is None:
+            packet = self._packet(KIND_KEYFRAME, 0, current, frame, frame)
+            self._since_keyframe = 0
+            self._stats['keyframes'] += 1
+        else:
+            packet = self._packet(KIND_DELTA, self._seq - 1, current, frame, delta)
+            self._since_keyframe += 1
+            self._stats['deltas'] += 1
+
+        self._history.append(packet)
+        self._shown = shown
+        self._frame = frame
+        self._stats['packets'] += 1
+
+    def _chain_after(self, since: Optional[int], checksum: Optional[int]) -> Optional[List[Packet]]:
+        """Logged packets after since, from the last keyframe among them. Lock must be held."""
+        if since is None or not self._history:
+            return None
+
+        oldest = self._history[0].seq
+        if not oldest <= since < self._seq:
+            return None
+
+        base = self._history[since - oldest]
+        if base.checksum != checksum:
+            return None
+
+        chain = list(self._history)[since - oldest + 1:]
+        for index in range(len(chain) - 1, -1, -1):
+            if chain[index].kind == KIND_KEYFRAME:
+                return chain[index:]
+        return chain
+
+    def _keyframe(self) -> Packet:
+        """The last packet, or a keyframe standing in for it. Lock must be held."""
+        last = self._history[-1]
+        if last.kind == KIND_KEYFRAME:
+            return last
+        design_id, frame_version = self._shown
+        return self._packet(KIND_KEYFRAME, 0, {'design_id': design_id, 'frame_version': frame_version},
+                            self._frame, self._frame)
+
+    def _packet(self, kind: int, base_seq: int, current: Dict, frame: bytes, payload: bytes) -> Packet:
+        checksum = frame_checksum(frame)
+        header = PACKET_HEADER.pack(PACKET_MAGIC, FORMAT_VERSION, kind, self._seq, base_seq,
+                                    current['design_id'], current['frame_version'], checksum, len(payload))
+        return Packet(self._seq, kind, checksum, header + payload)
+
+
+# One packet log per display channel, created on first use
+frame_transports = ChannelRegistry(lambda channel_id: FrameTransport(channel_id=channel_id))
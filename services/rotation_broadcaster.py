@@ -0,0 +1,260 @@
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from model.display_channel import DEFAULT_CHANNEL_ID
+from model.rotation_events import add_listener, remove_listener
+from model.rotation_system import RotationSystemDAO, parse_utc_timestamp
+from services.channel_registry import ChannelRegistry
+
+# Events kept for clients that reconnect with a Last-Event-ID
+REPLAY_BUFFER_SIZE = 256
+# Idle streams get a time-left resync (which doubles as a keep-alive) this often
+RESYNC_SECONDS = 15
+# How long EventSource should wait before reconnecting
+RECONNECT_MILLISECONDS = 3000
+
+# DAO events that can change the queue or the active item
+_QUEUE_EVENTS = ('item_added', 'item_removed', 'items_expired', 'items_activated', 'reordered', 'design_deleted')
+
+
+class RotationBroadcaster:
+    """
+    Fans one channel's rotation changes out to every /rotation/stream
+    connection open on it.
+
+    Each change is turned into one small numbered event and appended to a
+    ring buffer that all streams read from, so any number of viewers cost
+    a single in-process publish. A client that reconnects with a
+    Last-Event-ID still in the buffer gets what it missed replayed,
+    anyone else starts from a snapshot.
+
+    Events sent to clients:
+        snapshot   order, active (sent on connect or when a replay isn't possible)
+        active     item_id, activated_at, duration, time_left
+        added      item_ids, order
+        removed    item_ids, order
+        reordered  order
+        resync     item_id, time_left (not numbered, never replayed)
+    """
+
+    def __init__(self, db_path: str = 'data.db', channel_id: int = DEFAULT_CHANNEL_ID):
+        self.channel_id = channel_id
+        self.dao = RotationSystemDAO(db_path, channel_id)
+        self._condition = threading.Condition()
+        self._refresh_lock = threading.Lock()
+        self._listening = False
+        self._events = deque(maxlen=REPLAY_BUFFER_SIZE)  # (seq, event, data)
+        self._seq = 0
+        # Event ids only mean something within one server run
+        self._boot = format(int(time.time()), 'x')
+        self._loaded = False
+        self._order: List[int] = []
+        self._durations: Dict[int, int] = {}
+        self._active_id: Optional[int] = None
+        self._activated_at: Optional[datetime] = None
+        self._subscribers = 0
+        self._stats = {'published': 0, 'snapshots': 0, 'replays': 0, 'connections': 0}
+
+    def open_stream(self, last_event_id: Optional[str] = None) -> Iterator[str]:
+        """
+        Start a stream for one client.
+
+        Args:
+            last_event_id: Value of the Last-Event-ID header, if the client is resuming
+
+        Returns:
+            Generator of Server-Sent Events frames
+        """
+        if not self._listening:
+            add_listener(self._on_event)
+            self._listening = True
+
+        with self._condition:
+            position = self._resume_position(last_event_id)
+            self._stats['connections'] += 1
+            if position is not None:
+                self._stats['replays'] += 1
+
+        first_frames = []
+        if position is None:
+            snapshot, position = self.snapshot()
+            first_frames.append(self._frame('snapshot', snapshot, position))
+
+        return self._generate(position, first_frames)
+
+    def close(self):
+        """Stop listening; open streams fall back to resyncs until they disconnect."""
+        if self._listening:
+            remove_listener(self._on_event)
+            self._listening = False
+
+    def snapshot(self) -> Tuple[Dict, int]:
+        """Return the current order and active item, and the id of the last event they include."""
+        if not self._loaded:
+            self._refresh(publish=False)
+
+        with self._condition:
+            self._stats['snapshots'] += 1
+            return {'order': list(self._order), 'active': self._active_payload()}, self._seq
+
+    def stats(self) -> Dict:
+        with self._condition:
+            stats = dict(self._stats)
+            stats['subscribers'] = self._subscribers
+            stats['last_event_id'] = self._seq
+            stats['buffered'] = len(self._events)
+        return stats
+
+    def _generate(self, position: int, first_frames: List[str]) -> Iterator[str]:
+        with self._condition:
+            self._subscribers += 1
+
+        try:
+            yield f"retry: {RECONNECT_MILLISECONDS}\n\n"
+            for frame in first_frames:
+                yield frame
+
+            while True:
+                with self._condition:
+                    if self._seq == position:
+                        self._condition.wait(timeout=RESYNC_SECONDS)
+                    missed = self._events_after(position)
+
+                if missed is None:
+                    # Fell too far behind to replay
+                    snapshot, position = self.snapshot()
+                    yield self._frame('snapshot', snapshot, position)
+                elif missed:
+                    for seq, event, data in missed:
+                        yield self._frame(event, data, seq)
+                        position = seq
+                else:
+                    with self._condition:
+                        resync = self._active_payload()
+                    yield self._frame('resync', {
+                        'item_id': resync['item_id'] if resync else None,
+                        'time_left': resync['time_left'] if resync else None,
+                    })
+        finally:
+            with self._condition:
+                self._subscribers -= 1
+
+    def _on_event(self, event: str, details: Dict):
+        if details.get('channel_id', self.channel_id) != self.channel_id:
+            return
+
+        with self._condition:
+            if self._subscribers == 0:
+                # Nobody is watching: don't query anything, just make sure a
+                # later resume can't replay across the gap
+                self._loaded = False
+                self._events.clear()
+                self._seq += 1
+                return
+
+        if event == 'active_changed':
+            with self._condition:
+                if details['item_id'] is None or details['item_id'] in self._durations:
+                    self._set_active(details['item_id'], details['activated_at'])
+                    return
+            # Activated something we haven't seen yet
+            self._refresh()
+        elif event in _QUEUE_EVENTS:
+            self._refresh()
+
+    def _refresh(self, publish: bool = True):
+        """Reload the queue order and active item and publish whatever changed."""
+        with self._refresh_lock:
+            queue, active = self.dao.get_rotation_state()
+
+            with self._condition:
+                old_order = self._order
+                self._order = [item['item_id'] for item in queue]
+                self._durations = {item['item_id']: item['duration'] for item in queue}
+                self._loaded = True
+
+                if publish:
+                    old_ids, new_ids = set(old_order), set(self._order)
+                    added = [item_id for item_id in self._order if item_id not in old_ids]
+                    removed = [item_id for item_id in old_order if item_id not in new_ids]
+                    if added:
+                        self._publish('added', {'item_ids': added, 'order': self._order})
+                    if removed:
+                        self._publish('removed', {'item_ids': removed, 'order': self._order})
+                    if not added and not removed and old_order != self._order:
+                        self._publish('reordered', {'order': self._order})
+
+                active_id = active['item_id'] if active else None
+                activated_at = parse_utc_timestamp(active['activated_at']) if active else None
+                if publish and (active_id, activated_at) != (self._active_id, self._activated_at):
+                    self._set_active(active_id, activated_at)
+                else:
+                    self._active_id, self._activated_at = active_id, activated_at
+
+    def _set_active(self, item_id: Optional[int], activated_at: Optional[datetime]):
+        """Record and publish a new active item. Lock must be held."""
+        self._active_id = item_id
+        self._activated_at = activated_at
+        self._publish('active', self._active_payload() or {'item_id': None})
+
+    def _active_payload(self) -> Optional[Dict]:
+        """Active item with its time left, from memory. Lock must be held."""
+        if self._active_id is None or self._activated_at is None:
+            return None
+
+        duration = self._durations.get(self._active_id)
+        if duration is None:
+            return None
+
+        deadline = self._activated_at + timedelta(seconds=duration)
+        return {
+            'item_id': self._active_id,
+            'activated_at': self._activated_at.isoformat(),
+            'duration': duration,
+            'time_left': round(max(0.0, (deadline - datetime.now(timezone.utc)).total_seconds()), 3),
+        }
+
+    def _publish(self, event: str, data: Dict):
+        """Append an event to the buffer and wake every stream. Lock must be held."""
+        self._seq += 1
+        self._events.append((self._seq, event, data))
+        self._stats['published'] += 1
+        self._condition.notify_all()
+
+    def _resume_position(self, last_event_id: Optional[str]) -> Optional[int]:
+        """Position to replay from, or None if the client needs a snapshot. Lock must be held."""
+        if not last_event_id or not self._loaded:
+            return None
+
+        boot, _, seq = last_event_id.partition('-')
+        if boot != self._boot or not seq.isdigit():
+            return None
+
+        seq = int(seq)
+        if seq > self._seq or self._events_after(seq) is None:
+            return None
+        return seq
+
+    def _events_after(self, position: int) -> Optional[List[Tuple[int, str, Dict]]]:
+        """Buffered events after position, or None if some have been dropped. Lock must be held."""
+        if position == self._seq:
+            return []
+        if not self._events or self._events[0][0] > position + 1:
+            return None
+        return [entry for entry in self._events if entry[0] > position]
+
+    def _frame(self, event: str, data: Dict, seq: Optional[int] = None) -> str:
+        lines = []
+        if seq is not None:
+            lines.append(f"id: {self._boot}-{seq}")
+        lines.append(f"event: {event}")
+        lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+        return "\n".join(lines) + "\n\n"
+
+
+# One broadcaster per display channel, created on first use
+rotation_broadcasters = ChannelRegistry(lambda channel_id: RotationBroadcaster(channel_id=channel_id))
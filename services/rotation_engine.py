@@ -0,0 +1,262 @@
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from apscheduler.jobstores.base import JobLookupError
+
+from model.display_channel import DEFAULT_CHANNEL_ID
+from model.rotation_events import add_listener, remove_listener
+from model.rotation_system import RotationSystemDAO, parse_utc_timestamp
+
+# One switch job per channel, named SWITCH_JOB_ID:<channel_id>
+SWITCH_JOB_ID = 'rotation_switch'
+RESYNC_JOB_ID = 'rotation_resync'
+# Backstop in case the database is changed behind the application's back
+RESYNC_INTERVAL_MINUTES = 5
+
+# Events that can't change a channel's queue order or durations
+_IGNORED_EVENTS = ('design_changed', 'schedule_changed')
+
+
+class _ChannelClock:
+    """One channel's queue order and active item's deadline."""
+
+    def __init__(self, channel_id: int):
+        self.channel_id = channel_id
+        self.queue: List[Dict] = []  # item_id, sort_key, duration in rotation order
+        self.active_id: Optional[int] = None
+        self.activated_at: Optional[datetime] = None
+        self.deadline: Optional[datetime] = None
+
+    @property
+    def job_id(self) -> str:
+        return f"{SWITCH_JOB_ID}:{self.channel_id}"
+
+    def load(self, queue: List[Dict], active: Optional[Dict]):
+        self.queue = queue
+        self.active_id = active['item_id'] if active else None
+        self.activated_at = parse_utc_timestamp(active['activated_at']) if active else None
+
+    def duration_of(self, item_id: int) -> Optional[int]:
+        for item in self.queue:
+            if item['item_id'] == item_id:
+                return item['duration']
+        return None
+
+    def next_item_id(self) -> Optional[int]:
+        """Same order as RotationSystemDAO.rotate_to_next: the next item, wrapping around."""
+        if not self.queue:
+            return None
+
+        for index, item in enumerate(self.queue):
+            if item['item_id'] == self.active_id:
+                return self.queue[(index + 1) % len(self.queue)]['item_id']
+
+        return self.queue[0]['item_id']
+
+
+class RotationEngine:
+    """
+    Keeps every display channel's queue order and active item's deadline in memory.
+
+    Instead of polling the database every second, a one-shot scheduler job
+    is armed per channel for the moment its active item expires. The
+    database is only written when an active item actually changes, and a
+    channel's in-memory state is rebuilt whenever a DAO publishes a change
+    to it, so the work done grows with the channels that change rather
+    than with the channels configured.
+    """
+
+    def __init__(self):
+        self.scheduler = None
+        self.dao: Optional[RotationSystemDAO] = None
+        self.running = False
+        self._lock = threading.RLock()
+        self._channels: Dict[int, _ChannelClock] = {}
+        self._stats = {'reloads': 0, 'channel_reloads': 0, 'switches': 0, 'failed_switches': 0}
+
+    def start(self, scheduler, db_path: str = 'data.db'):
+        """Load the current state and arm the first switches on the given scheduler."""
+        self.scheduler = scheduler
+        self.dao = RotationSystemDAO(db_path)
+        add_listener(self._on_event)
+        self.running = True
+        self.reload()
+
+        self.scheduler.add_job(
+            self.reload,
+            'interval',
+            minutes=RESYNC_INTERVAL_MINUTES,
+            id=RESYNC_JOB_ID,
+            replace_existing=True
+        )
+
+    def stop(self):
+        remove_listener(self._on_event)
+        self.running = False
+        with self._lock:
+            for clock in self._channels.values():
+                self._disarm(clock)
+
+    def reload(self):
+        """Rebuild the in-memory state of every channel from the database and re-arm."""
+        if self.dao is None:
+            return
+
+        try:
+            states = self.dao.get_all_rotation_states()
+        except sqlite3.Error as e:
+            print(f"Error loading rotation state: {e}")
+            return
+
+        with self._lock:
+            for channel_id in set(self._channels) - set(states):
+                self._disarm(self._channels.pop(channel_id))
+
+            for channel_id, (queue, active) in states.items():
+                clock = self._channels.setdefault(channel_id, _ChannelClock(channel_id))
+                clock.load(queue, active)
+                self._arm(clock)
+            self._stats['reloads'] += 1
+
+    def reload_channel(self, channel_id: int):
+        """Rebuild one channel's state from the database and re-arm its switch."""
+        if self.dao is None:
+            return
+
+        try:
+            queue, active = self.dao.for_channel(channel_id).get_rotation_state()
+        except sqlite3.Error as e:
+            print(f"Error loading rotation state of channel {channel_id}: {e}")
+            return
+
+        with self._lock:
+            if active is None:
+                # The channel is gone
+                clock = self._channels.pop(channel_id, None)
+                if clock is not None:
+                    self._disarm(clock)
+                return
+
+            clock = self._channels.setdefault(channel_id, _ChannelClock(channel_id))
+            clock.load(queue, active)
+            self._stats['channel_reloads'] += 1
+            self._arm(clock)
+
+    def time_left(self, item_id: Optional[int] = None, channel_id: int = DEFAULT_CHANNEL_ID) -> Optional[float]:
+        """
+        Seconds left for a channel's active item, computed without touching the database.
+
+        Args:
+            item_id: If given, only answer when this is the item the engine has active
+            channel_id: Channel to look at
+
+        Returns:
+            Seconds left or None if the engine can't answer
+        """
+        with self._lock:
+            clock = self._channels.get(channel_id)
+            if not self.running or clock is None or clock.active_id is None or clock.deadline is None:
+                return None
+            if item_id is not None and item_id != clock.active_id:
+                return None
+            return max(0, (clock.deadline - datetime.now(timezone.utc)).total_seconds())
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['running'] = self.running
+            stats['channels'] = {
+                channel_id: {
+                    'queue_length': len(clock.queue),
+                    'active_item_id': clock.active_id,
+                    'next_switch': clock.deadline.isoformat() if clock.deadline else None,
+                }
+                for channel_id, clock in self._channels.items()
+            }
+        return stats
+
+    def _on_event(self, event: str, details: Dict):
+        if not self.running or event in _IGNORED_EVENTS:
+            return
+
+        channel_id = details.get('channel_id')
+        if channel_id is None:
+            # A deleted design can take items off any channel
+            self.reload()
+        elif event == 'active_changed':
+            # The writer already told us everything we need
+            with self._lock:
+                clock = self._channels.get(channel_id)
+                if clock is not None:
+                    clock.active_id = details['item_id']
+                    clock.activated_at = details['activated_at']
+                    self._arm(clock)
+                    return
+            self.reload_channel(channel_id)
+        else:
+            # The channel's queue membership or order changed, or the channel came or went
+            self.reload_channel(channel_id)
+
+    def _arm(self, clock: _ChannelClock):
+        """Schedule a channel's next switch. Must be called with the lock held."""
+        now = datetime.now(timezone.utc)
+        duration = clock.duration_of(clock.active_id) if clock.active_id is not None else None
+
+        if duration is not None and clock.activated_at is not None:
+            clock.deadline = clock.activated_at + timedelta(seconds=duration)
+        elif clock.queue:
+            # Nothing (valid) is showing but there is something to show
+            clock.deadline = now
+        else:
+            self._disarm(clock)
+            return
+
+        if self.scheduler is None:
+            return
+
+        self.scheduler.add_job(
+            self._on_deadline,
+            'date',
+            run_date=max(clock.deadline, now),
+            args=(clock.channel_id,),
+            id=clock.job_id,
+            replace_existing=True,
+            misfire_grace_time=None
+        )
+
+    def _disarm(self, clock: _ChannelClock):
+        if clock.deadline is None:
+            return
+        clock.deadline = None
+        if self.scheduler is None:
+            return
+        try:
+            self.scheduler.remove_job(clock.job_id)
+        except JobLookupError:
+            pass
+
+    def _on_deadline(self, channel_id: int):
+        with self._lock:
+            clock = self._channels.get(channel_id)
+            if clock is None:
+                return
+            next_item_id = clock.next_item_id()
+
+        try:
+            switched = self.dao.for_channel(channel_id).activate_item(next_item_id, datetime.now(timezone.utc))
+        except sqlite3.Error as e:
+            print(f"Error switching rotation item on channel {channel_id}: {e}")
+            switched = False
+
+        with self._lock:
+            self._stats['switches' if switched else 'failed_switches'] += 1
+
+        if not switched:
+            # Our view of the channel's queue was stale
+            self.reload_channel(channel_id)
+
+
+# Create a singleton instance
+rotation_engine = RotationEngine()
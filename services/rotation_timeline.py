@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from model.rotation_system import parse_utc_timestamp
+
+DEFAULT_TIMELINE_COUNT = 10
+MAX_TIMELINE_COUNT = 100
+# Scheduled items without an end_time expire a day after activation, as in process_scheduled_images
+SCHEDULED_DEFAULT_LIFETIME = timedelta(days=1)
+
+
+def _slot(item_id: Optional[int], schedule_id: Optional[int], design_id: int, duration: int,
+          expiry: Optional[datetime]) -> Dict:
+    return {'item_id': item_id, 'schedule_id': schedule_id, 'design_id': design_id,
+            'duration': duration, 'expiry': expiry}
+
+
+def _expired(slot: Dict, at: datetime) -> bool:
+    return slot['expiry'] is not None and slot['expiry'] <= at
+
+
+def forecast(queue: List[Dict], active: Optional[Dict], schedules: List[Dict],
+             count: int, now: datetime) -> Dict:
+    """
+    Replay what the rotation engine, the schedule activator and the expiry
+    sweep will do, and return the current item and the next count activations.
+
+    Each step moves to the next of three events: the current item's duration
+    running out, its expiry cutting it short, or the next schedule coming
+    due. Expired items are dropped when the rotation reaches them, so a
+    forecast of K activations costs O(K) steps plus one per item dropped.
+
+    Args:
+        queue: Items in rotation order with item_id, design_id, duration, expiry_time
+        active: Active item row with item_id and activated_at
+        schedules: Pending schedules ordered by start_time, schedule_id
+        count: Number of upcoming activations to return
+        now: Current UTC time
+
+    Returns:
+        Dict with 'current' (None if nothing is active) and the 'upcoming' list
+    """
+    order = [_slot(item['item_id'], None, item['design_id'], item['duration'],
+                   parse_utc_timestamp(item['expiry_time'])) for item in queue]
+    pending = [dict(schedule, start=max(parse_utc_timestamp(schedule['start_time']), now))
+               for schedule in schedules]
+    next_schedule = 0
+
+    upcoming: List[Dict] = []
+    current = None
+
+    def activate(index: Optional[int], at: datetime):
+        if index is None:
+            return
+        slot = order[index]
+        upcoming.append({'item_id': slot['item_id'], 'schedule_id': slot['schedule_id'],
+                         'design_id': slot['design_id'], 'starts_at': at.isoformat(),
+                         'duration': slot['duration']})
+
+    def head(at: datetime) -> Optional[int]:
+        """What _select_new_active_item would pick at this time."""
+        while order and _expired(order[0], at):
+            order.pop(0)
+        return 0 if order else None
+
+    active_id = active['item_id'] if active else None
+    index = next((i for i, slot in enumerate(order) if slot['item_id'] == active_id), None)
+    if index is not None and active['activated_at']:
+        started = parse_utc_timestamp(active['activated_at'])
+        slot = order[index]
+        current = {'item_id': slot['item_id'], 'design_id': slot['design_id'],
+                   'starts_at': started.isoformat(), 'duration': slot['duration']}
+    else:
+        # The engine picks the head of the queue on its next tick
+        started = now
+        index = head(now)
+        activate(index, now)
+
+    # Every step records an activation or removes an item or a schedule
+    for _ in range(count + len(order) + len(pending) + 1):
+        if len(upcoming) >= count:
+            break
+
+        due_at = pending[next_schedule]['start'] if next_schedule < len(pending) else None
+        if index is None and due_at is None:
+            break
+
+        if index is not None:
+            slot = order[index]
+            ends = max(started + timedelta(seconds=slot['duration']), now)
+            cut_short = slot['expiry'] is not None and slot['expiry'] < ends
+            if cut_short:
+                ends = max(slot['expiry'], now)
+
+        if due_at is not None and (index is None or due_at <= ends):
+            # Every schedule due by now is activated together
+            overrides = []
+            while next_schedule < len(pending) and pending[next_schedule]['start'] <= due_at:
+                schedule = pending[next_schedule]
+                next_schedule += 1
+                added = _slot(None, schedule['schedule_id'], schedule['design_id'], schedule['duration'],
+                              parse_utc_timestamp(schedule['end_time']) or due_at + SCHEDULED_DEFAULT_LIFETIME)
+                if schedule['override_current']:
+                    overrides.append(added)
+                else:
+                    order.append(added)
+
+            if overrides:
+                # Right after the current item, the last of them becoming active
+                at = index + 1 if index is not None else 0
+                order[at:at] = overrides
+                index = at + len(overrides) - 1
+            elif index is None:
+                index = head(due_at)
+            else:
+                continue
+            started = due_at
+            activate(index, started)
+            continue
+
+        if cut_short:
+            # The expiry sweep removed it and started over from the head
+            order.pop(index)
+            index = head(ends)
+        else:
+            # Skip (and drop) whatever has expired by the time we get there
+            following = (index + 1) % len(order)
+            while following != index and _expired(order[following], ends):
+                order.pop(following)
+                if following < index:
+                    index -= 1
+                following %= len(order)
+            index = following
+        started = ends
+        activate(index, started)
+
+    if current is not None:
+        # Whatever comes first ends it
+        current['ends_at'] = upcoming[0]['starts_at'] if upcoming else None
+    return {'current': current, 'upcoming': upcoming[:count]}
@@ -0,0 +1,165 @@
+import heapq
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from apscheduler.jobstores.base import JobLookupError
+
+from model.rotation_events import add_listener, remove_listener
+from model.rotation_system import RotationSystemDAO, parse_utc_timestamp
+from services.rotation_engine import RESYNC_INTERVAL_MINUTES
+
+ACTIVATION_JOB_ID = 'scheduled_activation'
+ACTIVATION_RESYNC_JOB_ID = 'scheduled_activation_resync'
+# Wait this long before retrying a failed activation
+RETRY_SECONDS = 5
+
+
+class ScheduleActivator:
+    """
+    Activates scheduled images exactly when they are due.
+
+    Upcoming start times are kept in a min-heap fed by the schedule events
+    the DAO publishes. A single one-shot scheduler job is armed for the
+    earliest one, and when it fires every due item is activated in one
+    transaction. While nothing is scheduled no job exists at all.
+    """
+
+    def __init__(self):
+        self.scheduler = None
+        self.dao: Optional[RotationSystemDAO] = None
+        self.running = False
+        self._lock = threading.RLock()
+        self._heap: List[Tuple[datetime, int]] = []
+        # schedule_id -> start_time; heap entries that don't match are stale
+        self._pending: Dict[int, datetime] = {}
+        self._next_run: Optional[datetime] = None
+        self._stats = {'reloads': 0, 'runs': 0, 'failed_runs': 0}
+
+    def start(self, scheduler, db_path: str = 'data.db'):
+        """Load the pending schedule and arm the first activation on the given scheduler."""
+        self.scheduler = scheduler
+        self.dao = RotationSystemDAO(db_path)
+        add_listener(self._on_event)
+        self.running = True
+        self.reload()
+
+        self.scheduler.add_job(
+            self.reload,
+            'interval',
+            minutes=RESYNC_INTERVAL_MINUTES,
+            id=ACTIVATION_RESYNC_JOB_ID,
+            replace_existing=True
+        )
+
+    def stop(self):
+        remove_listener(self._on_event)
+        self.running = False
+        with self._lock:
+            self._disarm()
+
+    def reload(self):
+        """Rebuild the heap from the database and re-arm."""
+        if self.dao is None:
+            return
+
+        try:
+            rows = self.dao.get_pending_schedule_times()
+        except Exception as e:
+            print(f"Error loading scheduled items: {e}")
+            return
+
+        with self._lock:
+            self._pending = {row['schedule_id']: parse_utc_timestamp(row['start_time']) for row in rows}
+            self._heap = [(start_time, schedule_id) for schedule_id, start_time in self._pending.items()]
+            heapq.heapify(self._heap)
+            self._stats['reloads'] += 1
+            self._arm()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['running'] = self.running
+            stats['pending'] = len(self._pending)
+            stats['heap_size'] = len(self._heap)
+            stats['next_run'] = self._next_run.isoformat() if self._next_run else None
+        return stats
+
+    def _on_event(self, event: str, details: Dict):
+        if not self.running:
+            return
+
+        if event == 'schedule_changed':
+            with self._lock:
+                schedule_id = details['schedule_id']
+                start_time = parse_utc_timestamp(details.get('start_time'))
+                if start_time is None:
+                    self._pending.pop(schedule_id, None)
+                else:
+                    self._pending[schedule_id] = start_time
+                    heapq.heappush(self._heap, (start_time, schedule_id))
+                self._arm()
+        elif event == 'design_deleted':
+            # Deleting a design cascades to its schedules
+            self.reload()
+
+    def _discard_stale(self):
+        """Pop heap entries for removed or rescheduled items. Lock must be held."""
+        while self._heap:
+            start_time, schedule_id = self._heap[0]
+            if self._pending.get(schedule_id) == start_time:
+                return
+            heapq.heappop(self._heap)
+
+    def _arm(self, not_before: Optional[datetime] = None):
+        """Schedule a run for the earliest pending item. Lock must be held."""
+        self._discard_stale()
+        if not self._heap:
+            self._disarm()
+            return
+
+        run_date = max(self._heap[0][0], not_before or datetime.now(timezone.utc))
+        self._next_run = run_date
+        if self.scheduler is None:
+            return
+
+        self.scheduler.add_job(
+            self._on_due,
+            'date',
+            run_date=run_date,
+            id=ACTIVATION_JOB_ID,
+            replace_existing=True,
+            misfire_grace_time=None
+        )
+
+    def _disarm(self):
+        self._next_run = None
+        if self.scheduler is None:
+            return
+        try:
+            self.scheduler.remove_job(ACTIVATION_JOB_ID)
+        except JobLookupError:
+            pass
+
+    def _on_due(self):
+        now = datetime.now(timezone.utc)
+        try:
+            self.dao.process_scheduled_images()
+        except Exception as e:
+            print(f"Error activating scheduled images: {e}")
+            with self._lock:
+                self._stats['failed_runs'] += 1
+                self._arm(not_before=now + timedelta(seconds=RETRY_SECONDS))
+            return
+
+        with self._lock:
+            self._stats['runs'] += 1
+            # Everything due by now was activated and deleted
+            for schedule_id, start_time in list(self._pending.items()):
+                if start_time <= now:
+                    del self._pending[schedule_id]
+            self._arm()
+
+
+# Create a singleton instance
+schedule_activator = ScheduleActivator()
@@ -2,7 +2,16 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.executors.pool import ThreadPoolExecutor
 from flask import Flask, g
 import atexit
+from model.db_profile import CHECKPOINT_INTERVAL_SECONDS, checkpointer
+from model.design import pack_legacy_designs
 from model.rotation_system import RotationSystemDAO
+from model.user_storage import UserStorageDAO
+from services.frame_prefetcher import frame_prefetcher
+from services.rotation_engine import rotation_engine
+from services.schedule_activator import schedule_activator
+
+REBALANCE_INTERVAL_MINUTES = 10
+RECONCILE_STORAGE_INTERVAL_MINUTES = 60
 
 class SchedulerService:
     """
@@ -32,6 +41,7 @@ class SchedulerService:
         db_path = 'data.db'
        
         self._setup_rotation_jobs(db_path)
+        self._setup_maintenance_jobs(db_path)
         self.scheduler.start()
        
         # Register with atexit to ensure shutdown happens on app termination
@@ -45,12 +55,8 @@ class SchedulerService:
         """Set up background jobs for the rotation system."""
         dao = RotationSystemDAO(db_path)
        
-        self.scheduler.add_job(
-            dao.process_scheduled_images,
-            'interval',
-            seconds=5,
-            id='process_scheduled_images'
-        )
+        # Activate scheduled images when they are due instead of polling
+        schedule_activator.start(self.scheduler, db_path)
        
         self.scheduler.add_job(
             dao.clean_expired_images,
@@ -59,12 +65,44 @@ class SchedulerService:
             id='clean_expired_images'
         )
        
-        # Check rotation every second
+        # Keep the upcoming frames ready before the engine starts switching
+        frame_prefetcher.start(self.scheduler, db_path)
+
+        # Switch images when the active one expires instead of polling
+        rotation_engine.start(self.scheduler, db_path)
+
+    def _setup_maintenance_jobs(self, db_path):
+        """Set up background jobs that keep the database healthy."""
+        dao = RotationSystemDAO(db_path)
+       
+        # Keep the WAL short so readers don't have to scan a long log
         self.scheduler.add_job(
-            dao.check_rotation,
+            checkpointer.run,
             'interval',
-            seconds=1,
-            id='check_rotation'
+            seconds=CHECKPOINT_INTERVAL_SECONDS,
+            id='wal_checkpoint'
+        )
+       
+        # Spread the rotation sort keys out again before edits run out of room
+        self.scheduler.add_job(
+            dao.rebalance_sort_keys,
+            'interval',
+            minutes=REBALANCE_INTERVAL_MINUTES,
+            id='rebalance_rotation_order'
+        )
+
+        # The storage ledger is kept by triggers; recount it now and then to catch drift
+        self.scheduler.add_job(
+            UserStorageDAO(db_path).reconcile,
+            'interval',
+            minutes=RECONCILE_STORAGE_INTERVAL_MINUTES,
+            id='reconcile_user_storage'
+        )
+
+        # Move designs saved as JSON text to the packed format, once, in small batches
+        self.scheduler.add_job(
+            pack_legacy_designs,
+            id='pack_legacy_designs'
         )
    
     def _shutdown_scheduler(self):
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from typing import Dict
+
+from model.frame import BYTES_PER_PIXEL, FRAME_HEIGHT, FRAME_SIZE, FRAME_WIDTH
+from utilities.png import encode_png
+
+THUMBNAIL_CACHE_DIR = 'thumbnail_cache'
+MIN_SCALE = 1
+# 8 gives the 512x512 the editor canvas shows
+MAX_SCALE = 8
+
+
+def scale_frame(frame: bytes, scale: int) -> bytes:
+    """
+    Enlarge a packed RGB888 frame by an integer factor, nearest neighbour.
+
+    Columns are widened with one strided slice assignment per channel and
+    copy, which runs over the whole frame in C, then every row is repeated.
+    """
+    if scale == 1:
+        return bytes(frame)
+
+    wide = bytearray(len(frame) * scale)
+    step = BYTES_PER_PIXEL * scale
+    for channel in range(BYTES_PER_PIXEL):
+        source = frame[channel::BYTES_PER_PIXEL]
+        for copy in range(scale):
+            wide[channel + copy * BYTES_PER_PIXEL::step] = source
+
+    stride = FRAME_WIDTH * step
+    return b''.join(bytes(wide[row:row + stride]) * scale for row in range(0, len(wide), stride))
+
+
+class ThumbnailRenderer:
+    """
+    Renders design frames to PNG and keeps the results on disk.
+
+    Files are named by a hash of the frame contents and the scale, so a
+    cached thumbnail can never be stale and identical designs share one
+    file. A hit costs a single file read.
+    """
+
+    def __init__(self, cache_dir: str = THUMBNAIL_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'cache_errors': 0, 'render_ms_total': 0.0, 'render_ms_max': 0.0}
+
+    def render(self, frame: bytes, scale: int = MIN_SCALE) -> bytes:
+        """
+        Get the PNG for a frame at the given scale, rendering it on a cache miss.
+
+        Args:
+            frame: Packed RGB888 frame as compiled by model.frame
+            scale: Pixels per board pixel, MIN_SCALE to MAX_SCALE
+
+        Returns:
+            PNG file contents
+        """
+        if not MIN_SCALE <= scale <= MAX_SCALE:
+            raise ValueError(f"Scale must be between {MIN_SCALE} and {MAX_SCALE}")
+        if len(frame) != FRAME_SIZE:
+            raise ValueError(f"Expected a {FRAME_SIZE} byte frame, got {len(frame)}")
+
+        path = self._path_for(frame, scale)
+        try:
+            with open(path, 'rb') as f:
+                png = f.read()
+            with self._lock:
+                self._stats['hits'] += 1
+            return png
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error reading cached thumbnail {path}: {e}")
+            with self._lock:
+                self._stats['cache_errors'] += 1
+
+        started = time.perf_counter()
+        png = encode_png(FRAME_WIDTH * scale, FRAME_HEIGHT * scale, scale_frame(frame, scale))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            self._stats['misses'] += 1
+            self._stats['render_ms_total'] += elapsed_ms
+            self._stats['render_ms_max'] = max(self._stats['render_ms_max'], elapsed_ms)
+
+        self._store(path, png)
+        return png
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else None
+        stats['render_ms_avg'] = round(stats['render_ms_total'] / stats['misses'], 3) if stats['misses'] else None
+        stats['render_ms_total'] = round(stats['render_ms_total'], 3)
+        stats['render_ms_max'] = round(stats['render_ms_max'], 3)
+        stats['cache_dir'] = self.cache_dir
+        return stats
+
+    def _path_for(self, frame: bytes, scale: int) -> str:
+        digest = hashlib.sha256(frame).hexdigest()
+        # Fan out so no single directory gets huge
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}-{scale}x.png")
+
+    def _store(self, path: str, png: bytes):
+        """Write a rendered file atomically; a failed write only costs a re-render later."""
+        temp_path = None
+        try:
+            directory = os.path.dirname(path)
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(png)
+            os.replace(temp_path, path)
+        except OSError as e:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+            print(f"Error caching thumbnail {path}: {e}")
+            with self._lock:
+                self._stats['cache_errors'] += 1
+
+
+# Create a singleton instance
+thumbnail_renderer = ThumbnailRenderer()
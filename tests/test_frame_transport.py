@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from model.frame import BYTES_PER_PIXEL, FRAME_SIZE
+from services.frame_transport import (DELTA_RUN, FORMAT_VERSION, FRAME_PIXELS, KIND_DELTA, KIND_KEYFRAME, MAX_RUN,
+                                      PACKET_HEADER, PACKET_MAGIC, apply_delta, decode_packets, encode_delta,
+                                      frame_checksum)
+
+BLACK = bytes(FRAME_SIZE)
+
+
+def random_frame(seed, colors=3):
+    rng = random.Random(seed)
+    palette = [bytes(rng.randrange(256) for _ in range(BYTES_PER_PIXEL)) for _ in range(colors)]
+    return b''.join(rng.choice(palette) for _ in range(FRAME_PIXELS))
+
+
+def edited(frame, seed, pixels=20):
+    rng = random.Random(seed)
+    frame = bytearray(frame)
+    for _ in range(pixels):
+        pixel = rng.randrange(FRAME_PIXELS) * BYTES_PER_PIXEL
+        frame[pixel:pixel + BYTES_PER_PIXEL] = bytes(rng.randrange(256) for _ in range(BYTES_PER_PIXEL))
+    return bytes(frame)
+
+
+def packet(seq, kind, frame, payload, checksum=None):
+    checksum = frame_checksum(frame) if checksum is None else checksum
+    return PACKET_HEADER.pack(PACKET_MAGIC, FORMAT_VERSION, kind, seq, seq - 1, 1, 1, checksum, len(payload)) + payload
+
+
+@pytest.mark.parametrize('previous, frame', [
+    (BLACK, BLACK),
+    (BLACK, random_frame(1)),
+    (random_frame(2), BLACK),
+    (random_frame(3), random_frame(4, colors=40)),
+    (random_frame(5), edited(random_frame(5), 6)),
+    (BLACK, b'\xff' * FRAME_SIZE),  # Longer than MAX_RUN would need splitting
+])
+def test_delta_round_trip(previous, frame):
+    assert apply_delta(previous, encode_delta(previous, frame)) == frame
+
+
+def test_delta_of_same_frame_is_empty():
+    frame = random_frame(7)
+
+    assert encode_delta(frame, frame) == b''
+
+
+def test_delta_of_small_edit_is_small():
+    frame = random_frame(8)
+
+    assert len(encode_delta(frame, edited(frame, 9, pixels=5))) <= 5 * DELTA_RUN.size
+
+
+def test_runs_never_exceed_max_run():
+    payload = encode_delta(BLACK, b'\x01\x02\x03' * FRAME_PIXELS)
+
+    assert all(length <= MAX_RUN for _, length, _ in DELTA_RUN.iter_unpack(payload))
+
+
+def test_decode_keyframe_then_deltas():
+    frames = [random_frame(10)]
+    for seed in range(11, 15):
+        frames.append(edited(frames[-1], seed))
+
+    data = packet(1, KIND_KEYFRAME, frames[0], frames[0])
+    for seq, (previous, frame) in enumerate(zip(frames, frames[1:]), start=2):
+        data += packet(seq, KIND_DELTA, frame, encode_delta(previous, frame))
+
+    assert decode_packets(data) == (frames[-1], len(frames), frame_checksum(frames[-1]))
+
+
+def test_decode_deltas_onto_the_board_frame():
+    previous, frame = random_frame(16), random_frame(17)
+
+    result, seq, _ = decode_packets(packet(5, KIND_DELTA, frame, encode_delta(previous, frame)), previous)
+
+    assert (result, seq) == (frame, 5)
+
+
+def test_decode_rejects_checksum_mismatch():
+    frame = random_frame(18)
+
+    with pytest.raises(ValueError, match="Checksum"):
+        decode_packets(packet(1, KIND_KEYFRAME, frame, frame, checksum=frame_checksum(frame) ^ 1))
+
+
+def test_decode_rejects_delta_applied_to_the_wrong_frame():
+    previous = random_frame(19)
+    frame = edited(previous, 20)
+
+    with pytest.raises(ValueError, match="Checksum"):
+        decode_packets(packet(2, KIND_DELTA, frame, encode_delta(previous, frame)), BLACK)
+
+
+@pytest.mark.parametrize('data, frame', [
+    (b'', None),
+    (b'XX' + packet(1, KIND_KEYFRAME, BLACK, BLACK)[2:], None),
+    (packet(1, KIND_DELTA, BLACK, b''), None),
+])
+def test_decode_rejects_malformed_data(data, frame):
+    with pytest.raises(ValueError):
+        decode_packets(data, frame)
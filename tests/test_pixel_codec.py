@@ -0,0 +1,116 @@
+import json
+import random
+import sqlite3
+
+import pytest
+
+from model.frame import compile_frame
+from model.pixel_codec import (CELL_COUNT, CELL_KEYS, compile_packed_frame, is_packed, pack_cells, pack_pixels,
+                               packed_runs, register_functions, unpack_cells, unpack_pixels)
+
+
+def random_design(seed, colors=('#000000', '#ffffff', '#ff0000', '#00ff00'), fill=0.5):
+    rng = random.Random(seed)
+    return json.dumps({key: rng.choice(colors) for key in CELL_KEYS if rng.random() < fill},
+                      separators=(',', ':'))
+
+
+@pytest.mark.parametrize('pixel_data', [
+    '{}',
+    '{"0,0":"#ffffff"}',
+    '{"504,504":"#123456"}',
+    json.dumps({key: '#abcdef' for key in CELL_KEYS}),
+    random_design(1),
+    random_design(2, fill=0.05),
+    random_design(3, colors=tuple(f'#{i:06x}' for i in range(300))),
+])
+def test_pack_unpack_round_trip(pixel_data):
+    packed = pack_pixels(pixel_data)
+
+    assert is_packed(packed)
+    assert json.loads(unpack_pixels(packed)) == json.loads(pixel_data)
+
+
+def test_pack_keeps_exact_color_strings():
+    pixel_data = '{"0,0":"#FFF","8,0":"#fff","16,0":"#Ab12Cd"}'
+
+    assert json.loads(unpack_pixels(pack_pixels(pixel_data))) == json.loads(pixel_data)
+
+
+def test_packing_is_smaller_than_json():
+    pixel_data = random_design(4)
+
+    assert len(pack_pixels(pixel_data)) < len(pixel_data) / 4
+
+
+@pytest.mark.parametrize('pixel_data', [
+    '{"1,0":"#ffffff"}',  # Not on a cell corner
+    '{"512,0":"#ffffff"}',  # Off the board
+    '{"0,0":5}',  # Not a string color
+    '["0,0"]',
+    'not json',
+    '{"0,0":"\\ud800"}',  # Lone surrogate
+])
+def test_unpackable_pixel_data_stays_text(pixel_data):
+    assert pack_pixels(pixel_data) == pixel_data
+
+
+def test_packed_values_pass_through():
+    packed = pack_pixels(random_design(5))
+
+    assert pack_pixels(packed) is packed
+    assert unpack_pixels('{"0,0":"#fff"}') == '{"0,0":"#fff"}'
+    assert unpack_pixels(None) is None
+
+
+def test_pack_cells_unpack_cells_round_trip():
+    rng = random.Random(6)
+    cells = [rng.choice([None, '#000000', '#ffffff']) for _ in range(CELL_COUNT)]
+
+    assert unpack_cells(pack_cells(cells)) == cells
+
+
+def test_pack_pixels_matches_pack_cells():
+    pixel_data = random_design(7)
+    cells = [None] * CELL_COUNT
+    for key, color in json.loads(pixel_data).items():
+        cells[CELL_KEYS.index(key)] = color
+
+    assert pack_pixels(pixel_data) == pack_cells(cells)
+
+
+def test_runs_cover_the_board():
+    palette, runs = packed_runs(pack_pixels(random_design(8)))
+
+    assert sum(length for length, _ in runs) == CELL_COUNT
+    assert all(index <= len(palette) for _, index in runs)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_compile_packed_frame_matches_compile_frame(seed):
+    pixel_data = random_design(seed, colors=('#000', '#fff', '#f00', 'red'))
+
+    assert compile_packed_frame(pack_pixels(pixel_data)) == compile_frame(pixel_data)
+
+
+@pytest.mark.parametrize('mangle', [
+    lambda packed: packed[:-1],  # Truncated
+    lambda packed: packed[:4] + b'\x02' + packed[5:],  # Unknown version
+    lambda packed: packed + b'\x01\x01',  # Runs past the board
+    lambda packed: b'PXL!' + packed[4:],  # No magic
+])
+def test_corrupt_packed_values_are_rejected(mangle):
+    with pytest.raises(ValueError):
+        packed_runs(mangle(pack_pixels(random_design(9))))
+
+
+def test_pixel_json_sql_function():
+    pixel_data = random_design(10)
+    conn = sqlite3.connect(':memory:')
+    register_functions(conn)
+
+    (packed,), (text,) = conn.execute("SELECT pixel_json(?) UNION ALL SELECT pixel_json(?)",
+                                      (pack_pixels(pixel_data), pixel_data)).fetchall()
+
+    assert json.loads(packed) == json.loads(pixel_data)
+    assert text == pixel_data
@@ -0,0 +1,112 @@
+import json
+import random
+
+import pytest
+
+from model.pixel_codec import CELL_KEYS, pack_pixels, unpack_pixels
+from utilities.pixel_validator import (MAX_PIXEL_CHANGES, MAX_PIXEL_DATA_BYTES, PixelDataError, PixelDataTooLarge,
+                                       apply_pixel_changes, validate_pixel_changes, validate_pixel_data)
+
+
+def random_upload(seed, count=200):
+    rng = random.Random(seed)
+    return json.dumps({f"{rng.randrange(512)},{rng.randrange(512)}": rng.choice(['#FFF', '#abc', '#12AB34', '#000000'])
+                       for _ in range(count)}, indent=rng.choice([None, 2]))
+
+
+@pytest.mark.parametrize('pixel_data', [
+    '{}',
+    ' { } ',
+    '{"8,0": "#FFF", "0,0": "#000"}',
+    '{"3,5": "#abc", "0,0": "#def"}',  # Snapped onto one cell, the last one wins
+    random_upload(1),
+    random_upload(2, count=5000),
+])
+def test_canonicalize_is_idempotent(pixel_data):
+    canonical = validate_pixel_data(pixel_data).pixel_data
+
+    assert validate_pixel_data(canonical).pixel_data == canonical
+
+
+def test_canonical_form():
+    upload = '{"8,8": "#ABC", "3,5": "#123", "0,0": "#ffffff", "16,0": "#00Ff00"}'
+    validated = validate_pixel_data(upload)
+
+    assert validated.pixel_data == '{"0,0":"#ffffff","16,0":"#00ff00","8,8":"#aabbcc"}'
+    assert validated.stats == {'pixels': 3, 'colors': 3, 'duplicates': 1, 'snapped': 1,
+                               'bytes_in': len(upload), 'bytes_out': len(validated.pixel_data)}
+
+
+def test_canonical_keys_are_sorted_row_by_row():
+    keys = list(json.loads(validate_pixel_data(random_upload(3)).pixel_data))
+
+    assert keys == sorted(keys, key=CELL_KEYS.index)
+
+
+def test_canonical_form_always_packs():
+    canonical = validate_pixel_data(random_upload(4)).pixel_data
+
+    assert unpack_pixels(pack_pixels(canonical)) == canonical
+
+
+@pytest.mark.parametrize('pixel_data', [
+    '[]',
+    '"text"',
+    'not json',
+    '{"0,0": "#ffffff"',
+    '{"x": "#ffffff"}',
+    '{"-8,0": "#ffffff"}',
+    '{"512,0": "#ffffff"}',
+    '{"0,0": "red"}',
+    '{"0,0": "#ffff"}',
+    '{"0,0": null}',
+    '{"0,0": {"nested": 1}}',
+    None,
+])
+def test_invalid_pixel_data_is_rejected(pixel_data):
+    with pytest.raises(PixelDataError):
+        validate_pixel_data(pixel_data)
+
+
+def test_oversized_pixel_data_is_rejected_before_parsing():
+    with pytest.raises(PixelDataTooLarge):
+        validate_pixel_data('{' + ' ' * MAX_PIXEL_DATA_BYTES + '}')
+
+
+def test_changes_apply_like_a_full_upload():
+    base = validate_pixel_data(random_upload(5)).pixel_data
+    changes = {'0,0': '#F00', '8,0': None, '12,12': '#0000ff', '504,504': '#000'}
+
+    patched = apply_pixel_changes(pack_pixels(base), validate_pixel_changes(changes))
+
+    full = {key: color for key, color in json.loads(base).items()}
+    full.update({'0,0': '#ff0000', '8,8': '#0000ff', '504,504': '#000000'})
+    full.pop('8,0', None)
+    assert patched.pixel_data == validate_pixel_data(json.dumps(full)).pixel_data
+    assert unpack_pixels(patched.packed) == patched.pixel_data
+
+
+def test_changes_to_the_same_color_change_nothing():
+    base = validate_pixel_data('{"0,0": "#ffffff"}').pixel_data
+
+    patched = apply_pixel_changes(pack_pixels(base), validate_pixel_changes({'0,0': '#FFF', '8,0': None}))
+
+    assert patched.changed == {}
+    assert patched.pixel_data == base
+
+
+def test_changes_apply_to_legacy_text():
+    patched = apply_pixel_changes('{"3,3": "#ABC"}', validate_pixel_changes({'8,0': '#fff'}))
+
+    assert patched.pixel_data == '{"0,0":"#aabbcc","8,0":"#ffffff"}'
+
+
+@pytest.mark.parametrize('changes', [[], '{}', {'x': '#fff'}, {'0,0': 'red'}, {'0,0': 5}, {'999,0': '#fff'}])
+def test_invalid_changes_are_rejected(changes):
+    with pytest.raises(PixelDataError):
+        validate_pixel_changes(changes)
+
+
+def test_too_many_changes_are_rejected():
+    with pytest.raises(PixelDataTooLarge):
+        validate_pixel_changes({f"{i},0": '#fff' for i in range(MAX_PIXEL_CHANGES + 1)})
@@ -0,0 +1,121 @@
+import random
+import sqlite3
+
+import pytest
+
+from model.display_channel import DEFAULT_CHANNEL_ID
+from model.rotation_system import MIN_SORT_KEY_STEP, SORT_KEY_GAP, RotationSystemDAO, spread_sort_keys
+from utilities.migrations import migrate
+
+QUEUE_SIZE = 6
+
+
+@pytest.fixture
+def dao(tmp_path):
+    """A rotation DAO over a fresh database with QUEUE_SIZE items queued on the default channel."""
+    db_path = str(tmp_path / 'data.db')
+    migrate(db_path)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("INSERT INTO user (email, password) VALUES ('a@upr.edu', 'x')")
+    conn.execute("INSERT INTO design_payload (payload_hash, pixel_data, size) VALUES (x'00', '{}', 2)")
+    for position in range(1, QUEUE_SIZE + 1):
+        design_id = conn.execute("INSERT INTO design (user_id, title, payload_hash) VALUES (1, ?, x'00')",
+                                 (f"d{position}",)).lastrowid
+        conn.execute("""
+                     INSERT INTO rotation_queue (design_id, duration, expiry_time, sort_key, channel_id)
+                     VALUES (?, 30, '2099-01-01 00:00:00', ?, ?)
+                     """, (design_id, position * SORT_KEY_GAP, DEFAULT_CHANNEL_ID))
+    conn.commit()
+    conn.close()
+
+    return RotationSystemDAO(db_path)
+
+
+def queue_order(dao):
+    queue, _ = dao.get_rotation_state()
+    return [item['item_id'] for item in queue]
+
+
+def sort_keys(dao):
+    queue, _ = dao.get_rotation_state()
+    return [item['sort_key'] for item in queue]
+
+
+@pytest.mark.parametrize('low, high, count', [
+    (None, None, 1),
+    (None, 1024.0, 3),
+    (1024.0, None, 2),
+    (1024.0, 2048.0, 5),
+    (1.0, 1.0 + 4 * MIN_SORT_KEY_STEP, 1),
+])
+def test_spread_sort_keys_fits_between_neighbours(low, high, count):
+    base, step = spread_sort_keys(low, high, count)
+    keys = [base + step * i for i in range(1, count + 1)]
+
+    assert keys == sorted(keys) and len(set(keys)) == count
+    assert low is None or keys[0] > low
+    assert high is None or keys[-1] < high
+
+
+def test_spread_sort_keys_reports_no_room():
+    assert spread_sort_keys(1.0, 1.0 + MIN_SORT_KEY_STEP, 1) is None
+
+
+def test_reorder_matches_list_moves(dao):
+    expected = queue_order(dao)
+    rng = random.Random(1)
+
+    for _ in range(50):
+        item_id = rng.choice(expected)
+        position = rng.randint(1, QUEUE_SIZE + 1)
+        assert dao.reorder_images(item_id, position) == 0
+
+        expected.remove(item_id)
+        expected.insert(min(position, QUEUE_SIZE) - 1, item_id)
+        assert queue_order(dao) == expected
+
+
+def test_repeated_moves_into_the_same_gap_rebalance_and_keep_the_order(dao):
+    expected = queue_order(dao)
+
+    # Each move halves the gap between positions 1 and 2 until a rebalance has to step in
+    for _ in range(80):
+        item_id = expected[-1]
+        assert dao.reorder_images(item_id, 2) == 0
+        expected.remove(item_id)
+        expected.insert(1, item_id)
+        assert queue_order(dao) == expected
+
+    keys = sort_keys(dao)
+    assert all(high - low >= MIN_SORT_KEY_STEP for low, high in zip(keys, keys[1:]))
+
+
+def test_rebalance_spreads_keys_and_keeps_the_order(dao):
+    conn = sqlite3.connect(dao.db_path)
+    rng = random.Random(2)
+    for item_id in queue_order(dao):
+        conn.execute("UPDATE rotation_queue SET sort_key = ? WHERE item_id = ?", (rng.random(), item_id))
+    conn.commit()
+    conn.close()
+    expected = queue_order(dao)
+
+    conn = dao._get_connection()
+    try:
+        assert dao._rebalance(conn) == QUEUE_SIZE
+        conn.commit()
+    finally:
+        conn.close()
+
+    assert queue_order(dao) == expected
+    assert sort_keys(dao) == [position * SORT_KEY_GAP for position in range(1, QUEUE_SIZE + 1)]
+
+
+def test_history_display_order_matches_the_queue(dao):
+    assert dao.reorder_images(queue_order(dao)[-1], 1) == 0
+    positions = {item_id: position for position, item_id in enumerate(queue_order(dao), start=1)}
+
+    history = dao.get_user_history('a@upr.edu', include_pixels=False)
+
+    assert {item['item_id']: item['display_order'] for item in history} == positions
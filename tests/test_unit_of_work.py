@@ -0,0 +1,270 @@
+import functools
+import gc
+import sqlite3
+import threading
+
+import pytest
+from flask import Flask, jsonify
+
+import model.unit_of_work
+from model.connection_pool import ConnectionPool
+from model.design import DesignDAO
+from model.unit_of_work import (UnitOfWork, begin_unit_of_work, commit_unit_of_work, end_unit_of_work,
+                               flush_unit_of_work, get_unit_of_work)
+from utilities.migrations import migrate
+
+
+@pytest.fixture
+def db_pool(tmp_path):
+    db_path = str(tmp_path / 'data.db')
+    migrate(db_path)
+    db_pool = ConnectionPool(db_path, max_connections=2, timeout=0.5)
+    yield db_pool
+    db_pool.close_all()
+
+
+@pytest.fixture
+def app(db_pool, monkeypatch):
+    """An app with the request transaction hooks, its units and DAOs on db_pool."""
+    monkeypatch.setattr(model.unit_of_work, 'UnitOfWork', functools.partial(UnitOfWork, db_pool))
+    monkeypatch.setattr('model.design.pool', db_pool)
+
+    app = Flask(__name__)
+    app.before_request(begin_unit_of_work)
+    app.after_request(commit_unit_of_work)
+    app.teardown_request(end_unit_of_work)
+    return app
+
+
+def count(db_pool, table):
+    conn = sqlite3.connect(db_pool.database_path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def add_user(conn, email):
+    conn.execute("INSERT INTO user (email, password) VALUES (?, 'x')", (email,))
+
+
+def emails(db_pool):
+    conn = sqlite3.connect(db_pool.database_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT email FROM user ORDER BY user_id")]
+    finally:
+        conn.close()
+
+
+def test_error_response_rolls_back_what_the_request_wrote(app, db_pool):
+    @app.route('/design', methods=['POST'])
+    def add_design():
+        # No such user: the payload is stored before the design insert fails
+        if DesignDAO().add_new_design(999, 'title', '{"0,0":"#ffffff"}') < 0:
+            return jsonify(error="Couldn't add design"), 409
+        return jsonify(message="Added"), 201
+
+    assert app.test_client().post('/design').status_code == 409
+    assert count(db_pool, 'design_payload') == 0
+
+
+def test_error_response_keeps_flushed_writes(app, db_pool):
+    @app.route('/users', methods=['POST'])
+    def add_users():
+        conn = db_pool.connect()
+        add_user(conn, 'a@upr.edu')
+        conn.commit()
+        flush_unit_of_work()
+        add_user(conn, 'b@upr.edu')
+        conn.commit()
+        conn.close()
+        return jsonify(error="Failed"), 500
+
+    assert app.test_client().post('/users').status_code == 500
+    assert emails(db_pool) == ['a@upr.edu']
+
+
+def test_thread_keeps_its_connection_until_fully_released(db_pool):
+    conn = db_pool.connect()
+    assert db_pool.connect() is conn
+
+    db_pool.release(conn)
+    assert db_pool.stats()['in_use'] == 1
+    conn.close()
+    assert db_pool.stats()['in_use'] == 0
+    assert db_pool.connect() is conn
+    db_pool.release()
+
+
+def test_release_thread_ignores_depth(db_pool):
+    for _ in range(3):
+        db_pool.connect()
+
+    db_pool.release_thread()
+
+    assert db_pool.stats()['in_use'] == 0
+
+
+def test_threads_get_their_own_connections(db_pool):
+    conn = db_pool.connect()
+    other = []
+    thread = threading.Thread(target=lambda: other.append(db_pool.connect()))
+    thread.start()
+    thread.join()
+
+    assert other[0] is not conn
+    del other
+    gc.collect()
+    # The dead thread's lease was collected and its connection went back to the pool
+    assert db_pool.stats()['in_use'] == 1
+    db_pool.release_thread()
+
+
+def test_exhausted_pool_times_out(db_pool):
+    held = threading.Event()
+    done = threading.Event()
+
+    def hold():
+        db_pool.connect()
+        held.set()
+        done.wait()
+        db_pool.release_thread()
+
+    threads = [threading.Thread(target=hold) for _ in range(db_pool.max_connections)]
+    for thread in threads:
+        held.clear()
+        thread.start()
+        held.wait()
+
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            db_pool.connect()
+        assert db_pool.stats()['timeouts'] == 1
+    finally:
+        done.set()
+        for thread in threads:
+            thread.join()
+
+
+def test_request_shares_one_connection_and_commits_once(app, db_pool):
+    seen = []
+
+    @app.route('/users', methods=['POST'])
+    def add_users():
+        for email in ('a@upr.edu', 'b@upr.edu'):
+            conn = db_pool.connect()
+            seen.append(conn)
+            add_user(conn, email)
+            conn.commit()
+            assert conn.in_transaction
+            conn.close()
+        seen.append(get_unit_of_work().deferred_commits)
+        return jsonify(message="Added"), 201
+
+    response = app.test_client().post('/users')
+
+    assert response.status_code == 201
+    assert seen[0] is seen[1] and seen[2] == 2
+    assert emails(db_pool) == ['a@upr.edu', 'b@upr.edu']
+    assert db_pool.stats()['in_use'] == 0
+
+
+def test_rollback_undoes_only_the_writes_since_the_last_commit(app, db_pool):
+    delivered = []
+
+    @app.route('/users', methods=['POST'])
+    def add_users():
+        conn = db_pool.connect()
+        add_user(conn, 'a@upr.edu')
+        conn.commit()
+        get_unit_of_work().after_commit(lambda: delivered.append('a'))
+
+        add_user(conn, 'b@upr.edu')
+        conn.rollback()
+
+        add_user(conn, 'c@upr.edu')
+        conn.commit()
+        get_unit_of_work().after_commit(lambda: delivered.append('c'))
+        conn.close()
+        return jsonify(message="Added"), 201
+
+    assert app.test_client().post('/users').status_code == 201
+    assert emails(db_pool) == ['a@upr.edu', 'c@upr.edu']
+    assert delivered == ['a', 'c']
+
+
+def test_rollback_before_any_commit_undoes_everything(app, db_pool):
+    @app.route('/users', methods=['POST'])
+    def add_users():
+        conn = db_pool.connect()
+        add_user(conn, 'a@upr.edu')
+        conn.rollback()
+        add_user(conn, 'b@upr.edu')
+        conn.commit()
+        conn.close()
+        return jsonify(message="Added"), 201
+
+    assert app.test_client().post('/users').status_code == 201
+    assert emails(db_pool) == ['b@upr.edu']
+
+
+def test_lost_deferred_commits_fail_the_request(app, db_pool):
+    delivered = []
+
+    @app.route('/users', methods=['POST'])
+    def add_users():
+        conn = db_pool.connect()
+        add_user(conn, 'a@upr.edu')
+        conn.commit()
+        get_unit_of_work().after_commit(lambda: delivered.append('a'))
+
+        # As when SQLite aborts the whole transaction on an error
+        sqlite3.Connection.rollback(conn)
+        conn.rollback()
+
+        add_user(conn, 'b@upr.edu')
+        conn.commit()
+        conn.close()
+        return jsonify(message="Added"), 201
+
+    response = app.test_client().post('/users')
+
+    assert response.status_code == 500
+    assert emails(db_pool) == []
+    assert delivered == []
+
+
+def test_callbacks_wait_for_the_commit(app, db_pool):
+    delivered = []
+
+    @app.route('/users', methods=['POST'])
+    def add_users():
+        conn = db_pool.connect()
+        add_user(conn, 'a@upr.edu')
+        conn.commit()
+        get_unit_of_work().after_commit(lambda: delivered.append(emails(db_pool)))
+        assert delivered == []
+        conn.close()
+        return jsonify(message="Added"), 201
+
+    assert app.test_client().post('/users').status_code == 201
+    assert delivered == [['a@upr.edu']]
+
+
+def test_callbacks_are_dropped_on_rollback(app, db_pool):
+    delivered = []
+
+    @app.route('/users', methods=['POST'])
+    def add_users():
+        conn = db_pool.connect()
+        add_user(conn, 'a@upr.edu')
+        conn.commit()
+        get_unit_of_work().after_commit(lambda: delivered.append('a'))
+        conn.close()
+        raise RuntimeError("Unhandled")
+
+    app.testing = False
+    assert app.test_client().post('/users').status_code == 500
+    assert emails(db_pool) == []
+    assert delivered == []
+    assert db_pool.stats()['in_use'] == 0
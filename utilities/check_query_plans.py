@@ -0,0 +1,163 @@
+"""
+Self-check for the DAO queries.
+
+Builds a throwaway database from the migrations, runs EXPLAIN QUERY PLAN on
+every SQL string literal found in model/*.py and exits with status 1 if any
+of them falls back to a full table scan that isn't explicitly allowed.
+
+Usage (from the project root):
+    python utilities/check_query_plans.py
+"""
+import ast
+import glob
+import importlib
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from model.pixel_codec import register_functions
+from utilities.migrations import migrate
+
+SQL_START = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b', re.IGNORECASE)
+TABLE_SCAN = re.compile(r'^SCAN (?!CONSTANT ROW)(?!\()(\w+)$')
+
+# Queries that are expected to read the whole table, keyed by "file:function".
+# Anything listed here should be a bounded admin listing or a tiny table.
+ALLOWED_SCANS = {
+    'model/user.py:get_all_users': 'admin listing of every user',
+    'model/user.py:get_all_users_paginated': 'admin listing of every user',
+    'model/admin_action.py:getAllAdminAction': 'admin listing of every action',
+    'model/upload_history.py:getAllUploadHistory': 'admin listing of every upload',
+    'model/design.py:getApprovedDesigns': 'approval flag matches almost every design',
+    'model/rotation_system.py:_rebalance': 'rewrites every sort key on purpose',
+    'model/rotation_system.py:get_all_rotation_states': 'one active_item row per channel',
+    'model/display_channel.py:get_all_channels': 'one row per LED board',
+    'model/display_channel.py:get_channel_ids': 'one row per LED board',
+    'model/user_storage.py:reconcile': 'recounts every user on purpose',
+}
+
+
+class _AnyLocal(dict):
+    """Locals for rendering f-strings: any name the module doesn't define is True."""
+
+    def __init__(self, namespace: Dict):
+        super().__init__()
+        self.namespace = namespace
+
+    def __missing__(self, key):
+        return self.namespace.get(key, True)
+
+
+def render_fstring(node: ast.JoinedStr, namespace: Dict) -> Optional[str]:
+    """
+    Render an f-string query using the module's globals, taking every
+    conditional column or clause flag as set. None if it can't be rendered.
+    """
+    parts = []
+    for value in node.values:
+        if isinstance(value, ast.Constant):
+            parts.append(value.value)
+            continue
+        try:
+            expression = compile(ast.Expression(value.value), '<query>', 'eval')
+            parts.append(str(eval(expression, namespace, _AnyLocal(namespace))))
+        except Exception:
+            return None
+    return ''.join(parts)
+
+
+def iter_queries(path: str) -> Iterator[Tuple[str, int, str]]:
+    """Yield (function name, line, sql) for every SQL string literal or f-string in a module."""
+    with open(path, 'r') as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    namespace = None
+
+    for func in ast.walk(tree):
+        if not isinstance(func, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        # Docstrings are bare string expressions, never queries, and the literal
+        # parts of an f-string are checked as part of the whole
+        docstrings = {id(node.value) for node in ast.walk(func) if isinstance(node, ast.Expr)}
+        docstrings.update(id(part) for node in ast.walk(func) if isinstance(node, ast.JoinedStr)
+                          for part in node.values)
+        for node in ast.walk(func):
+            if id(node) in docstrings:
+                continue
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and SQL_START.match(node.value):
+                yield func.name, node.lineno, node.value
+            elif isinstance(node, ast.JoinedStr) and node.values and isinstance(node.values[0], ast.Constant) \
+                    and SQL_START.match(node.values[0].value):
+                if namespace is None:
+                    module_name = os.path.relpath(path, ROOT)[:-3].replace(os.sep, '.')
+                    namespace = vars(importlib.import_module(module_name))
+                sql = render_fstring(node, namespace)
+                if sql is not None:
+                    yield func.name, node.lineno, sql
+
+
+def table_scans(conn: sqlite3.Connection, sql: str) -> List[str]:
+    """Return the tables a statement scans without using an index."""
+    # Named placeholders for queries that reuse a value, positional otherwise
+    params = [None] * sql.count('?') if '?' in sql else dict.fromkeys(re.findall(r':(\w+)', sql))
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    scans = []
+    for row in rows:
+        match = TABLE_SCAN.match(row[3])
+        if match:
+            scans.append(match.group(1))
+    return scans
+
+
+def check(database_path: str) -> int:
+    conn = sqlite3.connect(database_path)
+    register_functions(conn)
+    failures = 0
+    checked = 0
+    skipped = []
+
+    for path in sorted(glob.glob(os.path.join(ROOT, 'model', '*.py'))):
+        rel_path = os.path.relpath(path, ROOT).replace(os.sep, '/')
+        seen = set()
+        for func_name, line, sql in iter_queries(path):
+            if sql in seen:
+                continue
+            seen.add(sql)
+
+            key = f"{rel_path}:{func_name}"
+            try:
+                scans = table_scans(conn, sql)
+            except sqlite3.Error as e:
+                # Fragments of dynamically built queries and tables that aren't in the schema
+                skipped.append(f"{key}:{line} ({e})")
+                continue
+
+            checked += 1
+            if scans and key not in ALLOWED_SCANS:
+                failures += 1
+                print(f"FAIL {key}:{line} scans {', '.join(scans)}")
+                print("     " + " ".join(sql.split()))
+
+    for entry in skipped:
+        print(f"SKIP {entry}")
+
+    print(f"Checked {checked} queries, {failures} table scan(s), {len(skipped)} skipped")
+    conn.close()
+    return failures
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, 'plan_check.db')
+        migrate(database_path)
+        return 1 if check(database_path) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,508 @@
+import hashlib
+import sqlite3
+from typing import Callable, List, NamedTuple, Optional
+
+from model.pixel_codec import payload_hash, unpack_pixels
+
+DATABASE_PATH = 'data.db'
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[sqlite3.Cursor], None]
+
+
+def _001_initial_schema(cur):
+    """Tables as originally created by utilities/create.py."""
+    cur.execute("""
+                CREATE TABLE IF NOT EXISTS user
+                (
+                    user_id           INTEGER PRIMARY KEY AUTOINCREMENT,
+                    email             TEXT     NOT NULL UNIQUE,
+                    password          TEXT     NOT NULL,
+                    is_admin          BOOLEAN  NOT NULL DEFAULT 0,
+                    is_verified       BOOLEAN  NOT NULL DEFAULT 0,
+                    is_email_verified BOOLEAN  NOT NULL DEFAULT 0,
+                    created_at        DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    updated_at        DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+                );
+                """)
+
+    cur.execute("""
+                CREATE TABLE IF NOT EXISTS temp_password
+                (
+                    tp_id         INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id       INTEGER NOT NULL,
+                    temp_password TEXT    NOT NULL,
+                    created_at    TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES user (user_id) ON DELETE CASCADE
+                );
+                """)
+
+    cur.execute("""
+                CREATE TABLE IF NOT EXISTS verification_code
+                (
+                    code_id    INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id    INTEGER NOT NULL,
+                    code       TEXT    NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES user (user_id) ON DELETE CASCADE
+                );
+                """)
+
+    cur.execute("""
+                CREATE TABLE IF NOT EXISTS design
+                (
+                    design_id   INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id     INTEGER  NOT NULL,
+                    title       TEXT     NOT NULL,
+                    pixel_data  TEXT     NOT NULL, -- Changed to pixel_data since conversion is client-side
+                    is_approved BOOLEAN  NOT NULL DEFAULT 1,
+                    status      BOOLEAN  NOT NULL DEFAULT 0,
+                    created_at  DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    updated_at  DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES user (user_id) ON DELETE CASCADE
+                );
+                """)
+
+    cur.execute("""
+                CREATE TABLE IF NOT EXISTS rotation_queue
+                (
+                    item_id       INTEGER PRIMARY KEY AUTOINCREMENT,
+                    design_id     INTEGER  NOT NULL,
+                    duration      INTEGER  NOT NULL, -- Duration in seconds
+                    display_order INTEGER  NOT NULL, -- For custom ordering
+                    expiry_time   DATETIME NOT NULL, -- When to remove from rotation
+                    created_at    DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    updated_at    DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (design_id) REFERENCES design (design_id) ON DELETE CASCADE
+                );
+                """)
+
+    cur.execute("""
+                CREATE TABLE IF NOT EXISTS scheduled_items
+                (
+                    schedule_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+                    design_id        INTEGER  NOT NULL,
+                    duration         INTEGER  NOT NULL,           -- Duration in seconds (min 60)
+                    start_time       DATETIME NOT NULL,           -- When to insert into rotation
+                    end_time         DATETIME,                    -- When to remove from rotation (NULL = 1 day default)
+                    override_current BOOLEAN  NOT NULL DEFAULT 0, -- Whether to make it active immediately
+                    created_at       DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    updated_at       DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (design_id) REFERENCES design (design_id) ON DELETE CASCADE
+                );
+                """)
+
+    cur.execute("""
+                CREATE TABLE IF NOT EXISTS active_item
+                (
+                    id           INTEGER PRIMARY KEY DEFAULT 1,
+                    item_id      INTEGER,
+                    activated_at DATETIME NOT NULL   DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (item_id) REFERENCES rotation_queue (item_id) ON DELETE SET NULL
+                );
+                """)
+
+    cur.execute("INSERT OR IGNORE INTO active_item (id, item_id, activated_at) VALUES (1, NULL, CURRENT_TIMESTAMP)")
+
+    cur.execute("""
+                CREATE TABLE IF NOT EXISTS admin_action
+                (
+                    action_id        INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id          INTEGER  NOT NULL,
+                    target_user_id   INTEGER,
+                    target_design_id INTEGER,
+                    target_queue_id  INTEGER,
+                    action_type      TEXT     NOT NULL,
+                    action_details   TEXT,
+                    created_at       DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES user (user_id) ON DELETE CASCADE,
+                    FOREIGN KEY (target_user_id) REFERENCES user (user_id) ON DELETE SET NULL,
+                    FOREIGN KEY (target_design_id) REFERENCES design (design_id) ON DELETE SET NULL,
+                    FOREIGN KEY (target_queue_id) REFERENCES rotation_queue (item_id) ON DELETE SET NULL
+                );
+                """)
+
+    cur.execute("""
+                CREATE TABLE IF NOT EXISTS upload_history
+                (
+                    history_id   INTEGER PRIMARY KEY AUTOINCREMENT,
+                    design_id    INTEGER  NOT NULL,
+                    attempt_time DATETIME NOT NULL,
+                    status       TEXT CHECK (status IN ('pending', 'successful', 'failed')),
+                    created_at   DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    updated_at   DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (design_id) REFERENCES design (design_id) ON DELETE CASCADE
+                );
+                """)
+
+
+def _002_hot_path_indexes(cur):
+    """Secondary indexes for the lookups, joins and sorts done by the DAOs."""
+    statements = [
+        # Expiry sweep and design -> queue joins
+        "CREATE INDEX IF NOT EXISTS idx_rotation_queue_expiry_time ON rotation_queue (expiry_time)",
+        "CREATE INDEX IF NOT EXISTS idx_rotation_queue_design ON rotation_queue (design_id)",
+        # Due-item polling and design -> schedule joins
+        "CREATE INDEX IF NOT EXISTS idx_scheduled_items_start_time ON scheduled_items (start_time)",
+        "CREATE INDEX IF NOT EXISTS idx_scheduled_items_design ON scheduled_items (design_id)",
+        # Per-user history, newest first
+        "CREATE INDEX IF NOT EXISTS idx_upload_history_design_attempt ON upload_history (design_id, attempt_time)",
+        "CREATE INDEX IF NOT EXISTS idx_upload_history_attempt_time ON upload_history (attempt_time)",
+        # Foreign keys followed by ON DELETE actions
+        "CREATE INDEX IF NOT EXISTS idx_admin_action_user ON admin_action (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_admin_action_target_user ON admin_action (target_user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_admin_action_target_design ON admin_action (target_design_id)",
+        "CREATE INDEX IF NOT EXISTS idx_admin_action_target_queue ON admin_action (target_queue_id)",
+        "CREATE INDEX IF NOT EXISTS idx_temp_password_user ON temp_password (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_verification_code_user ON verification_code (user_id)",
+    ]
+    for statement in statements:
+        cur.execute(statement)
+
+
+def _003_sparse_rotation_order(cur):
+    """
+    Replace the dense display_order positions with sparse sort keys so
+    inserts, moves and removals touch a single row. Positions are now
+    derived from the sort order when the queue is read.
+    """
+    cur.execute("ALTER TABLE rotation_queue ADD COLUMN sort_key REAL NOT NULL DEFAULT 0")
+    # Same spacing as SORT_KEY_GAP in model/rotation_system.py
+    cur.execute("""
+                UPDATE rotation_queue
+                SET sort_key = ranked.position * 1024.0
+                FROM (SELECT item_id, ROW_NUMBER() OVER (ORDER BY display_order, item_id) AS position
+                      FROM rotation_queue) AS ranked
+                WHERE rotation_queue.item_id = ranked.item_id
+                """)
+    cur.execute("ALTER TABLE rotation_queue DROP COLUMN display_order")
+
+
+def _004_design_frames(cur):
+    """
+    Packed LED board frames compiled from each design's pixel_data.
+
+    Kept out of the design table so queries selecting d.* don't drag the
+    blob along. Designs saved before this migration are compiled the first
+    time their frame is requested.
+    """
+    cur.execute("""
+                CREATE TABLE IF NOT EXISTS design_frame
+                (
+                    design_id  INTEGER PRIMARY KEY,
+                    version    INTEGER  NOT NULL DEFAULT 1,
+                    frame      BLOB     NOT NULL,
+                    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (design_id) REFERENCES design (design_id) ON DELETE CASCADE
+                );
+                """)
+
+
+def _005_display_channels(cur):
+    """
+    Independent display channels, one per LED board. Every channel has its
+    own queue, schedule and active item; the active_item row's id is now
+    the channel id, and the existing queue becomes channel 1.
+
+    Each channel also has a version, bumped by triggers whenever anything
+    its rotation endpoints return changes, so it can be served as an ETag
+    without a change on one board invalidating the others.
+    """
+    cur.execute("""
+                CREATE TABLE IF NOT EXISTS display_channel
+                (
+                    channel_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name       TEXT     NOT NULL UNIQUE,
+                    version    INTEGER  NOT NULL DEFAULT 0,
+                    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+                );
+                """)
+    cur.execute("INSERT OR IGNORE INTO display_channel (channel_id, name) VALUES (1, 'default')")
+
+    # ADD COLUMN can't carry a foreign key with a non-NULL default, so the
+    # channel's rows are removed by the trigger below instead of a cascade
+    cur.execute("ALTER TABLE rotation_queue ADD COLUMN channel_id INTEGER NOT NULL DEFAULT 1")
+    cur.execute("ALTER TABLE scheduled_items ADD COLUMN channel_id INTEGER NOT NULL DEFAULT 1")
+
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_rotation_queue_channel_order ON rotation_queue (channel_id, sort_key)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_scheduled_items_channel_start ON scheduled_items (channel_id, start_time)")
+    # With one row per channel, finding the channels showing an item (and
+    # nulling the pointer when it's deleted) shouldn't read them all
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_active_item_item ON active_item (item_id)")
+
+    cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_display_channel_insert
+                AFTER INSERT ON display_channel
+                BEGIN
+                    INSERT INTO active_item (id, item_id, activated_at) VALUES (NEW.channel_id, NULL, CURRENT_TIMESTAMP);
+                END;
+                """)
+    cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_display_channel_delete
+                AFTER DELETE ON display_channel
+                BEGIN
+                    DELETE FROM active_item WHERE id = OLD.channel_id;
+                    DELETE FROM rotation_queue WHERE channel_id = OLD.channel_id;
+                    DELETE FROM scheduled_items WHERE channel_id = OLD.channel_id;
+                END;
+                """)
+
+    def bump(channel):
+        return f"UPDATE display_channel SET version = version + 1 WHERE channel_id = {channel};"
+
+    for table, channel in (('rotation_queue', 'channel_id'), ('scheduled_items', 'channel_id'), ('active_item', 'id')):
+        for operation, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+            cur.execute(f"""
+                        CREATE TRIGGER IF NOT EXISTS trg_{table}_{operation.lower()}_version
+                        AFTER {operation} ON {table}
+                        BEGIN {bump(f'{row}.{channel}')} END;
+                        """)
+
+    # Queued and scheduled items are returned together with their design.
+    # Deletes need no trigger: the cascades fire the ones above.
+    cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_design_update_version
+                AFTER UPDATE ON design
+                BEGIN
+                    UPDATE display_channel SET version = version + 1
+                    WHERE channel_id IN (SELECT channel_id FROM rotation_queue WHERE design_id = NEW.design_id
+                                         UNION
+                                         SELECT channel_id FROM scheduled_items WHERE design_id = NEW.design_id);
+                END;
+                """)
+
+
+def _006_design_payloads(cur):
+    """
+    Content-addressed pixel data. Designs reference a design_payload row by
+    the SHA-256 of their JSON text instead of each storing a copy, and a user
+    is charged once per distinct payload however many designs share it.
+
+    The per-user storage ledger lets quota checks read one row instead of
+    summing every design. Triggers keep the reference counts and the ledger
+    in step with design inserts, payload changes and deletes, and drop a
+    payload when its last design goes. Existing pixel_data moves into
+    payloads as stored and is repacked (model/pixel_codec.py) in small
+    batches after startup.
+    """
+    cur.execute("""
+                CREATE TABLE IF NOT EXISTS design_payload
+                (
+                    payload_hash BLOB PRIMARY KEY,
+                    pixel_data   BLOB     NOT NULL, -- Packed (model/pixel_codec.py) or JSON text
+                    size         INTEGER  NOT NULL,
+                    ref_count    INTEGER  NOT NULL DEFAULT 0,
+                    created_at   DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+                );
+                """)
+    cur.execute("""
+                CREATE TABLE IF NOT EXISTS user_payload
+                (
+                    user_id      INTEGER NOT NULL,
+                    payload_hash BLOB    NOT NULL,
+                    ref_count    INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (user_id, payload_hash),
+                    FOREIGN KEY (user_id) REFERENCES user (user_id) ON DELETE CASCADE
+                );
+                """)
+    cur.execute("""
+                CREATE TABLE IF NOT EXISTS user_storage
+                (
+                    user_id       INTEGER PRIMARY KEY,
+                    bytes         INTEGER  NOT NULL DEFAULT 0,
+                    reconciled_at DATETIME,
+                    FOREIGN KEY (user_id) REFERENCES user (user_id) ON DELETE CASCADE
+                );
+                """)
+    cur.execute("ALTER TABLE design ADD COLUMN payload_hash BLOB REFERENCES design_payload (payload_hash)")
+
+    last_id = 0
+    while True:
+        cur.execute("SELECT design_id, pixel_data FROM design WHERE design_id > ? ORDER BY design_id LIMIT 500",
+                    (last_id,))
+        rows = cur.fetchall()
+        if not rows:
+            break
+        for design_id, pixel_data in rows:
+            raw = pixel_data if isinstance(pixel_data, bytes) else pixel_data.encode('utf-8', 'surrogatepass')
+            try:
+                digest = payload_hash(unpack_pixels(pixel_data))
+            except ValueError:
+                digest = hashlib.sha256(raw).digest()
+            cur.execute("""
+                        INSERT INTO design_payload (payload_hash, pixel_data, size) VALUES (?, ?, ?)
+                        ON CONFLICT (payload_hash) DO NOTHING
+                        """, (digest, pixel_data, len(raw)))
+            cur.execute("UPDATE design SET payload_hash = ? WHERE design_id = ?", (digest, design_id))
+        last_id = rows[-1][0]
+
+    cur.execute("ALTER TABLE design DROP COLUMN pixel_data")
+    # Payload -> designs for reference checks, and duplicate lookups per owner
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_design_payload ON design (payload_hash, user_id)")
+    # Payload -> users charged for it, when its stored size changes
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_user_payload_hash ON user_payload (payload_hash)")
+    cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_design_payload_unpacked
+                ON design_payload (payload_hash) WHERE typeof(pixel_data) = 'text'
+                """)
+
+    cur.execute("""
+                UPDATE design_payload
+                SET ref_count = (SELECT COUNT(*) FROM design d WHERE d.payload_hash = design_payload.payload_hash)
+                """)
+    cur.execute("""
+                INSERT INTO user_payload (user_id, payload_hash, ref_count)
+                SELECT user_id, payload_hash, COUNT(*) FROM design GROUP BY user_id, payload_hash
+                """)
+    cur.execute("""
+                INSERT INTO user_storage (user_id, bytes, reconciled_at)
+                SELECT up.user_id, SUM(dp.size), CURRENT_TIMESTAMP
+                FROM user_payload up
+                JOIN design_payload dp ON dp.payload_hash = up.payload_hash
+                GROUP BY up.user_id
+                """)
+
+    def user_refs(row):
+        return f"(SELECT ref_count FROM user_payload WHERE user_id = {row}.user_id AND payload_hash = {row}.payload_hash)"
+
+    def add(row):
+        # The first design of a user to use a payload charges them for it
+        return f"""
+            INSERT INTO user_payload (user_id, payload_hash, ref_count) VALUES ({row}.user_id, {row}.payload_hash, 1)
+            ON CONFLICT (user_id, payload_hash) DO UPDATE SET ref_count = ref_count + 1;
+            UPDATE design_payload SET ref_count = ref_count + 1 WHERE payload_hash = {row}.payload_hash;
+            INSERT INTO user_storage (user_id, bytes)
+            SELECT {row}.user_id, size FROM design_payload
+            WHERE payload_hash = {row}.payload_hash AND {user_refs(row)} = 1
+            ON CONFLICT (user_id) DO UPDATE SET bytes = bytes + excluded.bytes;"""
+
+    def remove(row):
+        # The last one refunds it, and a payload no design uses is deleted
+        return f"""
+            UPDATE user_storage
+            SET bytes = bytes - (SELECT size FROM design_payload WHERE payload_hash = {row}.payload_hash)
+            WHERE user_id = {row}.user_id AND {user_refs(row)} = 1;
+            DELETE FROM user_payload
+            WHERE user_id = {row}.user_id AND payload_hash = {row}.payload_hash AND ref_count = 1;
+            UPDATE user_payload SET ref_count = ref_count - 1
+            WHERE user_id = {row}.user_id AND payload_hash = {row}.payload_hash;
+            UPDATE design_payload SET ref_count = ref_count - 1 WHERE payload_hash = {row}.payload_hash;
+            DELETE FROM design_payload WHERE payload_hash = {row}.payload_hash AND ref_count = 0;"""
+
+    # On update the new payload is counted first, so keeping the same one never drops it
+    for operation, body in (('INSERT', add('NEW')),
+                            ('UPDATE OF payload_hash, user_id', add('NEW') + remove('OLD')),
+                            ('DELETE', remove('OLD'))):
+        cur.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_design_{operation.split()[0].lower()}_payload
+                    AFTER {operation} ON design
+                    BEGIN {body} END;
+                    """)
+
+    # Repacking a payload changes what every user charged for it is using
+    cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_design_payload_resize
+                AFTER UPDATE OF size ON design_payload
+                BEGIN
+                    UPDATE user_storage SET bytes = bytes + NEW.size - OLD.size
+                    WHERE user_id IN (SELECT user_id FROM user_payload WHERE payload_hash = NEW.payload_hash);
+                END;
+                """)
+
+
+def _007_gallery_index(cur):
+    """
+    Covering index for the design gallery. A page is a range of a user's
+    designs ordered by (updated_at, design_id), read straight from the index
+    with every column the gallery lists, so deep pages cost the same as the
+    first. It leads with user_id, so it also serves the quota and ownership
+    lookups by owner.
+    """
+    cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_design_gallery
+                    ON design (user_id, updated_at, design_id, title, is_approved, status, created_at, payload_hash)
+                """)
+
+
+# Append new migrations at the end; never renumber or edit applied ones.
+MIGRATIONS: List[Migration] = [
+    Migration(1, 'initial schema', _001_initial_schema),
+    Migration(2, 'hot path indexes', _002_hot_path_indexes),
+    Migration(3, 'sparse rotation order', _003_sparse_rotation_order),
+    Migration(4, 'design frames', _004_design_frames),
+    Migration(5, 'display channels', _005_display_channels),
+    Migration(6, 'design payloads', _006_design_payloads),
+    Migration(7, 'gallery index', _007_gallery_index),
+]
+
+
+def _ensure_version_table(cur):
+    cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version
+                (
+                    version    INTEGER PRIMARY KEY,
+                    name       TEXT     NOT NULL,
+                    applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+                );
+                """)
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    """Return the highest applied migration version (0 for an empty database)."""
+    cur = conn.cursor()
+    try:
+        _ensure_version_table(cur)
+        cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        return cur.fetchone()[0]
+    finally:
+        cur.close()
+
+
+def migrate(database_path: str = DATABASE_PATH, target: Optional[int] = None) -> List[Migration]:
+    """
+    Apply every pending migration up to target (default: latest).
+
+    Each migration runs in its own write transaction together with its
+    schema_version row, so a failure leaves the database at the last
+    fully applied version.
+
+    Returns:
+        List of migrations that were applied
+    """
+    conn = sqlite3.connect(database_path, isolation_level=None)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA busy_timeout = 5000")
+    cur = conn.cursor()
+    applied = []
+
+    try:
+        for migration in MIGRATIONS:
+            if target is not None and migration.version > target:
+                break
+
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                # Re-check under the write lock in case another process migrated first
+                if migration.version <= current_version(conn):
+                    cur.execute("ROLLBACK")
+                    continue
+
+                migration.apply(cur)
+                cur.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                            (migration.version, migration.name))
+                cur.execute(f"PRAGMA user_version = {migration.version}")
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+
+            applied.append(migration)
+            print(f"Applied migration {migration.version:03d}: {migration.name}")
+
+        return applied
+    finally:
+        cur.close()
+        conn.close()
@@ -0,0 +1,219 @@
+"""
+Validation and canonical form for uploaded pixel_data.
+
+Uploads must be a flat JSON object of "x,y" canvas coordinates to "#rrggbb"
+(or "#rgb") colors. The size cap and the opening brace are checked before
+anything is parsed, so oversized or obviously hostile uploads are turned
+away without reading them. The rest is one pass over the entries: the C
+JSON decoder hands them over as pairs, keys already on the board grid are a
+table lookup and each distinct color is checked once.
+
+The canonical form is what gets stored: keys snapped to the corner of the
+board cell they fall in and sorted row by row, one entry per cell (the last
+one wins, as it does when a frame is compiled), colors as lowercase #rrggbb.
+
+A patch is a smaller object of the same kind, with null to clear a cell. It
+is checked the same way, then applied to the stored cells to give the whole
+design again in canonical form.
+"""
+import json
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+from model.frame import CELL_SIZE, FRAME_HEIGHT, FRAME_WIDTH
+from model.pixel_codec import CELL_COUNT, CELL_KEYS, CELL_OF_KEY, is_packed, pack_cells, unpack_cells
+
+# A full board in canonical form is about 82 KB
+MAX_PIXEL_DATA_BYTES = 128 * 1024
+# A patch can touch every cell once
+MAX_PIXEL_CHANGES = CELL_COUNT
+
+_KEY = re.compile(r'([0-9]{1,4}),([0-9]{1,4})')
+_COLOR = re.compile(r'#([0-9a-fA-F]{6}|[0-9a-fA-F]{3})')
+
+
+class PixelDataError(ValueError):
+    """pixel_data that can't be stored."""
+
+
+class PixelDataTooLarge(PixelDataError):
+    """pixel_data over MAX_PIXEL_DATA_BYTES."""
+
+
+class ValidatedPixels(NamedTuple):
+    pixel_data: str  # Canonical JSON text
+    stats: Dict  # pixels, colors, duplicates, snapped, bytes_in, bytes_out
+
+
+class PixelChanges(NamedTuple):
+    cells: Dict[int, Optional[str]]  # Cell to canonical color, None to clear it
+    stats: Dict  # changes, snapped
+
+
+class PatchedPixels(NamedTuple):
+    pixel_data: str  # Canonical JSON text of the whole patched design
+    packed: bytes  # The same design in the stored format
+    changed: Dict[int, Optional[str]]  # The cells that actually changed
+    stats: Dict  # changes, changed, snapped, pixels, colors
+
+
+class _Pairs(list):
+    """Entries of a JSON object in document order, duplicates included."""
+
+
+def _cell_of(key: str) -> int:
+    """Board cell of an off-grid key, snapped to the cell it falls in."""
+    match = _KEY.fullmatch(key)
+    if match is None:
+        raise PixelDataError(f'Pixel key "{key[:16]}" must be "x,y"')
+
+    x, y = int(match.group(1)), int(match.group(2))
+    if x >= FRAME_WIDTH * CELL_SIZE or y >= FRAME_HEIGHT * CELL_SIZE:
+        raise PixelDataError(f'Pixel "{x},{y}" is outside the '
+                             f'{FRAME_WIDTH * CELL_SIZE}x{FRAME_HEIGHT * CELL_SIZE} canvas')
+    return (y // CELL_SIZE) * FRAME_WIDTH + x // CELL_SIZE
+
+
+def _canonical_color(color) -> str:
+    if not isinstance(color, str) or _COLOR.fullmatch(color) is None:
+        raise PixelDataError(f'Pixel color {json.dumps(color)[:16]} must be "#rrggbb"')
+
+    digits = color[1:].lower()
+    return '#' + (''.join(digit * 2 for digit in digits) if len(digits) == 3 else digits)
+
+
+def _canonical_text(cells: Dict[int, str]) -> str:
+    return '{' + ','.join(f'"{CELL_KEYS[cell]}":"{cells[cell]}"' for cell in sorted(cells)) + '}'
+
+
+def validate_pixel_data(pixel_data: str) -> ValidatedPixels:
+    """
+    Validate uploaded pixel_data and return its canonical form.
+
+    Args:
+        pixel_data: JSON text from the client
+
+    Returns:
+        ValidatedPixels with the canonical JSON text and what canonicalizing did
+
+    Raises:
+        PixelDataTooLarge: If the text is over MAX_PIXEL_DATA_BYTES
+        PixelDataError: If it isn't an object of in-bounds coordinates to colors
+    """
+    if not isinstance(pixel_data, str):
+        raise PixelDataError("pixel_data must be JSON text")
+    # Characters, not bytes: a valid design is plain ASCII
+    if len(pixel_data) > MAX_PIXEL_DATA_BYTES:
+        raise PixelDataTooLarge(f"pixel_data is over {MAX_PIXEL_DATA_BYTES} bytes")
+    if not pixel_data.lstrip().startswith('{'):
+        raise PixelDataError("pixel_data must be a JSON object")
+
+    try:
+        pairs = json.loads(pixel_data, object_pairs_hook=_Pairs)
+    except (ValueError, RecursionError):
+        raise PixelDataError("pixel_data isn't valid JSON") from None
+    if type(pairs) is not _Pairs:
+        raise PixelDataError("pixel_data must be a JSON object")
+
+    cells: Dict[int, str] = {}
+    colors: Dict[str, str] = {}
+    snapped = 0
+    for key, color in pairs:
+        cell = CELL_OF_KEY.get(key)
+        if cell is None:
+            cell = _cell_of(key)
+            snapped += 1
+
+        canonical = colors.get(color) if isinstance(color, str) else None
+        if canonical is None:
+            canonical = colors[color] = _canonical_color(color)
+        cells[cell] = canonical
+
+    text = _canonical_text(cells)
+    return ValidatedPixels(text, {
+        'pixels': len(cells),
+        'colors': len(set(cells.values())),
+        'duplicates': len(pairs) - len(cells),
+        'snapped': snapped,
+        'bytes_in': len(pixel_data),
+        'bytes_out': len(text),
+    })
+
+
+def validate_pixel_changes(changes) -> PixelChanges:
+    """
+    Validate a patch of pixel changes.
+
+    Args:
+        changes: Object of "x,y" keys to a color, or None to clear the pixel
+
+    Returns:
+        PixelChanges with the cells to set, the last change to a cell wins
+
+    Raises:
+        PixelDataTooLarge: If there are more than MAX_PIXEL_CHANGES changes
+        PixelDataError: If it isn't an object of in-bounds coordinates to colors
+    """
+    if not isinstance(changes, dict):
+        raise PixelDataError("pixels must be an object of changes")
+    if len(changes) > MAX_PIXEL_CHANGES:
+        raise PixelDataTooLarge(f"A patch can change at most {MAX_PIXEL_CHANGES} pixels")
+
+    cells: Dict[int, Optional[str]] = {}
+    snapped = 0
+    for key, color in changes.items():
+        cell = CELL_OF_KEY.get(key)
+        if cell is None:
+            cell = _cell_of(key)
+            snapped += 1
+        cells[cell] = None if color is None else _canonical_color(color)
+
+    return PixelChanges(cells, {'changes': len(changes), 'snapped': snapped})
+
+
+def _stored_cells(stored) -> List[Optional[str]]:
+    """Every cell of a stored design, colors in canonical form."""
+    if is_packed(stored):
+        canonical = {}
+        cells = unpack_cells(stored)
+        for cell, color in enumerate(cells):
+            if color is not None:
+                if color not in canonical:
+                    canonical[color] = _canonical_color(color)
+                cells[cell] = canonical[color]
+        return cells
+
+    # Legacy JSON text that never fit the packed format
+    cells = [None] * CELL_COUNT
+    for key, color in json.loads(validate_pixel_data(stored).pixel_data).items():
+        cells[CELL_OF_KEY[key]] = color
+    return cells
+
+
+def apply_pixel_changes(stored, changes: PixelChanges) -> PatchedPixels:
+    """
+    Apply validated changes to a stored design.
+
+    Args:
+        stored: The design's pixel_data as stored, packed or JSON text
+        changes: From validate_pixel_changes
+
+    Returns:
+        PatchedPixels with the whole design after the changes
+
+    Raises:
+        PixelDataError: If the stored design isn't valid pixel_data itself
+        ValueError: If a packed design is corrupt
+    """
+    cells = _stored_cells(stored)
+    changed = {cell: color for cell, color in changes.cells.items() if cells[cell] != color}
+    for cell, color in changed.items():
+        cells[cell] = color
+
+    pixels = {cell: color for cell, color in enumerate(cells) if color is not None}
+    return PatchedPixels(_canonical_text(pixels), pack_cells(cells), changed, {
+        **changes.stats,
+        'changed': len(changed),
+        'pixels': len(pixels),
+        'colors': len(set(pixels.values())),
+    })
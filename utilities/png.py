@@ -0,0 +1,39 @@
+"""
+Minimal PNG encoder for 8-bit RGB images, standard library only.
+"""
+import struct
+import zlib
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# Pixel art compresses well; higher levels barely help and cost time
+COMPRESSION_LEVEL = 6
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def encode_png(width: int, height: int, rgb: bytes) -> bytes:
+    """
+    Encode packed RGB888 pixels (row by row from the top-left) as a PNG.
+
+    Args:
+        width: Image width in pixels
+        height: Image height in pixels
+        rgb: width * height * 3 bytes
+
+    Returns:
+        PNG file contents
+    """
+    stride = width * 3
+    if len(rgb) != stride * height:
+        raise ValueError(f"Expected {stride * height} bytes of RGB data, got {len(rgb)}")
+
+    # Filter type 0 (None) in front of every row
+    raw = b''.join(b'\x00' + rgb[row * stride:(row + 1) * stride] for row in range(height))
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+
+    return (PNG_SIGNATURE
+            + _chunk(b'IHDR', header)
+            + _chunk(b'IDAT', zlib.compress(raw, COMPRESSION_LEVEL))
+            + _chunk(b'IEND', b''))
@@ -174,6 +174,7 @@ export const AuthProvider = ({ children }) => {
         params: {
           page: pageNum,
           size: pageSize,
+          include_pixels: false,
         },
       });
       return { success: true, data: response.data };
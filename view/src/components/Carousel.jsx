@@ -3,6 +3,7 @@ import React, { useState, useRef, useEffect } from 'react';
 import { ChevronLeft, ChevronRight } from 'lucide-react';
 import './styles/Carousel.css';
 import axios from '../api/axios';
+import { getToken } from '../auth/jwtUtils';
 import { renderPixelDataToImage } from '../utils/pixelRenderer';
 
 const Carousel = ({ userRole }) => {
@@ -15,8 +16,9 @@ const Carousel = ({ userRole }) => {
   const [scrollAmount, setScrollAmount] = useState(200);
 
   // const [redirectToEdit, setRedirectToEdit] = useState(null);
-  const queueRef = useRef([]); // persistent visual queue
-  const previousActiveIdRef = useRef(null);
+  const detailsRef = useRef(new Map()); // item_id -> rendered item
+  const orderRef = useRef([]); // item ids in rotation order
+  const activeIdRef = useRef(null);
 
   useEffect(() => {
     // Adjust scroll amount based on first item's width and gap
@@ -27,50 +29,98 @@ const Carousel = ({ userRole }) => {
       const gap = parseInt(computedStyle.columnGap || '16', 10);
       setScrollAmount(itemWidth + gap);
     }
-    fetchRotationItems();
-    
-    // Set up polling to refresh data every 5 seconds
-    const intervalId = setInterval(() => {
-      fetchRotationItems();
-    }, 5000);
-    
-    // Clean up the interval on component unmount
-    return () => clearInterval(intervalId);
-  }, []);
 
-const fetchRotationItems = async () => {
-  try {
-    const currentResponse = await axios.get('/rotation/current');
-    const activeItem = currentResponse.data?.image;
-    const activeItemId = activeItem?.item_id;
-    setCurrentImage(activeItem);
+    // The server pushes rotation changes instead of us polling every few seconds
+    let source = null;
+    let retryId = null;
+    let closed = false;
+    let lastEventId = null;
+
+    const connect = () => {
+      const token = getToken();
+      const params = new URLSearchParams();
+      if (token) params.set('jwt', token);
+      // EventSource only sends Last-Event-ID itself on its own reconnects
+      if (lastEventId) params.set('last_event_id', lastEventId);
+      source = new EventSource(`${axios.defaults.baseURL}/rotation/stream?${params}`);
+
+      const listen = (type, handler) => {
+        source.addEventListener(type, (e) => {
+          if (e.lastEventId) lastEventId = e.lastEventId;
+          handler(JSON.parse(e.data));
+        });
+      };
 
-    const response = await axios.get('/rotation/items');
-    const data = response.data.items || [];
+      listen('snapshot', (data) => {
+        orderRef.current = data.order;
+        activeIdRef.current = data.active ? data.active.item_id : null;
+        syncItems();
+      });
+      listen('added', (data) => {
+        orderRef.current = data.order;
+        syncItems();
+      });
+      listen('removed', (data) => {
+        orderRef.current = data.order;
+        data.item_ids.forEach((id) => detailsRef.current.delete(id));
+        updateItems();
+      });
+      listen('reordered', (data) => {
+        orderRef.current = data.order;
+        updateItems();
+      });
+      listen('active', (data) => {
+        activeIdRef.current = data.item_id;
+        updateItems();
+      });
+
+      source.onerror = () => {
+        // EventSource retries by itself unless the server refused the stream
+        if (source.readyState === EventSource.CLOSED && !closed) {
+          retryId = setTimeout(connect, 5000);
+        }
+      };
+    };
 
-    const sorted = [...data].sort((a, b) => a.display_order - b.display_order);
+    connect();
 
-    if (queueRef.current.length === 0) {
-      queueRef.current = sorted.filter(item => item.item_id !== activeItemId);
-      previousActiveIdRef.current = activeItemId;
-    }
+    // Close the stream on unmount
+    return () => {
+      closed = true;
+      clearTimeout(retryId);
+      if (source) source.close();
+    };
+  }, []);
+
+// Only fetch item details when the stream mentions items we haven't seen
+const syncItems = async () => {
+  const missing = orderRef.current.some((id) => !detailsRef.current.has(id));
+  if (missing) {
+    await fetchRotationItems();
+  }
+  updateItems();
+};
 
-    // If active item changed
-    if (previousActiveIdRef.current !== activeItemId) {
-      // Remove new active item
-      queueRef.current = queueRef.current.filter(item => item.item_id !== activeItemId);
+// Up next: everything after the active item, wrapping around
+const updateItems = () => {
+  const order = orderRef.current;
+  const activeIndex = order.indexOf(activeIdRef.current);
+  const upNext = activeIndex === -1
+    ? order
+    : [...order.slice(activeIndex + 1), ...order.slice(0, activeIndex)];
 
-      // Add the old active item back to the end if it's not already in the queue
-      const oldActive = sorted.find(item => item.item_id === previousActiveIdRef.current);
-      if (oldActive && !queueRef.current.find(i => i.item_id === oldActive.item_id)) {
-        queueRef.current.push(oldActive);
-      }
+  setCurrentImage(detailsRef.current.get(activeIdRef.current) || null);
+  setItems(upNext.map((id) => detailsRef.current.get(id)).filter(Boolean));
+};
 
-      previousActiveIdRef.current = activeItemId;
-    }
+const fetchRotationItems = async () => {
+  try {
+    const response = await axios.get('/rotation/items');
+    const data = response.data.items || [];
 
     // Parse and map for rendering
-    const transformed = queueRef.current.map((item) => {
+    const details = new Map();
+    data.forEach((item) => {
       let pixelData = {};
       try {
         pixelData =
@@ -81,7 +131,7 @@ const fetchRotationItems = async () => {
         console.error('Failed to parse pixel data', e);
       }
 
-      return {
+      details.set(item.item_id, {
         id: item.item_id,
         design_id: item.design_id,
         title: item.title,
@@ -90,10 +140,10 @@ const fetchRotationItems = async () => {
         display_order: item.display_order,
         expiry_time: item.expiry_time,
         imageUrl: renderPixelDataToImage(pixelData, 64, 64, 1),
-      };
+      });
     });
 
-    setItems(transformed);
+    detailsRef.current = details;
   } catch (error) {
     console.error('Error fetching rotation items:', error);
   }
@@ -3,7 +3,7 @@ import '../App.css';
 import './styles/UserImages.css';
 import '../assets/fonts/PixelifySans/PixelifySans-VariableFont_wght.ttf';
 import axios from '../api/axios';
-import {renderPixelDataToImage} from '../utils/pixelRenderer';
+import {thumbnailSrc} from '../utils/thumbnailUtils';
 import { Navigate, useNavigate} from 'react-router-dom';
 // modal component
 import Modal from "../components/Modal";
@@ -13,7 +13,18 @@ import UserMemory from "../components/UserMemory"
 
 async function getDesigns(page, page_size) {
     try {
-        const res = await axios.get('/designs', {params: {page, page_size}});
+        // List mode: thumbnails instead of every design's pixel_data
+        const res = await axios.get('/designs', {params: {page, page_size, include_pixels: false}});
+        return res.data;
+    } catch (error) {
+        if (error.response) return error.response.data;
+        return {error: "Unexpected error occurred"};
+    }
+}
+
+async function getDesign(design_id) {
+    try {
+        const res = await axios.get(`/design/${design_id}`);
         return res.data;
     } catch (error) {
         if (error.response) return error.response.data;
@@ -74,13 +85,21 @@ function UserImages() {
         }
     };
 
-    const handleEdit = () => {
+    const handleEdit = async () => {
         if (selectedDesign) {
+            // The list doesn't carry pixel_data, the editor needs it
+            const design = await getDesign(selectedDesign.design_id);
+            if (!design?.pixel_data) {
+                setAlertMessage(design?.error || "Couldn't load the design.");
+                setShowAlertModal(true);
+                return;
+            }
+
             setRedirectToEdit({
                 design: {
-                    design_id: selectedDesign.design_id,
-                    title: selectedDesign.title,
-                    pixel_data: selectedDesign.pixel_data
+                    design_id: design.design_id,
+                    title: design.title,
+                    pixel_data: design.pixel_data
                 }
             });
         }
@@ -162,7 +181,7 @@ function UserImages() {
                                             : 'Not in Queue'}
                             </div>
                             <img
-                                src={renderPixelDataToImage(JSON.parse(design.pixel_data), 64, 64, 8)}
+                                src={thumbnailSrc(design.thumbnail_url)}
                                 alt={design.title}
                                 className="w-full object-contain rounded"
                                 style={{imageRendering: 'pixelated'}}
@@ -235,7 +254,7 @@ function UserImages() {
                         style={{maxHeight: '80vh', overflowY: 'auto'}}
                     >
                         <img
-                            src={renderPixelDataToImage(JSON.parse(selectedDesign.pixel_data), 64, 64, 8)}
+                            src={thumbnailSrc(selectedDesign.thumbnail_url, 4)}
                             alt={selectedDesign.title}
                             className="w-48 h-48 border border-gray-300 rounded-lg object-contain"
                             style={{imageRendering: 'pixelated'}}
@@ -4,7 +4,7 @@ import "./styles/Upload.css";
 import "./styles/UserAdmin.css";
 import "./styles/QueueAdmin.css";
 import { useAuth } from '../auth/authContext.js';
-import { renderPixelDataToImage } from '../utils/pixelRenderer';
+import { thumbnailSrc } from '../utils/thumbnailUtils';
 import { formatISODateTime } from '../utils/dateUtils.jsx';
 
 export default function UploadHistoryPage() {
@@ -24,20 +24,10 @@ export default function UploadHistoryPage() {
       const { items, page: p, pages: totalPages } = res.data;
 
       const sorted = items
-        .map(item => {
-          let pd = {};
-          if (item.pixel_data) {
-            try {
-              pd = typeof item.pixel_data === 'string'
-                ? JSON.parse(item.pixel_data)
-                : item.pixel_data;
-            } catch {}
-          }
-          return {
-            ...item,
-            url: renderPixelDataToImage(pd, 64, 64, 1)
-          };
-        })
+        .map(item => ({
+          ...item,
+          url: thumbnailSrc(item.thumbnail_url)
+        }))
         // use built-in Date parsing (which auto-shifts into local TZ) for ordering
         .sort((a, b) =>
           new Date(b.attempt_time) - new Date(a.attempt_time)
@@ -0,0 +1,19 @@
+import axios from '../api/axios';
+import { getToken } from '../auth/jwtUtils';
+
+// Turns a thumbnail_url from the API into an <img> src, scale times 64x64 pixels.
+// <img> can't send the Authorization header, so the token goes in the query string.
+export const thumbnailSrc = (thumbnailUrl, scale = 1) => {
+  if (!thumbnailUrl) return '';
+
+  const params = new URLSearchParams();
+  if (scale !== 1) params.set('scale', scale);
+  const token = getToken();
+  if (token) params.set('jwt', token);
+
+  const query = params.toString();
+  if (!query) return `${axios.defaults.baseURL}${thumbnailUrl}`;
+
+  const separator = thumbnailUrl.includes('?') ? '&' : '?';
+  return `${axios.defaults.baseURL}${thumbnailUrl}${separator}${query}`;
+};